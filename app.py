@@ -1,23 +1,53 @@
 import os
+import atexit
 from dotenv import load_dotenv
 load_dotenv()
 
 import psycopg2
-from psycopg2.extras import DictCursor
-from flask import Flask, render_template, request, redirect, url_for, session, g, jsonify
-import markdown as md
-from bs4 import BeautifulSoup
+import click
+from flask import (Flask, render_template, request, redirect, url_for, session, g, jsonify, make_response,
+                   Response, stream_with_context)
+from werkzeug.http import is_resource_modified
+from markupsafe import escape
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
-import unicodedata
 import re
+import hashlib
+import tempfile
+from datetime import datetime, timedelta
+
+from db_pool import ConnectionPool
+import metrics
+from assets import Assets
+from metrics import TimedCursor, TimedClient, stage
+from render_cache import RenderCache, PostgresRenderStore, DiskRenderStore
+from html_images import find_cloudinary_urls
+from page_render import RENDERER_VERSION, render_markdown, render_images, rerender_pages
+from history_writer import HistoryWriter
+import history_partitions
+from image_catalog import ImageCatalog
+from slugs import generate_slug, save_with_unique_slug, repair_slugs
+import migrations
+from index_cache import IndexCache, load_tags
+import page_links
+import revisions
+from sessions import ServerSessionInterface, PostgresSessionStore, DiskSessionStore
+from wiki_transfer import ImportFormatError, export_ndjson, export_tar, import_wiki
+from image_uploads import (UploadError, UploadSpool, UploadJobs, CloudinaryStorage, LocalStorage,
+                           validate_image)
 
 # AUTHLIB
 from authlib.integrations.flask_client import OAuth
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'verysecretkey')
+# Strop na telo jednej požiadavky; väčšie obrázky sa nahrávajú po častiach (/upload_image/chunk)
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))
+
+# Statické súbory s hashom v názve, .gz/.br a Cache-Control immutable (/assets/...)
+assets = Assets(app, out_dir=os.environ.get('ASSET_DIR', os.path.join(app.root_path, 'static_build')),
+                auto_build=os.environ.get('ASSET_AUTO_BUILD', '1') != '0')
 
 # Google OAuth nastavenie - Discovery + nastavený api_base_url
 oauth = OAuth(app)
@@ -42,59 +72,131 @@ google = oauth.register(
 DATABASE_URL = os.environ.get('DATABASE_URL')
 CLOUDINARY_URL = os.environ.get('CLOUDINARY_URL')
 cloudinary.config(cloudinary_url=CLOUDINARY_URL)
+# volania Cloudinary idú cez obal, ktorý meria ich trvanie (metrics)
+cloudinary_api = TimedClient(cloudinary.api, 'cloudinary')
+cloudinary_uploader = TimedClient(cloudinary.uploader, 'cloudinary')
+
+# Latencie endpointov, SQL, fázy renderovania -> /metrics a hlavička Server-Timing
+metrics.init_app(app, server_timing=os.environ.get('SERVER_TIMING', '1') != '0')
+atexit.register(metrics.registry.flush)
+
+# Pool spojení - jeden na worker proces, spojenia sa otvárajú až pri prvom použití
+db_pool = ConnectionPool(
+    DATABASE_URL,
+    minconn=int(os.environ.get('DB_POOL_MIN', 1)),
+    maxconn=int(os.environ.get('DB_POOL_MAX', 10)),
+    timeout=float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    check_interval=float(os.environ.get('DB_POOL_CHECK_INTERVAL', 30)),
+    cursor_factory=TimedCursor
+)
+# štatistiky poolu aj v /metrics - súčet cez workery
+for _key, _kind, _name, _help in (
+    ('checkouts', 'counter', 'checkouts_total', 'Počet výpožičiek spojenia z poolu.'),
+    ('waits', 'counter', 'waits_total', 'Počet čakaní na voľné spojenie.'),
+    ('wait_time', 'counter', 'wait_seconds_total', 'Celkový čas čakania na voľné spojenie.'),
+    ('timeouts', 'counter', 'timeouts_total', 'Počet čakaní, ktoré skončili timeoutom.'),
+    ('connections_created', 'counter', 'connections_created_total', 'Počet otvorených spojení.'),
+    ('connections_discarded', 'counter', 'connections_discarded_total', 'Počet zahodených spojení.'),
+    ('health_check_failures', 'counter', 'health_check_failures_total', 'Počet spojení, ktoré neprešli health checkom.'),
+    ('idle', 'gauge', 'idle_connections', 'Voľné spojenia v pooli.'),
+    ('checked_out', 'gauge', 'checked_out_connections', 'Vypožičané spojenia.'),
+):
+    getattr(metrics.registry, _kind)(f'wiki_db_pool_{_name}', _help, callback=lambda key=_key: db_pool.stats()[key])
+STATS_TOKEN = os.environ.get('STATS_TOKEN')
+
+# Cache vyrenderovaných stránok: LRU v procese + voliteľná zdieľaná vrstva ('postgres' alebo 'disk')
+RENDER_CACHE_BACKEND = os.environ.get('RENDER_CACHE_BACKEND', '').lower()
+if RENDER_CACHE_BACKEND == 'postgres':
+    _render_store = PostgresRenderStore()
+elif RENDER_CACHE_BACKEND == 'disk':
+    _render_store = DiskRenderStore(os.environ.get('RENDER_CACHE_DIR', 'render_cache'))
+else:
+    _render_store = None
+# lazy = renderovanie pri čítaní (render_cache), write = HTML sa uloží do pages.content_html pri zápise
+RENDER_MODE = os.environ.get('RENDER_MODE', 'lazy').lower()
+
+render_cache = RenderCache(
+    maxsize=int(os.environ.get('RENDER_CACHE_SIZE', 256)),
+    ttl=float(os.environ.get('RENDER_CACHE_TTL', 300)),
+    shared=_render_store
+)
+
+# Zápis page_history na pozadí po dávkach (pri plnej fronte record() čaká, drop/sample len pre view)
+history_writer = HistoryWriter(
+    db_pool,
+    batch_size=int(os.environ.get('HISTORY_BATCH_SIZE', 500)),
+    flush_interval=float(os.environ.get('HISTORY_FLUSH_INTERVAL', 1.0)),
+    max_queue=int(os.environ.get('HISTORY_MAX_QUEUE', 10000)),
+    overload_policy=os.environ.get('HISTORY_OVERLOAD_POLICY', 'block'),
+    put_timeout=float(os.environ.get('HISTORY_PUT_TIMEOUT', 2.0)),
+    sample_rate=int(os.environ.get('HISTORY_SAMPLE_RATE', 10)),
+    max_retries=int(os.environ.get('HISTORY_MAX_RETRIES', 5))
+)
+atexit.register(history_writer.shutdown)
+# Surové udalosti sa držia toľko mesiacov, staršie views ostanú len v page_view_daily (0 = navždy)
+HISTORY_RETENTION_MONTHS = int(os.environ.get('HISTORY_RETENTION_MONTHS', 12))
+HISTORY_PARTITIONS_AHEAD = int(os.environ.get('HISTORY_PARTITIONS_AHEAD', 3))
+
+# Lokálny katalóg obrázkov z Cloudinary, občas sa zosúladí cez Admin API
+image_catalog = ImageCatalog(
+    cloudinary_api,
+    db_pool,
+    folder='lehotskydracak',
+    reconcile_interval=float(os.environ.get('IMAGE_CATALOG_RECONCILE_INTERVAL', 3600))
+)
+
+# Nahrávanie obrázkov: spool na disk, prenos do úložiska ('cloudinary' alebo 'local') na pozadí
+if os.environ.get('UPLOAD_STORAGE', 'cloudinary').lower() == 'local':
+    _upload_storage = LocalStorage(os.environ.get('UPLOAD_LOCAL_DIR', os.path.join(app.static_folder, 'uploads')))
+else:
+    _upload_storage = CloudinaryStorage(cloudinary_uploader, folder='lehotskydracak')
+upload_spool = UploadSpool(
+    os.environ.get('UPLOAD_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'lehotskydracak-uploads')),
+    max_bytes=int(os.environ.get('UPLOAD_MAX_BYTES', 50 * 1024 * 1024))
+)
+upload_jobs = UploadJobs(
+    db_pool,
+    _upload_storage,
+    upload_spool,
+    max_workers=int(os.environ.get('UPLOAD_WORKERS', 2)),
+    on_stored=lambda c, result: image_catalog.upsert(c, [result]),
+    stale_after=float(os.environ.get('UPLOAD_JOB_TIMEOUT', 30 * 60))
+)
+atexit.register(upload_jobs.shutdown)
+
+# Štítky a index stránok v pamäti workera, invalidácia cez LISTEN/NOTIFY
+index_cache = IndexCache(DATABASE_URL, enabled=os.environ.get('INDEX_CACHE', '1') != '0')
+
+# Session na strane servera: v cookie je len id, dáta v tabuľke sessions s LRU pred ňou
+if os.environ.get('SESSION_BACKEND', 'postgres').lower() == 'disk':
+    _session_store, _session_notifier = DiskSessionStore(os.environ.get('SESSION_DIR', 'sessions')), None
+else:
+    _session_store, _session_notifier = PostgresSessionStore(db_pool), index_cache
+app.session_interface = ServerSessionInterface(
+    _session_store,
+    lifetime=timedelta(days=int(os.environ.get('SESSION_LIFETIME_DAYS', 30))),
+    cache_size=int(os.environ.get('SESSION_CACHE_SIZE', 10000)),
+    notifier=_session_notifier,
+    cleanup_interval=float(os.environ.get('SESSION_CLEANUP_INTERVAL', 600)),
+)
 
 def get_db():
     if not hasattr(g, 'db_conn'):
-        g.db_conn = psycopg2.connect(DATABASE_URL, cursor_factory=DictCursor)
+        g.db_conn = db_pool.getconn()
     return g.db_conn
 
 @app.teardown_appcontext
 def close_connection(exception):
-    if hasattr(g, 'db_conn'):
-        g.db_conn.close()
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        db_pool.putconn(conn)
 
-def init_db():
-    """
-    Inicializácia DB. Vytvorí tabuľky, ak neexistujú.
-    Nezabudni si vytvoriť aj CREATE TABLE users, ak to neriešiš samostatne.
-    """
-    conn = get_db()
-    c = conn.cursor()
+def stats_allowed():
+    # Štatistiky môže čítať admin alebo scraper s tokenom (Authorization: Bearer ...)
+    if STATS_TOKEN and request.headers.get('Authorization') == f'Bearer {STATS_TOKEN}':
+        return True
+    return is_admin()
 
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS pages (
-            id SERIAL PRIMARY KEY,
-            title TEXT UNIQUE NOT NULL,
-            content TEXT,
-            visible_to TEXT NOT NULL DEFAULT 'All',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            slug TEXT
-        );
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS tags (
-            id SERIAL PRIMARY KEY,
-            name TEXT NOT NULL UNIQUE,
-            color TEXT NOT NULL
-        );
-    """)
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS page_tags (
-            page_id INTEGER NOT NULL,
-            tag_id INTEGER NOT NULL,
-            PRIMARY KEY(page_id, tag_id),
-            FOREIGN KEY (page_id) REFERENCES pages(id) ON DELETE CASCADE,
-            FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
-        );
-    """)
-
-    # Tu môže byť aj CREATE TABLE users
-
-    conn.commit()
-
-with app.app_context():
-    init_db()
 
 def is_logged_in():
     return 'user' in session
@@ -102,82 +204,79 @@ def is_logged_in():
 def is_admin():
     return is_logged_in() and session['user']['role'] == 'Admin'
 
-def remove_diacritics(text):
-    nfkd_form = unicodedata.normalize('NFKD', text)
-    only_ascii = nfkd_form.encode('ASCII', 'ignore').decode('ASCII')
-    return only_ascii
-
-def generate_slug(title, c, existing_id=None):
-    base = remove_diacritics(title)
-    base = re.sub(r'[^a-zA-Z0-9\s]+', '', base)
-    base = re.sub(r'\s+', ' ', base).strip()
-    base = base.replace(' ', '+')
-    slug = base.lower() if base else 'stranka'
-
-    candidate = slug
-    i = 2
-    while True:
-        if existing_id:
-            c.execute("SELECT id FROM pages WHERE slug=%s AND id<>%s", (candidate, existing_id))
-        else:
-            c.execute("SELECT id FROM pages WHERE slug=%s", (candidate,))
-        row = c.fetchone()
-        if not row:
-            return candidate
-        candidate = slug + f"-{i}"
-        i += 1
-
-def process_images(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    imgs = soup.find_all('img')
-    for img in imgs:
-        alt = img.get('alt', '')
-        parts = [p.strip() for p in alt.split('|')]
-        base_alt = parts[0] if parts else 'Obrázok'
-        scale = 100
-        caption = '-'
-        align = 'center'
-        for p in parts[1:]:
-            if p.startswith('scale='):
-                try:
-                    val = int(p.replace('scale=', '').strip())
-                    if val < 10: val = 10
-                    if val > 100: val = 100
-                    scale = val
-                except:
-                    pass
-            elif p.startswith('caption='):
-                caption = p.replace('caption=', '').strip()
-            elif p.startswith('align='):
-                align = p.replace('align=', '').strip().lower()
-
-        img['alt'] = base_alt
-        if not img.get('data-fullsrc'):
-            img['data-fullsrc'] = img.get('src', '')
-
-        figure = soup.new_tag('figure')
-        figure_style = 'background:#f1f1f1; padding:5px; border:1px solid #ccc; clear:both;'
-        if align == 'left':
-            figure_style += f'float:left; margin:0 10px 10px 0; width:{scale}%;'
-        elif align == 'right':
-            figure_style += f'float:right; margin:0 0 10px 10px; width:{scale}%;'
-        else:
-            figure_style += f'margin:0 auto; width:{scale}%; display:block;'
-        figure['style'] = figure_style
+_template_version = None
 
-        img_style = 'width:100%; display:block; height:auto;'
-        img['style'] = img_style
+def template_version():
+    # Zmena šablón po nasadení musí zmeniť aj ETag vyrenderovaných stránok
+    global _template_version
+    if _template_version is None:
+        mtimes = []
+        for root, _, files in os.walk(app.template_folder):
+            mtimes.extend(os.stat(os.path.join(root, f)).st_mtime_ns for f in files)
+        # HTML odkazuje na súbory s hashom - nový build musí zmeniť ETag
+        _template_version = f"{max(mtimes, default=0)}-{assets.version()}"
+    return _template_version
 
-        img.replace_with(figure)
-        figure.append(img)
+def get_cache_versions(c):
+    c.execute("SELECT name, version, changed_at FROM cache_versions")
+    return {r['name']: r for r in c.fetchall()}
 
-        if caption and caption != '-':
-            figcap = soup.new_tag('figcaption')
-            figcap.string = caption
-            figcap['style'] = 'text-align:center; color:#555; font-size:smaller;'
-            figure.append(figcap)
+def make_etag(*parts):
+    return hashlib.sha1('|'.join(str(p) for p in parts).encode('utf-8')).hexdigest()
 
-    return str(soup)
+def conditional_response(etag, last_modified, build):
+    """
+    Ak klient už má aktuálnu verziu (If-None-Match / If-Modified-Since),
+    vráti 304 bez volania build(). Odpovede závisia od používateľa a jeho
+    roly, preto ich smie uložiť len prehliadač a vždy ich musí overiť.
+    """
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = app.response_class(status=304)
+    else:
+        response = make_response(build())
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+_page_tag_id = None
+
+def get_page_tag_id(c):
+    """Id špeciálneho tagu 'stránka' - v procese sa pamätá po prvom načítaní."""
+    global _page_tag_id
+    if _page_tag_id is not None:
+        return _page_tag_id
+    c.execute("SELECT id FROM tags WHERE name='stránka'")
+    row = c.fetchone()
+    if row:
+        _page_tag_id = row[0]
+        return _page_tag_id
+    # Ešte neexistuje - vytvorí sa v transakcii volajúceho, zapamätáme si ho až nabudúce
+    c.execute("""
+        INSERT INTO tags (name, color) VALUES ('stránka', '#cccccc')
+        ON CONFLICT (name) DO NOTHING
+        RETURNING id
+    """)
+    row = c.fetchone()
+    if row:
+        return row[0]
+    c.execute("SELECT id FROM tags WHERE name='stránka'")
+    return c.fetchone()[0]
+
+def render_page_html(content, c):
+    # rozmery obrázkov z katalógu (width/height v <img>) jedným dotazom
+    dimensions = image_catalog.dimensions(c, find_cloudinary_urls(content))
+    with stage('markdown'):
+        html_content = render_markdown(content)
+    with stage('images'):
+        return render_images(html_content, dimensions)
+
+def prerender(content, c):
+    """(content_html, content_html_version) na uloženie so stránkou."""
+    if RENDER_MODE != 'write':
+        return None, None
+    return render_page_html(content, c), RENDERER_VERSION
 
 # -------- Google OAuth routes --------
 
@@ -204,6 +303,7 @@ def auth_callback():
 
     user_data = load_or_create_user(email, first_name, last_name)
 
+    session.rotate()
     session['user'] = {
         'id': user_data['id'],
         'email': user_data['email'],
@@ -215,31 +315,35 @@ def auth_callback():
     return redirect(url_for('index'))
 
 def load_or_create_user(email, first_name, last_name):
+    """
+    Nájde alebo vytvorí používateľa jedným dotazom. Meno sa prepíše len vtedy,
+    keď sa v Google profile zmenilo. Prvý používateľ v DB sa stane Adminom.
+    """
     conn = get_db()
     c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM users")
-    count_all = c.fetchone()[0]
-
-    c.execute("SELECT * FROM users WHERE email=%s", (email,))
+    c.execute("""
+        WITH upsert AS (
+            INSERT INTO users (email, first_name, last_name, role)
+            VALUES (%(email)s, %(first_name)s, %(last_name)s,
+                    CASE WHEN EXISTS (SELECT 1 FROM users) THEN 'Player' ELSE 'Admin' END)
+            ON CONFLICT (email) DO UPDATE
+            SET first_name = EXCLUDED.first_name, last_name = EXCLUDED.last_name
+            WHERE (users.first_name, users.last_name)
+                  IS DISTINCT FROM (EXCLUDED.first_name, EXCLUDED.last_name)
+            RETURNING *
+        )
+        SELECT * FROM upsert
+        UNION ALL
+        SELECT * FROM users
+        WHERE email = %(email)s AND NOT EXISTS (SELECT 1 FROM upsert)
+    """, {'email': email, 'first_name': first_name, 'last_name': last_name})
     row = c.fetchone()
-    if row:
-        c.execute("""UPDATE users
-                     SET first_name=%s, last_name=%s
-                     WHERE email=%s
-                     RETURNING *""",
-                  (first_name, last_name, email))
-        updated_row = c.fetchone()
-        conn.commit()
-        return updated_row
-    else:
-        new_role = 'Admin' if count_all == 0 else 'Player'
-        c.execute("""INSERT INTO users (email, first_name, last_name, role)
-                     VALUES (%s, %s, %s, %s)
-                     RETURNING *""",
-                  (email, first_name, last_name, new_role))
-        new_row = c.fetchone()
-        conn.commit()
-        return new_row
+    if row is None:
+        # riadok vložila súbežná transakcia až po začiatku nášho dotazu
+        c.execute("SELECT * FROM users WHERE email=%s", (email,))
+        row = c.fetchone()
+    conn.commit()
+    return row
 
 @app.route('/logout')
 def logout():
@@ -276,6 +380,8 @@ def update_role():
     c = conn.cursor()
     try:
         c.execute("UPDATE users SET role=%s WHERE id=%s", (new_role, user_id))
+        # nová rola platí hneď, aj v už prihlásených session používateľa
+        app.session_interface.update_user(c, int(user_id), role=new_role)
         conn.commit()
         return jsonify({"success": True})
     except Exception as e:
@@ -284,34 +390,96 @@ def update_role():
 
 @app.route('/api/pages')
 def api_pages():
+    """
+    Zoznam stránok po častiach, zoradený podľa názvu.
+
+    Parametre: tags=1,2,3 a mode=and|or (filter podľa štítkov), q (časť názvu),
+    limit a cursor (next_cursor z predchádzajúcej odpovede).
+    """
     if not is_logged_in():
-        return jsonify([])
+        return jsonify({"pages": [], "next_cursor": None})
+
+    try:
+        tag_ids = [int(x) for x in request.args.get('tags', '').split(',') if x.strip()]
+        limit = min(max(int(request.args.get('limit', 100)), 1), 500)
+    except ValueError:
+        return jsonify({"error": "Neplatné parametre"}), 400
+    mode = request.args.get('mode', 'or').lower()
+    if mode not in ('and', 'or'):
+        return jsonify({"error": "Neplatný mód filtra"}), 400
+    q = request.args.get('q', '').strip()
+    cursor = request.args.get('cursor')
+
     conn = get_db()
+    pages = index_cache.snapshot(conn, 'pages')
+    tags = index_cache.snapshot(conn, 'tags') if pages is not None else None
+    # neznámy cursor (stránka medzitým premenovaná/zmazaná) vyrieši SQL
+    if tags is not None and (not cursor or cursor in pages.position):
+        etag = make_etag('pages', pages.version, tags.version,
+                         session['user']['role'], request.query_string.decode('utf-8', 'replace'))
+        last_modified = max(pages.changed_at, tags.changed_at)
+        return conditional_response(etag, last_modified,
+                                    lambda: build_pages_from_index(pages, tags, tag_ids, mode, q, cursor, limit))
+
+    conditions = []
+    params = []
+    if not is_admin():
+        conditions.append("p.visible_to = 'All'")
+    if tag_ids:
+        tag_ids = sorted(set(tag_ids))
+        if mode == 'and':
+            conditions.append("""p.id IN (
+                SELECT pt.page_id FROM page_tags pt
+                WHERE pt.tag_id = ANY(%s)
+                GROUP BY pt.page_id
+                HAVING count(DISTINCT pt.tag_id) = %s
+            )""")
+            params.extend([tag_ids, len(tag_ids)])
+        else:
+            conditions.append("""EXISTS (
+                SELECT 1 FROM page_tags pt
+                WHERE pt.page_id = p.id AND pt.tag_id = ANY(%s)
+            )""")
+            params.append(tag_ids)
+    if q:
+        conditions.append("p.title ILIKE %s")
+        params.append('%' + re.sub(r'([\\%_])', r'\\\1', q) + '%')
+    if cursor:
+        conditions.append("p.title > %s")
+        params.append(cursor)
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
     c = conn.cursor()
-    if is_admin():
-        c.execute("""
-            SELECT p.id, p.title, p.slug, p.visible_to,
-                   COALESCE(json_agg(json_build_object('tag_id', t.id, 'name', t.name, 'color', t.color)
-                                     ORDER BY t.name) FILTER (WHERE t.name IS NOT NULL), '[]') AS tags
-            FROM pages p
-            LEFT JOIN page_tags pt ON p.id = pt.page_id
-            LEFT JOIN tags t ON pt.tag_id = t.id AND t.name <> 'stránka'
-            GROUP BY p.id
-            ORDER BY p.title;
-        """)
-    else:
-        c.execute("""
-            SELECT p.id, p.title, p.slug, p.visible_to,
-                   COALESCE(json_agg(json_build_object('tag_id', t.id, 'name', t.name, 'color', t.color)
-                                     ORDER BY t.name) FILTER (WHERE t.name IS NOT NULL), '[]') AS tags
-            FROM pages p
-            LEFT JOIN page_tags pt ON p.id = pt.page_id
-            LEFT JOIN tags t ON pt.tag_id = t.id AND t.name <> 'stránka'
-            WHERE p.visible_to='All'
-            GROUP BY p.id
-            ORDER BY p.title;
-        """)
+    versions = get_cache_versions(c)
+    etag = make_etag('pages', versions['pages']['version'], versions['tags']['version'],
+                     session['user']['role'], request.query_string.decode('utf-8', 'replace'))
+    last_modified = max(versions['pages']['changed_at'], versions['tags']['changed_at'])
+    return conditional_response(etag, last_modified,
+                                lambda: build_pages_response(c, where, params, limit))
+
+def build_pages_response(c, where, params, limit):
+    # štítky agregujeme až pre stránky v aktuálnej dávke
+    c.execute(f"""
+        SELECT p.id, p.title, p.slug, p.visible_to,
+               COALESCE((
+                   SELECT json_agg(json_build_object('tag_id', t.id, 'name', t.name, 'color', t.color)
+                                   ORDER BY t.name)
+                   FROM page_tags pt
+                   JOIN tags t ON pt.tag_id = t.id
+                   WHERE pt.page_id = p.id AND t.name <> 'stránka'
+               ), '[]') AS tags
+        FROM pages p
+        {where}
+        ORDER BY p.title
+        LIMIT %s
+    """, params + [limit + 1])
     rows = c.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = rows[-1]['title']
+
     result = []
     for row in rows:
         result.append({
@@ -321,16 +489,136 @@ def api_pages():
             'visible_to': row['visible_to'],
             'tags': row['tags']
         })
-    return jsonify(result)
+    return jsonify({"pages": result, "next_cursor": next_cursor})
+
+def build_pages_from_index(pages, tags, tag_ids, mode, q, cursor, limit):
+    # rovnaký výsledok ako build_pages_response, ale z index_cache
+    admin = is_admin()
+    wanted = set(tag_ids)
+    q = q.lower()
+    result = []
+    next_cursor = None
+    start = pages.position[cursor] + 1 if cursor else 0
+    for row in pages.rows[start:]:
+        if not admin and row['visible_to'] != 'All':
+            continue
+        if wanted:
+            matched = wanted.intersection(row['tag_ids'])
+            if (mode == 'and' and len(matched) != len(wanted)) or not matched:
+                continue
+        if q and q not in row['title'].lower():
+            continue
+        if len(result) == limit:
+            next_cursor = result[-1]['title']
+            break
+        page_tags = set(row['tag_ids'])
+        result.append({
+            'page_id': row['id'],
+            'title': row['title'],
+            'slug': row['slug'],
+            'visible_to': row['visible_to'],
+            'tags': [{'tag_id': t['id'], 'name': t['name'], 'color': t['color']}
+                     for t in tags.rows if t['id'] in page_tags]
+        })
+    return jsonify({"pages": result, "next_cursor": next_cursor})
+
+# Značky pre zvýraznenie v ts_headline - do HTML ich meníme až po escapovaní obsahu
+HEADLINE_START = '\u27e6'
+HEADLINE_STOP = '\u27e7'
+HEADLINE_OPTIONS = (f'StartSel={HEADLINE_START}, StopSel={HEADLINE_STOP}, '
+                    'MaxFragments=2, MaxWords=30, MinWords=10, FragmentDelimiter=" … "')
+
+@app.route('/api/search')
+def api_search():
+    """
+    Fulltextové vyhľadávanie v názvoch a obsahu stránok.
+
+    Parametre: q (syntax ako vo webových vyhľadávačoch: "fráza", -slovo, or),
+    limit a cursor (next_cursor z predchádzajúcej odpovede).
+    """
+    if not is_logged_in():
+        return jsonify({"results": [], "next_cursor": None})
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "Chýba dopyt"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 50)
+        cursor = request.args.get('cursor')
+        if cursor:
+            cursor_rank, _, cursor_id = cursor.rpartition('_')
+            cursor = (float(cursor_rank), int(cursor_id))
+    except ValueError:
+        return jsonify({"error": "Neplatné parametre"}), 400
+
+    conditions = ["p.search_vector @@ q.query"]
+    params = [q]
+    if not is_admin():
+        conditions.append("p.visible_to = 'All'")
+    if cursor:
+        # ts_rank_cd vracia real - kurzor porovnávame v rovnakom type, inak by sa
+        # float8 literál líšil od ranku a stránky s rovnakým rankom by sa preskočili
+        conditions.append("(ts_rank_cd(p.search_vector, q.query), p.id) < (%s::real, %s)")
+        params.extend(cursor)
+    where = " AND ".join(conditions)
+
+    conn = get_db()
+    c = conn.cursor()
+    # ts_headline je drahý, počítame ho až pre stránky v aktuálnej dávke
+    c.execute(f"""
+        SELECT s.id, s.title, s.slug, s.rank,
+               ts_headline('wiki_sk', coalesce(s.content, ''), s.query, %s) AS snippet
+        FROM (
+            SELECT p.id, p.title, p.slug, p.content, q.query,
+                   ts_rank_cd(p.search_vector, q.query) AS rank
+            FROM pages p, websearch_to_tsquery('wiki_sk', %s) AS q(query)
+            WHERE {where}
+            ORDER BY rank DESC, p.id DESC
+            LIMIT %s
+        ) s
+        ORDER BY s.rank DESC, s.id DESC
+    """, [HEADLINE_OPTIONS] + params + [limit + 1])
+    rows = c.fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = f"{rows[-1]['rank']!r}_{rows[-1]['id']}"
+
+    results = []
+    for r in rows:
+        snippet = str(escape(r['snippet']))
+        snippet = snippet.replace(HEADLINE_START, '<mark>').replace(HEADLINE_STOP, '</mark>')
+        results.append({
+            'page_id': r['id'],
+            'title': r['title'],
+            'slug': r['slug'],
+            'rank': r['rank'],
+            'snippet': snippet
+        })
+    return jsonify({"results": results, "next_cursor": next_cursor})
 
 @app.route('/api/tags')
 def api_tags():
     if not is_logged_in():
         return jsonify([])
     conn = get_db()
+    tags = index_cache.snapshot(conn, 'tags')
+    if tags is not None:
+        etag = make_etag('tags', tags.version)
+        return conditional_response(etag, tags.changed_at,
+                                    lambda: build_tags_response(tags.rows))
     c = conn.cursor()
-    c.execute("SELECT id, name, color FROM tags WHERE name <> 'stránka' ORDER BY name;")
-    rows = c.fetchall()
+    versions = get_cache_versions(c)
+    etag = make_etag('tags', versions['tags']['version'])
+    return conditional_response(etag, versions['tags']['changed_at'],
+                                lambda: build_tags_response(load_tags(c)))
+
+def all_tags(conn):
+    # štítky pre checkboxy vo formulári (okrem 'stránka')
+    tags = index_cache.snapshot(conn, 'tags')
+    return tags.rows if tags is not None else load_tags(conn.cursor())
+
+def build_tags_response(rows):
     result = []
     for r in rows:
         result.append({
@@ -363,22 +651,41 @@ def create_tag():
 def delete_tags():
     if not is_admin():
         return jsonify({"error": "Not allowed"}), 403
-    tag_ids = request.form.getlist('tag_ids[]')
+    try:
+        tag_ids = [int(x) for x in request.form.getlist('tag_ids[]')]
+    except ValueError:
+        return jsonify({"error":"Invalid tag_ids"}), 400
     if not tag_ids:
         return jsonify({"error":"No tag_ids provided"}), 400
     conn = get_db()
     c = conn.cursor()
     try:
-        for tid in tag_ids:
-            c.execute("DELETE FROM tags WHERE id=%s AND name<>'stránka'", (tid,))
+        c.execute("DELETE FROM tags WHERE id = ANY(%s) AND name<>'stránka'", (tag_ids,))
+        # štítky sú uložené aj v cache stránok
+        render_cache.clear(conn)
         conn.commit()
         return jsonify({"success": True})
     except Exception as e:
         conn.rollback()
         return jsonify({"error": str(e)}), 500
 
+@app.errorhandler(413)
+def request_too_large(e):
+    return jsonify({"error": "Súbor je príliš veľký"}), 413
+
+def db_unavailable(e):
+    conn = g.get('db_conn')
+    if conn is not None and not conn.closed:
+        conn.rollback()
+    print("Upload DB error:", e)
+    return jsonify({"error": "Databáza je dočasne nedostupná"}), 503
+
 @app.route('/upload_image', methods=['POST'])
 def upload_image():
+    """
+    Uloží obrázok do spoolu, overí ho a prenos do úložiska spustí na pozadí.
+    Vráti 202 s job_id, stav sa zisťuje cez /api/upload_jobs/<job_id>.
+    """
     if not is_admin():
         return jsonify({"error":"Not allowed"}), 403
     if 'image' not in request.files:
@@ -387,48 +694,100 @@ def upload_image():
     if file.filename == '':
         return jsonify({"error":"No filename"}), 400
 
-    ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
-    def allowed_file(filename):
-        return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-    if not allowed_file(file.filename):
-        return jsonify({"error":"File not allowed"}), 400
-
+    path = None
     try:
-        result = cloudinary.uploader.upload(file, folder="lehotskydracak")
-        if 'secure_url' in result:
-            return jsonify({"url": result['secure_url']})
-        else:
-            return jsonify({"error":"Upload failed"}), 500
+        path = upload_spool.save(file.stream)
+        validate_image(path, file.filename)
+        job_id = upload_jobs.submit(get_db(), path, file.filename)
+    except UploadError as e:
+        if path:
+            upload_spool.discard(path)
+        return jsonify({"error": str(e)}), e.status
+    except psycopg2.Error as e:
+        if path:
+            upload_spool.discard(path)
+        return db_unavailable(e)
     except Exception as e:
+        if path:
+            upload_spool.discard(path)
         return jsonify({"error": str(e)}), 500
+    return jsonify({"job_id": job_id, "status": "pending"}), 202
+
+@app.route('/upload_image/chunk', methods=['POST'])
+def upload_image_chunk():
+    """
+    Nahrávanie po častiach. Bez upload_id začne nový upload; ďalšie časti
+    posielajú upload_id, offset (bajty, ktoré server už má) a súbor 'chunk'.
+    Pri final=1 sa súbor overí a odovzdá na prenos ako v /upload_image.
+    """
+    if not is_admin():
+        return jsonify({"error":"Not allowed"}), 403
+    upload_id = request.form.get('upload_id')
+    try:
+        if not upload_id:
+            upload_id = upload_spool.start_chunked()
+        received = int(request.form.get('offset', 0))
+        if 'chunk' in request.files:
+            received = upload_spool.append_chunk(upload_id, received, request.files['chunk'].stream)
+        if request.form.get('final') != '1':
+            return jsonify({"upload_id": upload_id, "received": received})
+
+        filename = request.form.get('filename', '')
+        path = upload_spool.finish_chunked(upload_id)
+        try:
+            validate_image(path, filename)
+            job_id = upload_jobs.submit(get_db(), path, filename)
+        except Exception:
+            upload_spool.discard(path)
+            raise
+    except ValueError:
+        return jsonify({"error": "Neplatné parametre"}), 400
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+    except psycopg2.Error as e:
+        # súbor už upratal vnútorný except, úlohu nezapísanú databázou nie je čo označiť
+        return db_unavailable(e)
+    return jsonify({"job_id": job_id, "status": "pending"}), 202
+
+@app.route('/api/upload_jobs/<job_id>')
+def api_upload_job(job_id):
+    if not is_admin():
+        return jsonify({"error":"Not allowed"}), 403
+    job = upload_jobs.get(get_db(), job_id)
+    if job is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(job)
+
+def load_image_page(limit, cursor):
+    conn = get_db()
+    try:
+        image_catalog.refresh(conn)
+    except Exception as e:
+        conn.rollback()
+        print("Cloudinary list error:", e)
+    return image_catalog.list(conn.cursor(), limit, cursor)
 
 @app.route('/images')
 def list_images():
     if not is_admin():
         return redirect(url_for('index'))
     try:
-        resources = cloudinary.api.resources(type='upload', prefix='lehotskydracak/', max_results=100)
-    except Exception as e:
-        print("Cloudinary list error:", e)
-        resources = {'resources': []}
-    images = []
-    for r in resources.get('resources', []):
-        images.append({'public_id': r['public_id'], 'url': r['secure_url']})
-    return render_template('images.html', images=images)
+        images, next_cursor = load_image_page(100, request.args.get('cursor'))
+    except ValueError:
+        return redirect(url_for('list_images'))
+    return render_template('images.html', images=images, next_cursor=next_cursor)
 
 @app.route('/api/list_images')
 def api_list_images():
+    """Obrázky z katalógu od najnovších, parametre limit a cursor (next_cursor)."""
     if not is_admin():
-        return jsonify({"images":[]})
+        return jsonify({"images": [], "next_cursor": None})
     try:
-        resources = cloudinary.api.resources(type='upload', prefix='lehotskydracak/', max_results=100)
-        images = []
-        for r in resources.get('resources', []):
-            images.append({'public_id': r['public_id'], 'url': r['secure_url']})
-        return jsonify({"images": images})
-    except Exception as e:
-        print("Cloudinary list error:", e)
-        return jsonify({"images":[]})
+        limit = min(max(int(request.args.get('limit', 100)), 1), 500)
+        images, next_cursor = load_image_page(limit, request.args.get('cursor'))
+    except ValueError:
+        return jsonify({"error": "Neplatné parametre"}), 400
+    return jsonify({"images": images, "next_cursor": next_cursor})
 
 @app.route('/delete_image', methods=['POST'])
 def delete_image():
@@ -437,12 +796,29 @@ def delete_image():
     public_id = request.form.get('filename')
     if not public_id:
         return jsonify({"error":"No filename(public_id)"}), 400
-    result = cloudinary.uploader.destroy(public_id)
+    result = cloudinary_uploader.destroy(public_id)
+    if result.get('result') in ('ok', 'not found'):
+        conn = get_db()
+        image_catalog.remove(conn.cursor(), public_id)
+        conn.commit()
     if result.get('result') == 'ok':
         return redirect(url_for('list_images'))
     else:
         return "Chyba pri mazaní obrázka", 500
 
+@app.cli.command('reconcile-images')
+def reconcile_images_command():
+    """Zosúladí katalóg obrázkov s Cloudinary (napr. z cronu)."""
+    conn = db_pool.getconn()
+    try:
+        count = image_catalog.reconcile(conn)
+    finally:
+        db_pool.putconn(conn)
+    if count is None:
+        print("Zosúladenie už beží v inom procese.")
+    else:
+        print(f"Katalóg obrázkov zosúladený: {count} obrázkov.")
+
 @app.route('/add', methods=['GET','POST'])
 def add_page():
     if not is_admin():
@@ -459,40 +835,31 @@ def add_page():
         if not title:
             error = "Názov stránky nesmie byť prázdny"
         else:
-            slug = generate_slug(title, c)
             try:
                 # Vloženie novej stránky
-                c.execute("""
-                    INSERT INTO pages (title, content, visible_to, created_at, updated_at, slug)
-                    VALUES (%s, %s, %s, NOW(), NOW(), %s)
-                    RETURNING id
-                """, (title, content, visible_to, slug))
-                new_page_id = c.fetchone()[0]
-
-                # Vloženie špeciálneho tagu 'stránka' (ak neexistuje)
-                c.execute("SELECT id FROM tags WHERE name='stránka'")
-                row_t = c.fetchone()
-                if not row_t:
-                    c.execute("INSERT INTO tags (name, color) VALUES ('stránka', '#cccccc') RETURNING id;")
-                    page_tag_id = c.fetchone()[0]
-                else:
-                    page_tag_id = row_t[0]
-
-                # page_tags pre novú stránku
-                c.execute("INSERT INTO page_tags (page_id, tag_id) VALUES (%s, %s)", (new_page_id, page_tag_id))
-                for t_id in selected_tag_ids:
+                content_html, html_version = prerender(content, c)
+                def insert_page(slug):
                     c.execute("""
-                        INSERT INTO page_tags (page_id, tag_id) VALUES (%s, %s)
-                        ON CONFLICT DO NOTHING
-                    """, (new_page_id, t_id))
-                conn.commit()
-
-                # Uloženie udalosti 'edit' do page_history
-                user_id = session['user']['id']
+                        INSERT INTO pages (title, content, visible_to, created_at, updated_at, slug,
+                                           content_html, content_html_version)
+                        VALUES (%s, %s, %s, NOW(), NOW(), %s, %s, %s)
+                        RETURNING id
+                    """, (title, content, visible_to, slug, content_html, html_version))
+                    return c.fetchone()[0]
+                slug, new_page_id = save_with_unique_slug(c, title, insert_page)
+                page_links.claim_slug(c, slug)
+                page_links.save_links(c, new_page_id, content)
+                revisions.record(c, new_page_id, title, content, session['user']['id'])
+
+                # page_tags pre novú stránku (vrátane špeciálneho tagu 'stránka') jedným INSERT-om
                 c.execute("""
-                    INSERT INTO page_history (page_id, user_id, event_type)
-                    VALUES (%s, %s, 'edit')
-                """, (new_page_id, user_id))
+                    INSERT INTO page_tags (page_id, tag_id)
+                    SELECT %s, unnest(%s::int[])
+                    ON CONFLICT DO NOTHING
+                """, (new_page_id, [get_page_tag_id(c)] + selected_tag_ids))
+
+                # Udalosť 'edit' v tej istej transakcii ako stránka
+                history_writer.record_in(c, new_page_id, session['user']['id'], 'edit')
                 conn.commit()
 
                 # Presmeruj na detail stránky
@@ -503,12 +870,10 @@ def add_page():
                 error = f"Chyba pri ukladaní: {str(e)}"
 
     # Načítanie všetkých tagov (okrem 'stránka'), aby sme ich vedeli zobraziť vo formulári (checkboxy)
-    c.execute("SELECT id, name, color FROM tags WHERE name <> 'stránka' ORDER BY name;")
-    all_tags = c.fetchall()
     return render_template('page_edit.html',
                            mode='add',
                            page=None,
-                           all_tags=all_tags,
+                           all_tags=all_tags(conn),
                            page_tags=[],
                            editing_page=True,
                            error=error)
@@ -551,38 +916,47 @@ def edit_page(slug):
         if not title:
             error = "Názov stránky nesmie byť prázdny"
         else:
-            # Vygeneruj nový slug (ak sa zmenil title)
-            new_slug = generate_slug(title, c, existing_id=page_id)
             try:
-                # Update stránky
-                c.execute("""
-                    UPDATE pages
-                    SET title=%s, content=%s, visible_to=%s, updated_at=NOW(), slug=%s
-                    WHERE id=%s
-                """, (title, content, visible_to, new_slug, page_id))
-
-                # Vymažeme existujúce tagy (okrem 'stránka') a vložíme nové
-                c.execute("""
-                    DELETE FROM page_tags
-                    USING tags
-                    WHERE page_tags.tag_id = tags.id
-                      AND tags.name <> 'stránka'
-                      AND page_tags.page_id = %s
-                """, (page_id,))
-                for t_id in selected_tag_ids:
+                # Update stránky (nový slug, ak sa zmenil title)
+                content_html, html_version = prerender(content, c)
+                def update_page(slug):
                     c.execute("""
-                        INSERT INTO page_tags (page_id, tag_id)
-                        VALUES (%s, %s)
-                        ON CONFLICT DO NOTHING
-                    """, (page_id, t_id))
-                conn.commit()
-
-                # Zaznamenať 'edit' do histórie
-                user_id = session['user']['id']
+                        UPDATE pages
+                        SET title=%s, content=%s, visible_to=%s, updated_at=NOW(), slug=%s,
+                            content_html=%s, content_html_version=%s
+                        WHERE id=%s
+                    """, (title, content, visible_to, slug, content_html, html_version, page_id))
+                new_slug, _ = save_with_unique_slug(c, title, update_page, existing_id=page_id)
+                render_cache.invalidate(conn, page_id)
+
+                # Starý slug ďalej vedie sem, odkazy stránky podľa nového obsahu
+                page_links.record_rename(c, page_id, page['slug'], new_slug)
+                page_links.save_links(c, page_id, content)
+                # nová revízia (delta voči predchádzajúcej), starý obsah sa nestráca
+                revisions.record(c, page_id, title, content, session['user']['id'])
+
+                # Zmažeme len odobraté a vložíme len pridané štítky ('stránka' ostáva)
                 c.execute("""
-                    INSERT INTO page_history (page_id, user_id, event_type)
-                    VALUES (%s, %s, 'edit')
-                """, (page_id, user_id))
+                    WITH selected AS (
+                        SELECT DISTINCT unnest(%(tags)s::int[]) AS tag_id
+                    ), removed AS (
+                        DELETE FROM page_tags pt
+                        WHERE pt.page_id = %(page_id)s
+                          AND pt.tag_id <> %(page_tag_id)s
+                          AND pt.tag_id NOT IN (SELECT tag_id FROM selected)
+                    )
+                    INSERT INTO page_tags (page_id, tag_id)
+                    SELECT %(page_id)s, s.tag_id
+                    FROM selected s
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM page_tags pt
+                        WHERE pt.page_id = %(page_id)s AND pt.tag_id = s.tag_id
+                    )
+                    ON CONFLICT DO NOTHING
+                """, {'tags': selected_tag_ids, 'page_id': page_id, 'page_tag_id': get_page_tag_id(c)})
+
+                # Udalosť 'edit' v tej istej transakcii ako úprava
+                history_writer.record_in(c, page_id, session['user']['id'], 'edit')
                 conn.commit()
 
                 return redirect(url_for('view_page', slug=new_slug))
@@ -591,18 +965,152 @@ def edit_page(slug):
                 error = f"Chyba pri ukladaní: {str(e)}"
 
     # Načítanie všetkých tagov (okrem 'stránka') pre zobrazenie
-    c.execute("SELECT id, name, color FROM tags WHERE name <> 'stránka' ORDER BY name;")
-    all_tags = c.fetchall()
 
     return render_template('page_edit.html',
                            mode='edit',
                            page=page,
-                           all_tags=all_tags,
+                           all_tags=all_tags(conn),
                            page_tags=page_tags_ids,
                            editing_page=True,
                            error=error)
 
 
+@app.cli.group('db')
+def db_cli():
+    """Migrácie schémy (tabuľka schema_version)."""
+
+@db_cli.command('upgrade')
+@click.option('--to', 'target', type=int, default=None, help='Migrovať len po túto verziu.')
+def db_upgrade_command(target):
+    """Spustí čakajúce migrácie."""
+    conn = db_pool.getconn()
+    try:
+        applied = migrations.upgrade(conn, target)
+    finally:
+        db_pool.putconn(conn)
+    print(f"Spustených migrácií: {len(applied)}")
+
+@db_cli.command('status')
+def db_status_command():
+    """Vypíše aplikované a čakajúce migrácie."""
+    conn = db_pool.getconn()
+    try:
+        done = migrations.applied_versions(conn)
+    finally:
+        db_pool.putconn(conn)
+    for version, description, _ in migrations.MIGRATIONS:
+        print(f"{'x' if version in done else ' '} {version:>4}  {description}")
+
+@app.cli.command('repair-slugs')
+def repair_slugs_command():
+    """Doplní chýbajúce a premenuje duplicitné slugy stránok."""
+    conn = db_pool.getconn()
+    try:
+        changes = repair_slugs(conn.cursor())
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+    for page_id, old_slug, new_slug in changes:
+        print(f"{page_id}: {old_slug!r} -> {new_slug}")
+    print(f"Opravených slugov: {len(changes)}")
+
+@app.cli.command('rerender-pages')
+@click.option('--workers', type=int, default=None, help='Počet procesov (predvolene počet CPU).')
+@click.option('--batch-size', type=int, default=100, show_default=True)
+@click.option('--all', 'force', is_flag=True, help='Prerenderovať aj stránky s aktuálnou verziou.')
+def rerender_pages_command(workers, batch_size, force):
+    """Prerenderuje pages.content_html po zmene renderera a zahodí render cache."""
+    conn = db_pool.getconn()
+    try:
+        count = rerender_pages(conn, workers, batch_size, force)
+        # HTML v zdieľanej render cache (režim lazy) je kľúčované len podľa updated_at
+        render_cache.clear(conn)
+        conn.commit()
+    finally:
+        db_pool.putconn(conn)
+    print(f"Prerenderovaných stránok: {count} (verzia {RENDERER_VERSION})")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Minifikuje statické súbory, pridá hash do názvu a zapíše .gz/.br varianty."""
+    manifest = assets.rebuild()
+    for source, hashed in sorted(manifest.items()):
+        print(f"{source} -> {hashed}")
+
+@app.cli.command('cleanup-sessions')
+def cleanup_sessions_command():
+    """Zmaže expirované session (inak to robia workery raz za SESSION_CLEANUP_INTERVAL)."""
+    print(f"Zmazaných session: {app.session_interface.cleanup()}")
+
+@app.cli.command('history-maintenance')
+@click.option('--months-ahead', type=int, default=None, help='Partície dopredu (predvolene HISTORY_PARTITIONS_AHEAD).')
+@click.option('--retention-months', type=int, default=None,
+              help='Okno surových udalostí (predvolene HISTORY_RETENTION_MONTHS, 0 = bez retencie).')
+def history_maintenance_command(months_ahead, retention_months):
+    """Založí mesačné partície page_history dopredu a zroluje staré views (spúšťať z cronu)."""
+    if months_ahead is None:
+        months_ahead = HISTORY_PARTITIONS_AHEAD
+    if retention_months is None:
+        retention_months = HISTORY_RETENTION_MONTHS
+    conn = db_pool.getconn()
+    try:
+        created, rolled_up = history_partitions.maintain(conn, months_ahead, retention_months)
+    finally:
+        db_pool.putconn(conn)
+    print(f"Založených partícií: {len(created)}, zrolovaných views: {rolled_up}")
+
+@app.cli.group('wiki')
+def wiki_cli():
+    """Export a import celej wiki (NDJSON alebo tar)."""
+
+@wiki_cli.command('export')
+@click.option('-o', '--output', default='-', show_default=True, help='Cieľový súbor (- = stdout).')
+@click.option('--format', 'fmt', type=click.Choice(['ndjson', 'tar']), default='ndjson', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Komprimovať gzipom.')
+@click.option('--history', is_flag=True, help='Pridať aj page_history.')
+def wiki_export_command(output, fmt, compress, history):
+    """Vyexportuje štítky, používateľov, stránky a page_tags (voliteľne históriu)."""
+    export = export_tar if fmt == 'tar' else export_ndjson
+    conn = db_pool.getconn()
+    size = 0
+    try:
+        with click.open_file(output, 'wb') as f:
+            for chunk in export(conn, history=history, compress=compress):
+                f.write(chunk)
+                size += len(chunk)
+    finally:
+        db_pool.putconn(conn)
+    click.echo(f"Vyexportované: {size} B", err=True)
+
+def finish_import(conn, log=print):
+    """
+    Po importe (aj čiastočnom): zahodí render cache a v režime write
+    prerenderuje stránky. Vráti počet prerenderovaných alebo None.
+    """
+    render_cache.clear(conn)
+    conn.commit()
+    if RENDER_MODE == 'write':
+        return rerender_pages(conn, log=log)
+    return None
+
+@wiki_cli.command('import')
+@click.argument('source', type=click.File('rb'))
+@click.option('--batch-size', type=int, default=1000, show_default=True, help='Stránok na transakciu.')
+def wiki_import_command(source, batch_size):
+    """Naimportuje export (NDJSON/tar, aj gzip) zo súboru alebo stdin (-)."""
+    conn = db_pool.getconn()
+    try:
+        stats = import_wiki(conn, source, batch_size=batch_size)
+        rerendered = finish_import(conn)
+        if rerendered is not None:
+            print(f"Prerenderovaných stránok: {rerendered}")
+    except ImportFormatError as e:
+        raise click.ClickException(str(e))
+    finally:
+        db_pool.putconn(conn)
+    for name, value in sorted(stats.items()):
+        print(f"{name}: {value}")
+
 @app.route('/delete_page', methods=['POST'])
 def delete_page():
     if not is_admin():
@@ -614,6 +1122,7 @@ def delete_page():
         conn = get_db()
         c = conn.cursor()
         c.execute("DELETE FROM pages WHERE id=%s", (page_id,))
+        render_cache.invalidate(conn, int(page_id))
         conn.commit()
         return jsonify({"success": True})
     except Exception as e:
@@ -627,68 +1136,449 @@ def view_page(slug):
     conn = get_db()
     c = conn.cursor()
     c.execute("""
-        SELECT p.id, p.title, p.content, p.visible_to, p.slug,
-               COALESCE(json_agg(json_build_object('tag_id', t.id, 'name', t.name, 'color', t.color)
-                                 ORDER BY t.name) FILTER (WHERE t.name IS NOT NULL), '[]') as tags
-        FROM pages p
-        LEFT JOIN page_tags pt ON p.id = pt.page_id
-        LEFT JOIN tags t ON pt.tag_id = t.id AND t.name <> 'stránka'
-        WHERE p.slug=%s
-        GROUP BY p.id;
+        SELECT p.id, p.title, p.visible_to, p.slug, p.updated_at,
+               v.version AS tags_version, v.changed_at AS tags_changed_at
+        FROM pages p, cache_versions v
+        WHERE p.slug=%s AND v.name='tags'
     """, (slug,))
     row = c.fetchone()
     if not row:
+        # premenovaná stránka - starý slug presmeruje na aktuálny
+        new_slug = page_links.resolve_redirect(c, slug)
+        if new_slug:
+            return redirect(url_for('view_page', slug=new_slug), 301)
         return "Stránka neexistuje", 404
 
     if row['visible_to'] == 'Admin' and not is_admin():
         return "Nemáte oprávnenie zobraziť túto stránku.", 403
 
-    # ===== TU vložíme záznam do page_history (event 'view') =====
+    # ===== záznam do page_history (event 'view') ide do fronty, zapíše sa na pozadí =====
     user_id = session['user']['id']  # z session - pri Google OAuth je tam ID z DB
     page_id = row['id']
-    c.execute("""
-        INSERT INTO page_history (page_id, user_id, event_type)
-        VALUES (%s, %s, 'view')
-    """, (page_id, user_id))
-    conn.commit()
+    history_writer.record(page_id, user_id, 'view')
 
-    html_content = md.markdown(row['content'] or '', extensions=['extra'])
-    html_content = process_images(html_content)
+    # Ak má prehliadač aktuálnu verziu, nerenderujeme vôbec nič
+    etag = make_etag('page', page_id, row['updated_at'].isoformat(), row['tags_version'],
+                     user_id, session['user']['role'], template_version(), RENDERER_VERSION)
+    last_modified = max(row['updated_at'], row['tags_changed_at'])
+    return conditional_response(etag, last_modified, lambda: build_page_response(conn, row))
 
-    return render_template('page_view.html',
-                           page_id=row['id'],
-                           title=row['title'],
-                           content=html_content,
-                           page_tags=row['tags'],
-                           slug=row['slug'])
+def build_page_response(conn, row):
+    c = conn.cursor()
+    page_id = row['id']
+    # HTML a štítky berieme z cache, markdown renderujeme len po úprave stránky;
+    # v režime write je HTML predrenderované priamo v pages.content_html
+    cached = None
+    if RENDER_MODE != 'write':
+        with stage('render_cache'):
+            cached = render_cache.get(conn, page_id, row['updated_at'], row['tags_version'])
+    if cached is None:
+        c.execute("""
+            SELECT p.content, p.updated_at, p.content_html, p.content_html_version,
+                   COALESCE(json_agg(json_build_object('tag_id', t.id, 'name', t.name, 'color', t.color)
+                                     ORDER BY t.name) FILTER (WHERE t.name IS NOT NULL), '[]') as tags
+            FROM pages p
+            LEFT JOIN page_tags pt ON p.id = pt.page_id
+            LEFT JOIN tags t ON pt.tag_id = t.id AND t.name <> 'stránka'
+            WHERE p.id=%s
+            GROUP BY p.id;
+        """, (page_id,))
+        page_row = c.fetchone()
+        if not page_row:
+            conn.rollback()
+            return "Stránka neexistuje", 404
+        if RENDER_MODE != 'write':
+            cached = {'html': render_page_html(page_row['content'], c), 'tags': page_row['tags']}
+            render_cache.set(conn, page_id, page_row['updated_at'], row['tags_version'], cached)
+            conn.commit()
+        elif page_row['content_html_version'] == RENDERER_VERSION:
+            cached = {'html': page_row['content_html'], 'tags': page_row['tags']}
+            conn.rollback()
+        else:
+            # zastarané HTML (do `flask rerender-pages`) sa renderuje pri každom čítaní
+            cached = {'html': render_page_html(page_row['content'], c), 'tags': page_row['tags']}
+            conn.rollback()
+
+    with stage('template'):
+        return render_template('page_view.html',
+                               page_id=row['id'],
+                               title=row['title'],
+                               content=cached['html'],
+                               page_tags=cached['tags'],
+                               slug=row['slug'])
+
+@app.route('/admin/export')
+def admin_export():
+    """Export wiki ako prúd (?format=ndjson|tar, gzip=1, history=1)."""
+    if not is_admin():
+        return "Nemáte oprávnenie.", 403
+    fmt = 'tar' if request.args.get('format') == 'tar' else 'ndjson'
+    compress = request.args.get('gzip') == '1'
+    history = request.args.get('history') == '1'
+    export = export_tar if fmt == 'tar' else export_ndjson
+    filename = f"wiki-{datetime.now():%Y%m%d-%H%M%S}.{fmt}{'.gz' if compress else ''}"
+    # spojenie z get_db() ostáva požiadavke, kým sa prúd nedopíše
+    body = stream_with_context(export(get_db(), history=history, compress=compress))
+    mimetype = 'application/gzip' if compress else ('application/x-tar' if fmt == 'tar' else 'application/x-ndjson')
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'Cache-Control': 'no-store',
+    })
+
+@app.route('/admin/import', methods=['POST'])
+def admin_import():
+    """
+    Import exportu z poľa 'file' alebo priamo z tela požiadavky (limit
+    MAX_CONTENT_LENGTH, väčšie exporty cez `flask wiki import`). Import
+    zapisuje po dávkach - pri chybe odpoveď v 'imported' uvádza, čo sa
+    zapísať stihlo.
+    """
+    if not is_admin():
+        return jsonify({"error": "Not allowed"}), 403
+    stream = request.files['file'].stream if 'file' in request.files else request.stream
+    conn = get_db()
+    try:
+        stats = import_wiki(conn, stream, log=lambda line: None)
+    except Exception as e:
+        conn.rollback()
+        imported = getattr(e, 'import_stats', {})
+        if imported:
+            finish_import(conn, log=lambda line: None)
+        status = 400 if isinstance(e, ImportFormatError) else 500
+        return jsonify({"error": str(e), "imported": imported}), status
+    rerendered = finish_import(conn, log=lambda line: None)
+    if rerendered is not None:
+        stats['rerendered'] = rerendered
+    return jsonify(stats)
+
+@app.route('/api/backlinks/<int:page_id>')
+def api_backlinks(page_id):
+    if not is_logged_in():
+        return jsonify({"error": "Not logged in"}), 403
+    c = get_db().cursor()
+    return jsonify({"backlinks": page_links.backlinks(c, page_id, include_admin=is_admin())})
+
+def page_access_error(c, page_id):
+    """Chybová odpoveď, ak stránka neexistuje alebo ju používateľ nesmie vidieť."""
+    c.execute("SELECT visible_to FROM pages WHERE id=%s", (page_id,))
+    row = c.fetchone()
+    if not row:
+        return jsonify({"error": "Not found"}), 404
+    if row['visible_to'] == 'Admin' and not is_admin():
+        return jsonify({"error": "Not allowed"}), 403
+    return None
+
+@app.route('/api/page_revisions/<int:page_id>')
+def api_page_revisions(page_id):
+    """Revízie stránky od najnovšej; limit a cursor (next_cursor z predchádzajúcej odpovede)."""
+    if not is_logged_in():
+        return jsonify({"error": "Not logged in"}), 403
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+        cursor = request.args.get('cursor')
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "Neplatné parametre"}), 400
+    c = get_db().cursor()
+    error = page_access_error(c, page_id)
+    if error:
+        return error
+    rows = revisions.list_revisions(c, page_id, limit, cursor)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(rows[-1]['revision'])
+    return jsonify({"revisions": rows, "next_cursor": next_cursor})
+
+@app.route('/api/page_revisions/<int:page_id>/diff')
+def api_page_revision_diff(page_id):
+    """
+    Unified diff dvoch revízií (from, to; predvolene posledná a jej
+    predchodkyňa) po riadkoch: limit a cursor (poradové číslo riadku diffu).
+    """
+    if not is_logged_in():
+        return jsonify({"error": "Not logged in"}), 403
+    try:
+        to_rev = request.args.get('to')
+        to_rev = int(to_rev) if to_rev else None
+        from_rev = request.args.get('from')
+        from_rev = int(from_rev) if from_rev else None
+        limit = min(max(int(request.args.get('limit', 500)), 1), 5000)
+        cursor = max(int(request.args.get('cursor', 0)), 0)
+    except ValueError:
+        return jsonify({"error": "Neplatné parametre"}), 400
+    c = get_db().cursor()
+    error = page_access_error(c, page_id)
+    if error:
+        return error
+    if to_rev is None:
+        to_rev = revisions.latest(c, page_id)
+    if from_rev is None and to_rev is not None:
+        from_rev = max(to_rev - 1, 1)
+    old = revisions.get_content(c, page_id, from_rev) if from_rev else None
+    new = revisions.get_content(c, page_id, to_rev) if to_rev else None
+    if old is None or new is None:
+        return jsonify({"error": "Revízia neexistuje"}), 404
+    lines = revisions.diff_lines(old, new, f'r{from_rev}', f'r{to_rev}')
+    end = cursor + limit
+    return jsonify({
+        "from": from_rev,
+        "to": to_rev,
+        "lines": lines[cursor:end],
+        "total_lines": len(lines),
+        "next_cursor": str(end) if end < len(lines) else None
+    })
+
+@app.route('/api/page_revisions/<int:page_id>/<int:revision>/restore', methods=['POST'])
+def restore_page_revision(page_id, revision):
+    """Obnoví obsah stránky z revízie - ako nová revízia, história sa nestráca."""
+    if not is_admin():
+        return jsonify({"error": "Not allowed"}), 403
+    conn = get_db()
+    c = conn.cursor()
+    try:
+        content = revisions.get_content(c, page_id, revision)
+        if content is None:
+            conn.rollback()
+            return jsonify({"error": "Revízia neexistuje"}), 404
+        content_html, html_version = prerender(content, c)
+        c.execute("""
+            UPDATE pages SET content=%s, updated_at=NOW(), content_html=%s, content_html_version=%s
+            WHERE id=%s
+            RETURNING title, slug
+        """, (content, content_html, html_version, page_id))
+        page = c.fetchone()
+        if not page:
+            conn.rollback()
+            return jsonify({"error": "Not found"}), 404
+        render_cache.invalidate(conn, page_id)
+        page_links.save_links(c, page_id, content)
+        new_revision = revisions.record(c, page_id, page['title'], content, session['user']['id'])
+        history_writer.record_in(c, page_id, session['user']['id'], 'edit')
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"revision": new_revision, "restored_from": revision, "slug": page['slug']})
+
+def parse_time_param(value, end=False):
+    """
+    Dátum alebo dátum a čas v ISO tvare. Pre samotný dátum ako hornú hranicu
+    (end=True) berieme celý deň, t.j. vrátime začiatok nasledujúceho dňa.
+    """
+    parsed = datetime.fromisoformat(value)
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+def parse_history_cursor(value):
+    event_time, _, event_id = value.rpartition('_')
+    return datetime.fromisoformat(event_time), int(event_id)
 
 @app.route('/api/page_history/<int:page_id>')
 def api_page_history(page_id):
+    """
+    História stránky s keyset stránkovaním podľa (event_time, id).
+
+    Parametre: limit, cursor (next_cursor z predchádzajúcej odpovede),
+    order=desc|asc, from/to (ISO dátum alebo čas), type=view|edit
+    a summary=user|day pre súhrnné počty namiesto jednotlivých záznamov.
+    Zobrazenia staršie ako okno retencie sú jeden záznam na deň a
+    používateľa (event_time je len dátum, count je počet zobrazení).
+    """
     if not is_logged_in():
         return jsonify({"error": "Not logged in"}), 403
+
+    try:
+        limit = min(max(int(request.args.get('limit', 100)), 1), 1000)
+        order = request.args.get('order', 'desc').lower()
+        if order not in ('asc', 'desc'):
+            raise ValueError(order)
+        since = request.args.get('from')
+        since = parse_time_param(since) if since else None
+        until = request.args.get('to')
+        until = parse_time_param(until, end=True) if until else None
+        cursor = request.args.get('cursor')
+        cursor = parse_history_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"error": "Neplatné parametre"}), 400
+    event_type = request.args.get('type')
+    if event_type and event_type not in ('view', 'edit'):
+        return jsonify({"error": "Neplatný typ udalosti"}), 400
+    summary = request.args.get('summary')
+    if summary and summary not in ('user', 'day'):
+        return jsonify({"error": "Neplatný súhrn"}), 400
+
+    # Views starších mesiacov sú len v denných súčtoch page_view_daily (history_partitions);
+    # tie sa pripájajú s presnosťou na deň, surové a zrolované views sa neprekrývajú
+    conditions = ["ph.page_id = %s"]
+    params = [page_id]
+    daily_conditions = ["d.page_id = %s"]
+    daily_params = [page_id]
+    if event_type:
+        conditions.append("ph.event_type = %s")
+        params.append(event_type)
+        if event_type != 'view':
+            daily_conditions.append("FALSE")
+    if since:
+        conditions.append("ph.event_time >= %s")
+        params.append(since)
+        daily_conditions.append("d.day >= %s")
+        daily_params.append(since)
+    if until:
+        conditions.append("ph.event_time < %s")
+        params.append(until)
+        daily_conditions.append("d.day < %s")
+        daily_params.append(until)
+    where = " AND ".join(conditions)
+    daily_where = " AND ".join(daily_conditions)
+
     conn = get_db()
     c = conn.cursor()
-    c.execute("""
-        SELECT ph.event_time, ph.event_type,
-               u.first_name, u.last_name
-        FROM page_history ph
-        JOIN users u ON ph.user_id = u.id
-        WHERE ph.page_id = %s
-        ORDER BY ph.event_time ASC
-    """, (page_id,))
+
+    if summary == 'user':
+        c.execute(f"""
+            SELECT s.user_id, u.first_name, u.last_name, s.views, s.edits
+            FROM (
+                SELECT e.user_id, sum(e.views)::bigint AS views, sum(e.edits)::bigint AS edits
+                FROM (
+                    SELECT ph.user_id,
+                           count(*) FILTER (WHERE ph.event_type = 'view') AS views,
+                           count(*) FILTER (WHERE ph.event_type = 'edit') AS edits
+                    FROM page_history ph
+                    WHERE {where}
+                    GROUP BY ph.user_id
+                    UNION ALL
+                    SELECT d.user_id, sum(d.count), 0
+                    FROM page_view_daily d
+                    WHERE {daily_where}
+                    GROUP BY d.user_id
+                ) e
+                GROUP BY e.user_id
+            ) s
+            JOIN users u ON s.user_id = u.id
+            ORDER BY s.views + s.edits DESC, u.last_name, u.first_name
+        """, params + daily_params)
+        return jsonify({"summary": [{
+            "user_id": r["user_id"],
+            "first_name": r["first_name"],
+            "last_name": r["last_name"],
+            "views": r["views"],
+            "edits": r["edits"]
+        } for r in c.fetchall()]})
+
+    if summary == 'day':
+        c.execute(f"""
+            SELECT e.day, sum(e.views)::bigint AS views, sum(e.edits)::bigint AS edits
+            FROM (
+                SELECT to_char(date_trunc('day', ph.event_time), 'YYYY-MM-DD') AS day,
+                       count(*) FILTER (WHERE ph.event_type = 'view') AS views,
+                       count(*) FILTER (WHERE ph.event_type = 'edit') AS edits
+                FROM page_history ph
+                WHERE {where}
+                GROUP BY 1
+                UNION ALL
+                SELECT to_char(d.day, 'YYYY-MM-DD'), sum(d.count), 0
+                FROM page_view_daily d
+                WHERE {daily_where}
+                GROUP BY 1
+            ) e
+            GROUP BY e.day
+            ORDER BY e.day {order.upper()}
+        """, params + daily_params)
+        return jsonify({"summary": [{
+            "day": r["day"],
+            "views": r["views"],
+            "edits": r["edits"]
+        } for r in c.fetchall()]})
+
+    # Zrolovaný deň je jeden záznam s počtom; v poradí má (deň, -user_id), surové id sú kladné
+    if cursor:
+        comparison = '<' if order == 'desc' else '>'
+        where += " AND (ph.event_time, ph.id) %s (%%s, %%s)" % comparison
+        params.extend(cursor)
+        daily_where += " AND (d.day::timestamp, -d.user_id::bigint) %s (%%s, %%s)" % comparison
+        daily_params.extend(cursor)
+    direction = order.upper()
+    c.execute(f"""
+        SELECT e.id, e.event_time, e.event_type, e.count, e.first_name, e.last_name,
+               to_char(e.event_time, CASE WHEN e.rolled_up THEN 'YYYY-MM-DD'
+                                          ELSE 'YYYY-MM-DD HH24:MI:SS' END) AS event_time_str
+        FROM (
+            (SELECT ph.id, ph.event_time, ph.event_type, 1 AS count, FALSE AS rolled_up,
+                    u.first_name, u.last_name
+             FROM page_history ph
+             JOIN users u ON ph.user_id = u.id
+             WHERE {where}
+             ORDER BY ph.event_time {direction}, ph.id {direction}
+             LIMIT %s)
+            UNION ALL
+            (SELECT -d.user_id::bigint, d.day::timestamp, 'view', d.count, TRUE,
+                    u.first_name, u.last_name
+             FROM page_view_daily d
+             JOIN users u ON d.user_id = u.id
+             WHERE {daily_where}
+             ORDER BY 2 {direction}, 1 {direction}
+             LIMIT %s)
+        ) e
+        ORDER BY e.event_time {direction}, e.id {direction}
+        LIMIT %s
+    """, params + [limit + 1] + daily_params + [limit + 1, limit + 1])
     rows = c.fetchall()
 
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = f"{last['event_time'].isoformat()}_{last['id']}"
+
     history = []
     for r in rows:
         history.append({
-            "event_time": r["event_time"].strftime("%Y-%m-%d %H:%M:%S"),  # formátovanie
+            "event_time": r["event_time_str"],
             "event_type": r["event_type"],
+            "count": r["count"],
             "first_name": r["first_name"],
             "last_name": r["last_name"]
         })
 
-    return jsonify({"history": history})
+    return jsonify({"history": history, "next_cursor": next_cursor})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    if not stats_allowed():
+        return jsonify({"error": "Not allowed"}), 403
+    return app.response_class(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/db_pool_stats')
+def api_db_pool_stats():
+    if not stats_allowed():
+        return jsonify({"error": "Not allowed"}), 403
+    return jsonify(db_pool.stats())
+
+@app.route('/api/render_cache_stats')
+def api_render_cache_stats():
+    if not stats_allowed():
+        return jsonify({"error": "Not allowed"}), 403
+    return jsonify(render_cache.stats())
+
+@app.route('/api/index_cache_stats')
+def api_index_cache_stats():
+    if not stats_allowed():
+        return jsonify({"error": "Not allowed"}), 403
+    return jsonify(index_cache.stats())
 
+@app.route('/api/session_stats')
+def api_session_stats():
+    if not stats_allowed():
+        return jsonify({"error": "Not allowed"}), 403
+    return jsonify(app.session_interface.stats())
+
+@app.route('/api/history_writer_stats')
+def api_history_writer_stats():
+    if not stats_allowed():
+        return jsonify({"error": "Not allowed"}), 403
+    return jsonify(history_writer.stats())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,303 @@
+"""
+Statické súbory s hashom obsahu v názve, minifikované a predkomprimované.
+
+`flask build-assets` (pri nasadení) zapíše do ASSET_DIR pre každý súbor
+zo static/ verziu s hashom v názve (css/style.3f2a9c01d4e7.css) a k nej
+.gz a .br (ak je nainštalovaný brotli) plus manifest.json. Šablóny
+volajú asset_url('static', filename=...) s rovnakými argumentmi ako
+url_for; route /assets/ vracia predkomprimovanú variantu podľa
+Accept-Encoding s Cache-Control immutable, takže opakovaná návšteva
+nestiahne nič. Ak manifest chýba alebo nesedí so zdrojmi (veľkosť, mtime),
+zostaví sa pri prvom použití v procese. V debug režime sa používa
+obyčajné /static/, aby sa úpravy prejavili hneď.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+
+from flask import abort, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# formáty, ktoré už sú komprimované
+SKIP_COMPRESSION = frozenset(['.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.woff', '.woff2', '.gz', '.br'])
+MIN_COMPRESS_BYTES = 256
+
+# po týchto kľúčových slovách začína '/' regulárny výraz, nie delenie
+JS_REGEX_KEYWORDS = frozenset(['return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'void',
+                               'yield', 'delete', 'throw', 'new'])
+
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCT_RE = re.compile(r'\s*([{};,>])\s*')
+
+
+def minify_css(text):
+    """Odstráni komentáre a nadbytočné medzery; reťazce nechá tak."""
+    out = []
+    code = []
+
+    def flush():
+        chunk = _CSS_SPACE_RE.sub(' ', ''.join(code))
+        # medzeru pred ':' nechávame ("a :hover" nie je "a:hover")
+        chunk = _CSS_PUNCT_RE.sub(r'\1', chunk).replace(': ', ':').replace(';}', '}')
+        out.append(chunk)
+        code.clear()
+
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = len(text) if end < 0 else end + 2
+            code.append(' ')
+        elif ch in '"\'':
+            flush()
+            j = i + 1
+            while j < len(text) and text[j] != ch:
+                j += 2 if text[j] == '\\' else 1
+            out.append(text[i:j + 1])
+            i = j + 1
+        else:
+            code.append(ch)
+            i += 1
+    flush()
+    return ''.join(out).strip()
+
+
+def minify_js(text):
+    """
+    Konzervatívna minifikácia: zahodí komentáre, odsadenie a prázdne riadky.
+    Konce riadkov ostávajú (automatické bodkočiarky), reťazce, template
+    literály a regulárne výrazy sa kopírujú bez zmeny.
+    """
+    out = []
+    line = []
+    i = 0
+    n = len(text)
+    braces = []  # hĺbka {} v ${...} template literálov
+    last = ''    # posledný významný znak mimo reťazcov a komentárov
+    word = ''    # identifikátor, ktorým končí posledný token (inak '')
+    word_after_dot = False  # obj.in / 2 je delenie - vlastnosť, nie kľúčové slovo
+
+    def end_line():
+        stripped = ''.join(line).strip()
+        if stripped:
+            out.append(stripped)
+        line.clear()
+
+    def copy_string(start, quote):
+        j = start + 1
+        while j < n and text[j] != quote:
+            if text[j] == '\\':
+                j += 1
+            elif quote == '`' and text.startswith('${', j):
+                return j + 2, True
+            j += 1
+        return j + 1, False
+
+    while i < n:
+        ch = text[i]
+        if ch == '\n':
+            end_line()
+            i += 1
+        elif text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end < 0 else end
+        elif text.startswith('/*', i):
+            end = text.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            line.append(' ')
+        elif ch in '"\'`' or (ch == '}' and braces and braces[-1] == 0):
+            if ch == '}':
+                braces.pop()  # pokračovanie template literálu po ${...}
+                quote = '`'
+            else:
+                quote = ch
+            end, interpolation = copy_string(i, quote)
+            line.append(text[i:end])
+            if interpolation:
+                braces.append(0)
+            i = end
+            last = quote
+            word = ''
+        elif ch == '/' and (not last or last in '(,=:[!&|?{};+-*%<>~^'
+                            or (word in JS_REGEX_KEYWORDS and not word_after_dot)):
+            # regulárny výraz (nie delenie)
+            j = i + 1
+            in_class = False
+            while j < n and text[j] != '\n':
+                if text[j] == '\\':
+                    j += 1
+                elif text[j] == '[':
+                    in_class = True
+                elif text[j] == ']':
+                    in_class = False
+                elif text[j] == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and (text[j].isalpha()):
+                j += 1
+            line.append(text[i:j])
+            i = j
+            last = '/'
+            word = ''
+        else:
+            if braces and ch in '{}':
+                braces[-1] += 1 if ch == '{' else -1
+            line.append(ch)
+            if ch.isalnum() or ch in '_$':
+                if not word or not (text[i - 1].isalnum() or text[i - 1] in '_$'):
+                    word_after_dot = last == '.'
+                    word = ''
+                word += ch
+            elif not ch.isspace():
+                word = ''
+            if not ch.isspace():
+                last = ch
+            i += 1
+    end_line()
+    return '\n'.join(out) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _sources(static_dir):
+    for root, _, files in os.walk(static_dir):
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            yield source, os.path.relpath(source, static_dir).replace(os.sep, '/')
+
+
+def source_stamps(static_dir):
+    stamps = {}
+    for source, rel in _sources(static_dir):
+        st = os.stat(source)
+        stamps[rel] = [st.st_size, st.st_mtime_ns]
+    return stamps
+
+
+def build(static_dir, out_dir):
+    """Zostaví súbory s hashom a ich .gz/.br, vráti manifest {pôvodný: s hashom}."""
+    manifest = {}
+    stamps = source_stamps(static_dir)
+    for source, rel in _sources(static_dir):
+        base, ext = os.path.splitext(rel)
+        with open(source, 'rb') as f:
+            data = f.read()
+        minify = MINIFIERS.get(ext.lower())
+        if minify is not None:
+            data = minify(data.decode('utf-8')).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        hashed = f'{base}.{digest}{ext}'
+        target = os.path.join(out_dir, hashed)
+        if not os.path.exists(target):
+            # varianty skôr než samotný súbor - existujúci target znamená hotovú sadu
+            if ext.lower() not in SKIP_COMPRESSION and len(data) >= MIN_COMPRESS_BYTES:
+                _write_atomic(target + '.gz', gzip.compress(data, 9, mtime=0))
+                if brotli is not None:
+                    _write_atomic(target + '.br', brotli.compress(data, quality=11))
+            _write_atomic(target, data)
+        manifest[rel] = hashed
+    data = {'files': manifest, 'sources': stamps}
+    _write_atomic(os.path.join(out_dir, MANIFEST), json.dumps(data, indent=1, sort_keys=True).encode())
+    return manifest
+
+
+class Assets:
+    def __init__(self, app=None, out_dir='static_build', auto_build=True):
+        self.out_dir = out_dir
+        self.auto_build = auto_build
+        self._manifest = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.static_dir = app.static_folder
+        app.jinja_env.globals['asset_url'] = self.url_for
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+
+    def manifest(self):
+        if self._manifest is None:
+            with self._lock:
+                if self._manifest is None:
+                    self._manifest = self._load()
+        return self._manifest
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.out_dir, MANIFEST), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = None
+        if data is not None and (not self.auto_build or data['sources'] == source_stamps(self.static_dir)):
+            return data['files']
+        if not self.auto_build:
+            return {}
+        try:
+            return build(self.static_dir, self.out_dir)
+        except OSError as e:
+            print("Asset build error:", e)
+            return {}
+
+    def rebuild(self):
+        with self._lock:
+            self._manifest = build(self.static_dir, self.out_dir)
+        return self._manifest
+
+    def version(self):
+        """Odtlačok manifestu - patrí do ETagu stránok, ktoré na súbory odkazujú."""
+        if self.app.debug:
+            return ''
+        names = ','.join(sorted(self.manifest().values()))
+        return hashlib.sha256(names.encode()).hexdigest()[:12]
+
+    def url_for(self, endpoint, **values):
+        """Ako flask.url_for; pre 'static' vráti URL súboru s hashom (ak existuje)."""
+        if endpoint == 'static' and not self.app.debug:
+            hashed = self.manifest().get(values.get('filename'))
+            if hashed is not None:
+                values['filename'] = hashed
+                return url_for('assets', **values)
+        return url_for(endpoint, **values)
+
+    def serve(self, filename):
+        # len súbory z manifestu (nie manifest, dočasné súbory ani cesty mimo out_dir)
+        if filename not in self.manifest().values():
+            abort(404)
+        path = os.path.join(self.out_dir, filename)
+        if not os.path.isfile(path):
+            abort(404)
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+                encoding, path = candidate, path + suffix
+                break
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.headers['Cache-Control'] = IMMUTABLE
+        return response
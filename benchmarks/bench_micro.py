@@ -0,0 +1,86 @@
+"""
+Mikro-benchmarky horúcich funkcií: generate_slug, renderovanie markdownu
+a process_images (pôvodný prepis aj responzívne obrázky).
+
+generate_slug beží proti stubu kurzora (meria sa len Python časť), s --dsn
+aj proti skutočnej DB naplnenej cez seed_data.py.
+
+Spustenie (z koreňa repozitára):
+    python benchmarks/bench_micro.py [--repeat 5] [--dsn postgresql://...] [--json micro.json]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import markdown as md
+
+from html_images import process_images, responsive_image_hook
+from page_render import render_html
+from slugs import generate_slug
+from results import save_results
+from sample_data import sample_markdown
+
+
+class StubCursor:
+    """Kurzor, ktorý na dotaz generate_slug vráti vopred dané obsadené slugy."""
+
+    def __init__(self, taken):
+        self.taken = [(s,) for s in taken]
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return self.taken
+
+
+def timed(func, number, repeat):
+    runs = timeit.repeat(func, number=number, repeat=repeat)
+    per_call = [r / number * 1000 for r in runs]
+    return {'best_ms': min(per_call), 'median_ms': statistics.median(per_call), 'calls': number}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--images', type=int, default=50, help='obrázkov na stránku')
+    parser.add_argument('--collisions', type=int, default=500, help='existujúcich "sedenie-N" slugov')
+    parser.add_argument('--dsn', help='aj generate_slug proti skutočnej DB')
+    parser.add_argument('--json', help='uložiť výsledky do JSON súboru')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    text = sample_markdown(rng, args.images)
+    html = md.markdown(text, extensions=['extra'])
+    stub = StubCursor(['sedenie'] + [f'sedenie-{i}' for i in range(2, args.collisions + 2)])
+
+    results = {
+        'generate_slug_stub': timed(lambda: generate_slug('Sedenie', stub), 200, args.repeat),
+        'markdown': timed(lambda: md.markdown(text, extensions=['extra']), 5, args.repeat),
+        'process_images': timed(lambda: process_images(html), 5, args.repeat),
+        'process_images_responsive': timed(lambda: process_images(html, responsive_image_hook()), 5, args.repeat),
+        'render_page': timed(lambda: render_html(text), 5, args.repeat),
+    }
+    if args.dsn:
+        import psycopg2
+        conn = psycopg2.connect(args.dsn)
+        c = conn.cursor()
+        c.execute("SELECT title FROM pages ORDER BY id LIMIT 1")
+        row = c.fetchone()
+        title = row[0] if row else 'Sedenie'
+        results['generate_slug_db'] = timed(lambda: generate_slug(title, c), 50, args.repeat)
+        conn.close()
+
+    for name, result in results.items():
+        print(f"{name:>26}: {result['best_ms']:9.3f} ms (medián {result['median_ms']:.3f} ms)")
+    if args.json:
+        save_results(args.json, 'micro', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Mikro-benchmark: prúdový process_images (html_images) vs. pôvodná verzia
+cez BeautifulSoup, na veľkých stránkach s množstvom obrázkov.
+
+Spustenie (z koreňa repozitára):
+    python benchmarks/bench_process_images.py [--pages 5] [--images 200] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import markdown as md
+from bs4 import BeautifulSoup
+
+from html_images import process_images
+from sample_data import sample_markdown
+
+
+def process_images_bs4(html):
+    # Pôvodná implementácia z app.py, ponechaná ako referencia pre benchmark a test parity
+    soup = BeautifulSoup(html, 'html.parser')
+    imgs = soup.find_all('img')
+    for img in imgs:
+        alt = img.get('alt', '')
+        parts = [p.strip() for p in alt.split('|')]
+        base_alt = parts[0] if parts else 'Obrázok'
+        scale = 100
+        caption = '-'
+        align = 'center'
+        for p in parts[1:]:
+            if p.startswith('scale='):
+                try:
+                    val = int(p.replace('scale=', '').strip())
+                    if val < 10: val = 10
+                    if val > 100: val = 100
+                    scale = val
+                except:
+                    pass
+            elif p.startswith('caption='):
+                caption = p.replace('caption=', '').strip()
+            elif p.startswith('align='):
+                align = p.replace('align=', '').strip().lower()
+
+        img['alt'] = base_alt
+        if not img.get('data-fullsrc'):
+            img['data-fullsrc'] = img.get('src', '')
+
+        figure = soup.new_tag('figure')
+        figure_style = 'background:#f1f1f1; padding:5px; border:1px solid #ccc; clear:both;'
+        if align == 'left':
+            figure_style += f'float:left; margin:0 10px 10px 0; width:{scale}%;'
+        elif align == 'right':
+            figure_style += f'float:right; margin:0 0 10px 10px; width:{scale}%;'
+        else:
+            figure_style += f'margin:0 auto; width:{scale}%; display:block;'
+        figure['style'] = figure_style
+
+        img_style = 'width:100%; display:block; height:auto;'
+        img['style'] = img_style
+
+        img.replace_with(figure)
+        figure.append(img)
+
+        if caption and caption != '-':
+            figcap = soup.new_tag('figcaption')
+            figcap.string = caption
+            figcap['style'] = 'text-align:center; color:#555; font-size:smaller;'
+            figure.append(figcap)
+
+    return str(soup)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--images', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    pages = [md.markdown(sample_markdown(rng, args.images), extensions=['extra'])
+             for _ in range(args.pages)]
+    total_kb = sum(len(p) for p in pages) / 1024
+
+    for html in pages:
+        if process_images(html) != process_images_bs4(html):
+            sys.exit("CHYBA: výstupy sa líšia")
+
+    print(f"{args.pages} stránok, {args.images} obrázkov na stránku, {total_kb:.0f} KiB HTML")
+    results = {}
+    for name, func in (('beautifulsoup', process_images_bs4), ('streaming', process_images)):
+        best = min(timeit.repeat(lambda: [func(p) for p in pages], number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"{name:>14}: {best * 1000 / args.pages:8.2f} ms / stránka")
+    print(f"{'zrýchlenie':>14}: {results['beautifulsoup'] / results['streaming']:8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Úložisko revízií: veľkosť (snapshoty + delty oproti plným kópiám) a latencia
+zápisu, rekonštrukcie a diffu na stránkach so stovkami revízií.
+
+Revízie sa kódujú a skladajú tými istými funkciami ako v revisions.py
+(encode/rebuild), len bez DB - meria sa Python časť. Úpravy sú typické
+zásahy do markdownu: prepísaný odsek, nový odsek alebo obrázok, zmazaný
+blok a občas väčší prepis.
+
+Spustenie (z koreňa repozitára):
+    python benchmarks/bench_revisions.py [--pages 10] [--revisions 300] [--json revisions.json]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import zlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import revisions
+from results import save_results
+from sample_data import WORDS, sample_markdown
+
+
+def edit(rng, content):
+    blocks = content.split('\n\n')
+    action = rng.random()
+    i = rng.randrange(len(blocks))
+    if action < 0.5:
+        blocks[i] = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 80)))
+    elif action < 0.8:
+        blocks.insert(i, sample_markdown(rng, 1))
+    elif action < 0.95 and len(blocks) > 5:
+        del blocks[i]
+    else:
+        # väčší prepis - štvrtina stránky nanovo
+        start = rng.randrange(len(blocks))
+        blocks[start:start + len(blocks) // 4] = sample_markdown(rng, max(1, len(blocks) // 8)).split('\n\n')
+    return '\n\n'.join(blocks)
+
+
+def percentiles(values):
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+    return {'p50_ms': pick(50), 'p95_ms': pick(95), 'max_ms': values[-1]}
+
+
+def build_page(rng, count, images):
+    """Revízie jednej stránky ako riadky page_revisions + obsahy na kontrolu."""
+    rows, contents, encode_ms = [], [], []
+    content = sample_markdown(rng, images)
+    previous, since_snapshot = None, 0
+    for revision in range(1, count + 1):
+        if previous is not None:
+            content = edit(rng, content)
+        started = time.perf_counter()
+        snapshot, data = revisions.encode(previous, content, since_snapshot)
+        encode_ms.append((time.perf_counter() - started) * 1000)
+        since_snapshot = 0 if snapshot else since_snapshot + 1
+        rows.append({'revision': revision, 'snapshot': snapshot, 'data': data})
+        contents.append(content)
+        previous = content
+    return rows, contents, encode_ms
+
+
+def chain(rows, revision):
+    start = max(i for i in range(revision) if rows[i]['snapshot'])
+    return rows[start:revision]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--revisions', type=int, default=300, help='revízií na stránku')
+    parser.add_argument('--images', type=int, default=30, help='obrázkov (kapitol) v prvej revízii')
+    parser.add_argument('--samples', type=int, default=200, help='rekonštrukcií na stránku')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='uložiť výsledky do JSON súboru')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    raw_bytes = full_zlib_bytes = stored_bytes = snapshots = 0
+    encode_ms, rebuild_ms, diff_ms, chain_lengths = [], [], [], []
+    for _ in range(args.pages):
+        rows, contents, page_encode_ms = build_page(rng, args.revisions, args.images)
+        encode_ms.extend(page_encode_ms)
+        for row, content in zip(rows, contents):
+            raw_bytes += len(content.encode('utf-8'))
+            full_zlib_bytes += len(zlib.compress(content.encode('utf-8'), 9))
+            stored_bytes += len(row['data'])
+            snapshots += row['snapshot']
+        for _ in range(args.samples):
+            revision = rng.randint(1, args.revisions)
+            rows_needed = chain(rows, revision)
+            started = time.perf_counter()
+            content = revisions.rebuild(rows_needed)
+            rebuild_ms.append((time.perf_counter() - started) * 1000)
+            chain_lengths.append(len(rows_needed))
+            if content != contents[revision - 1]:
+                sys.exit(f"Revízia {revision} sa nezrekonštruovala správne")
+        for _ in range(args.samples // 10):
+            revision = rng.randint(2, args.revisions)
+            started = time.perf_counter()
+            revisions.diff_lines(contents[revision - 2], contents[revision - 1], 'a', 'b')
+            diff_ms.append((time.perf_counter() - started) * 1000)
+
+    total = args.pages * args.revisions
+    results = {
+        'storage': {
+            'revisions': total,
+            'snapshots': snapshots,
+            'raw_mb': raw_bytes / 1e6,
+            'full_zlib_mb': full_zlib_bytes / 1e6,
+            'stored_mb': stored_bytes / 1e6,
+            'ratio_vs_raw': stored_bytes / raw_bytes,
+            'ratio_vs_full_zlib': stored_bytes / full_zlib_bytes,
+        },
+        'encode': percentiles(encode_ms),
+        'rebuild': dict(percentiles(rebuild_ms), max_chain=max(chain_lengths),
+                        avg_chain=sum(chain_lengths) / len(chain_lengths)),
+        'diff': percentiles(diff_ms),
+    }
+
+    s = results['storage']
+    print(f"revízií {total}, snapshotov {snapshots}")
+    print(f"surový text {s['raw_mb']:.2f} MB, plné kópie (zlib) {s['full_zlib_mb']:.2f} MB, "
+          f"uložené {s['stored_mb']:.2f} MB ({s['ratio_vs_raw']:.1%} surového, "
+          f"{s['ratio_vs_full_zlib']:.1%} plných kópií)")
+    for name in ('encode', 'rebuild', 'diff'):
+        r = results[name]
+        print(f"{name:>8}: p50 {r['p50_ms']:.3f} ms, p95 {r['p95_ms']:.3f} ms, max {r['max_ms']:.3f} ms")
+    print(f"delta na rekonštrukciu: priemer {results['rebuild']['avg_chain'] - 1:.1f}, "
+          f"najviac {results['rebuild']['max_chain'] - 1}")
+    if args.json:
+        save_results(args.json, 'revisions', vars(args), results)
+
+
+if __name__ == '__main__':
+    main()
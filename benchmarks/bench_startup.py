@@ -0,0 +1,93 @@
+"""
+Benchmark štartu workera: čas importu app.py v novom interpreteri a počet
+DB spojení, ktoré pri tom vzniknú.
+
+Voliteľne porovná s inou revíziou (napr. pred zavedením migrácií, keď
+import spúšťal init_db()); tá sa dočasne rozbalí cez `git worktree`.
+Stará revízia potrebuje dostupnú DB v DATABASE_URL.
+
+Spustenie (z koreňa repozitára):
+    python benchmarks/bench_startup.py [--repeat 10] [--ref <revízia>]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+CHILD = r"""
+import json, os, sys, time
+os.chdir(sys.argv[1])
+sys.path.insert(0, sys.argv[1])
+import psycopg2
+_connect = psycopg2.connect
+stats = {'connects': 0, 'connect_ms': 0.0}
+def counting_connect(*args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return _connect(*args, **kwargs)
+    finally:
+        stats['connects'] += 1
+        stats['connect_ms'] += (time.perf_counter() - started) * 1000
+psycopg2.connect = counting_connect
+started = time.perf_counter()
+import app
+stats['import_ms'] = (time.perf_counter() - started) * 1000
+print(json.dumps(stats))
+"""
+
+
+def measure(tree, repeat):
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, '-c', CHILD, tree], capture_output=True, text=True)
+        if proc.returncode != 0:
+            sys.exit(f"CHYBA: import v {tree} zlyhal:\n{proc.stderr.strip()[-2000:]}")
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {
+        'import_ms_median': statistics.median(r['import_ms'] for r in runs),
+        'import_ms_min': min(r['import_ms'] for r in runs),
+        'connects': runs[-1]['connects'],
+        'connect_ms_median': statistics.median(r['connect_ms'] for r in runs),
+    }
+
+
+def report(name, result):
+    print(f"{name:>12}: import {result['import_ms_median']:8.1f} ms (min {result['import_ms_min']:.1f}), "
+          f"DB spojení {result['connects']}, pripájanie {result['connect_ms_median']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--ref', help='git revízia na porovnanie (napr. pred migráciami)')
+    parser.add_argument('--json', help='výsledky uložiť aj do JSON súboru')
+    args = parser.parse_args()
+
+    results = {'current': measure(ROOT, args.repeat)}
+    if args.ref:
+        tree = tempfile.mkdtemp(prefix='bench-startup-')
+        subprocess.run(['git', '-C', ROOT, 'worktree', 'add', '--detach', tree, args.ref],
+                       check=True, capture_output=True)
+        try:
+            results[args.ref] = measure(tree, args.repeat)
+        finally:
+            subprocess.run(['git', '-C', ROOT, 'worktree', 'remove', '--force', tree], capture_output=True)
+
+    for name, result in results.items():
+        report(name, result)
+    if args.ref:
+        before = results[args.ref]['import_ms_median']
+        after = results['current']['import_ms_median']
+        print(f"{'zrýchlenie':>12}: {before / after:8.2f}x")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
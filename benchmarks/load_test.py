@@ -0,0 +1,196 @@
+"""
+HTTP záťažový test wiki: p50/p95/p99 latencia a priepustnosť po endpointoch.
+
+Aplikácia sa spustí v tomto procese (werkzeug, viac vlákien) nad DB
+z DATABASE_URL (naplnenou cez seed_data.py). Google OAuth sa obchádza
+session založenou priamo v úložisku pre existujúceho používateľa, Cloudinary je
+nahradené stubom, takže test nerobí žiadne externé volania.
+S --url sa namiesto toho testuje bežiaci server (napr. gunicorn) nad
+rovnakou DB, takže session z tabuľky sessions platí aj preň.
+
+Spustenie (z koreňa repozitára):
+    python benchmarks/load_test.py [--duration 30] [--concurrency 8] [--json load.json]
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests
+from werkzeug.serving import make_server
+
+from results import save_results
+from sample_data import WORDS
+
+# (meno, váha, funkcia (rng, ciele) -> cesta)
+ENDPOINTS = (
+    ('view_page', 5, lambda rng, t: f"/page/{rng.choice(t['slugs'])}"),
+    ('api_pages', 2, lambda rng, t: '/api/pages?limit=100'),
+    ('api_pages_filtered', 1, lambda rng, t: f"/api/pages?limit=50&mode=and&tags={rng.choice(t['tag_ids'])}"
+                                             f"&q={rng.choice(WORDS)[:3]}"),
+    ('api_page_history', 2, lambda rng, t: f"/api/page_history/{rng.choice(t['page_ids'])}?limit=100"),
+    ('api_page_history_summary', 1, lambda rng, t: f"/api/page_history/{rng.choice(t['page_ids'])}?summary=day"),
+    ('api_tags', 1, lambda rng, t: '/api/tags'),
+    ('api_search', 1, lambda rng, t: f"/api/search?q={rng.choice(WORDS)}"),
+    ('api_list_images', 1, lambda rng, t: '/api/list_images?limit=60'),
+)
+
+
+class StubCloudinaryApi:
+    def resources(self, **kwargs):
+        resources = [{
+            'public_id': f'lehotskydracak/img{i}',
+            'secure_url': f'https://res.cloudinary.com/demo/image/upload/v1/lehotskydracak/img{i}.jpg',
+            'bytes': 100000 + i, 'width': 1200, 'height': 800, 'format': 'jpg',
+            'created_at': '2024-01-01T10:00:00Z',
+        } for i in range(200)]
+        return {'resources': resources}
+
+
+class StubCloudinaryUploader:
+    def destroy(self, public_id):
+        return {'result': 'ok'}
+
+
+def load_targets(wiki):
+    conn = wiki.db_pool.getconn()
+    try:
+        c = conn.cursor()
+        c.execute("SELECT id, email, first_name, last_name, role FROM users ORDER BY role <> 'Admin', id LIMIT 1")
+        user = c.fetchone()
+        c.execute("SELECT id, slug FROM pages WHERE slug IS NOT NULL ORDER BY random() LIMIT 1000")
+        pages = c.fetchall()
+        c.execute("SELECT id FROM tags WHERE name <> 'stránka'")
+        tag_ids = [r['id'] for r in c.fetchall()] or [0]
+        conn.rollback()
+    finally:
+        wiki.db_pool.putconn(conn)
+    if not user or not pages:
+        sys.exit("Prázdna DB - najprv spustite benchmarks/seed_data.py")
+    return dict(user), {
+        'slugs': [p['slug'] for p in pages],
+        'page_ids': [p['id'] for p in pages],
+        'tag_ids': tag_ids,
+    }
+
+
+def session_cookie(wiki, user):
+    # session sa založí priamo v úložisku, cookie nesie len jej id
+    sid = wiki.app.session_interface.create({'user': {
+        'id': user['id'], 'email': user['email'], 'role': user['role'],
+        'first_name': user['first_name'], 'last_name': user['last_name'],
+    }})
+    return wiki.app.config['SESSION_COOKIE_NAME'], sid
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(base_url, cookie, targets, duration, concurrency, seed):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    names = [e[0] for e in ENDPOINTS]
+    weights = [e[1] for e in ENDPOINTS]
+    paths = {e[0]: e[2] for e in ENDPOINTS}
+
+    def worker(worker_id):
+        rng = random.Random(seed + worker_id)
+        http = requests.Session()
+        http.cookies.set(*cookie)
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            url = base_url + paths[name](rng, targets)
+            started = time.perf_counter()
+            try:
+                response = http.get(url, allow_redirects=False, timeout=30)
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                if ok:
+                    latencies[name].append(elapsed)
+                else:
+                    errors[name] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    results = {}
+    for name in names:
+        values = sorted(latencies[name])
+        results[name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'throughput_rps': len(values) / duration,
+            'p50_ms': percentile(values, 50),
+            'p95_ms': percentile(values, 95),
+            'p99_ms': percentile(values, 99),
+            'max_ms': values[-1] if values else None,
+        }
+    total = sum(r['requests'] for r in results.values())
+    results['total'] = {'requests': total, 'errors': sum(errors.values()), 'throughput_rps': total / duration}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--url', help='testovať bežiaci server namiesto aplikácie v procese')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', help='uložiť výsledky do JSON súboru')
+    args = parser.parse_args()
+
+    import app as wiki
+    server = None
+    base_url = args.url
+    if not base_url:
+        wiki.image_catalog.api = StubCloudinaryApi()
+        wiki.cloudinary_uploader = StubCloudinaryUploader()
+        server = make_server('127.0.0.1', args.port, wiki.app, threaded=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{args.port}'
+
+    user, targets = load_targets(wiki)
+    cookie = session_cookie(wiki, user)
+    try:
+        if args.warmup:
+            run_load(base_url, cookie, targets, args.warmup, args.concurrency, args.seed)
+        results = run_load(base_url, cookie, targets, args.duration, args.concurrency, args.seed)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print(f"{'endpoint':<26}{'req':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, r in results.items():
+        if name == 'total':
+            continue
+        fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+        print(f"{name:<26}{r['requests']:>8}{r['errors']:>6}{r['throughput_rps']:>9.1f}"
+              f"{fmt(r['p50_ms'])}{fmt(r['p95_ms'])}{fmt(r['p99_ms'])}")
+    print(f"{'spolu':<26}{results['total']['requests']:>8}{results['total']['errors']:>6}"
+          f"{results['total']['throughput_rps']:>9.1f}")
+    if args.json:
+        params = {k: v for k, v in vars(args).items() if k != 'json'}
+        save_results(args.json, 'load', params, results)
+
+
+if __name__ == '__main__':
+    main()
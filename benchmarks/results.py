@@ -0,0 +1,63 @@
+"""
+Ukladanie výsledkov benchmarkov do JSON a porovnanie dvoch behov.
+
+Súbor obsahuje revíziu gitu, čas, parametre a výsledky (slovník
+meno -> metriky), takže behy z rôznych commitov sa dajú porovnať:
+    python benchmarks/results.py stary.json novy.json
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', '-C', ROOT, 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(path, suite, params, results):
+    data = {
+        'suite': suite,
+        'revision': git_revision(),
+        'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'params': params,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    print(f"Výsledky uložené do {path}")
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+    print(f"{old['suite']}: {old.get('revision')} -> {new.get('revision')}")
+    for name, new_metrics in new['results'].items():
+        old_metrics = old['results'].get(name)
+        if not old_metrics:
+            continue
+        for key, value in new_metrics.items():
+            if not key.endswith(('_ms', '_rps')):
+                continue
+            before = old_metrics.get(key)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or not before:
+                continue
+            change = (value - before) / before * 100
+            print(f"  {name:<28} {key:<14} {before:>12.3f} -> {value:>12.3f}  ({change:+.1f} %)")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit("Použitie: python benchmarks/results.py stary.json novy.json")
+    compare(sys.argv[1], sys.argv[2])
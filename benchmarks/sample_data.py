@@ -0,0 +1,37 @@
+"""
+Generátor realistického obsahu wiki pre benchmarky: markdown stránok
+s obrázkami v tvare `![popis | scale= | caption= | align=](url)`,
+tabuľkami a zoznamami, názvy stránok a štítky.
+"""
+WORDS = ('drak hrad les rytier mapa poklad jaskyňa čarodejník meč štít cesta '
+         'dedina krčma kráľ princezná ostrov loď búrka').split()
+
+TITLE_PREFIXES = ('Sedenie', 'Postava', 'Mesto', 'Dungeon', 'Frakcia', 'Predmet', 'Kúzlo', 'Mapa')
+
+TAG_COLORS = ('#e6194b', '#3cb44b', '#ffe119', '#4363d8', '#f58231', '#911eb4', '#46f0f0', '#f032e6')
+
+
+def sample_markdown(rng, images, words=(30, 90)):
+    blocks = []
+    for i in range(images):
+        text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(*words)))
+        blocks.append(f'## Kapitola {i}\n\n{text} **{rng.choice(WORDS)}** & *{rng.choice(WORDS)}*.')
+        align = rng.choice(['left', 'right', 'center'])
+        scale = rng.choice([25, 40, 50, 75, 100])
+        caption = rng.choice(['-', 'Mapa okolia', 'Hrad "Lehota" & okolie'])
+        blocks.append(f'![Obrázok {i} | scale={scale} | caption={caption} | align={align}]'
+                      f'(https://res.cloudinary.com/demo/image/upload/v1/lehotskydracak/img{i}.jpg)')
+        if i % 10 == 0:
+            blocks.append('| Meno | Rola |\n|---|---|\n| Jano | bojovník |\n| Fero | mág |')
+            blocks.append('* ' + '\n* '.join(rng.choice(WORDS) for _ in range(5)))
+    return '\n\n'.join(blocks)
+
+
+def page_title(rng, index):
+    # veľa kolízií rovnakého základu (napr. "Sedenie"), ako pri skutočných zápisoch z hier
+    prefix = rng.choice(TITLE_PREFIXES)
+    return f'{prefix} {rng.choice(WORDS)} {index}'
+
+
+def tag_name(index):
+    return f'{WORDS[index % len(WORDS)]}-{index}'
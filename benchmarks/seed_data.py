@@ -0,0 +1,137 @@
+"""
+Naplní lokálnu PostgreSQL databázu dátami pre benchmarky: stránky
+s realistickým markdownom (obrázky so syntaxou |scale=|caption=|align=),
+štítky, používatelia a milióny záznamov page_history.
+
+Spustenie (z koreňa repozitára, DATABASE_URL musí ukazovať na testovaciu DB):
+    python benchmarks/seed_data.py --pages 2000 --tags 60 --users 50 --history 5000000 [--reset]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import psycopg2
+from psycopg2.extras import DictCursor, execute_values
+
+import history_partitions
+import migrations
+from slugs import allocate_slug, slug_base
+from sample_data import TAG_COLORS, page_title, sample_markdown, tag_name
+
+HISTORY_BATCH = 1000000
+
+
+def reset(c):
+    c.execute("TRUNCATE page_history, page_tags, pages, tags, users RESTART IDENTITY CASCADE")
+
+
+def seed_users(c, count):
+    rows = [(f'bench{i}@example.com', f'Hráč{i}', 'Benchmark', 'Admin' if i == 0 else 'Player')
+            for i in range(count)]
+    execute_values(c, """
+        INSERT INTO users (email, first_name, last_name, role) VALUES %s
+        ON CONFLICT (email) DO NOTHING
+    """, rows)
+
+
+def seed_tags(c, count):
+    rows = [('stránka', '#cccccc')] + [(tag_name(i), TAG_COLORS[i % len(TAG_COLORS)]) for i in range(count)]
+    execute_values(c, "INSERT INTO tags (name, color) VALUES %s ON CONFLICT (name) DO NOTHING", rows)
+    c.execute("SELECT id, name FROM tags")
+    return {r['name']: r['id'] for r in c.fetchall()}
+
+
+def seed_pages(c, rng, count, tag_ids, max_images):
+    c.execute("SELECT slug FROM pages WHERE slug IS NOT NULL")
+    taken = {r[0] for r in c.fetchall()}
+    c.execute("SELECT coalesce(max(id), 0) FROM pages")
+    offset = c.fetchone()[0]
+    page_tag_id = tag_ids['stránka']
+    other_tags = [tid for name, tid in tag_ids.items() if name != 'stránka']
+
+    for start in range(0, count, 500):
+        rows = []
+        for i in range(start, min(start + 500, count)):
+            title = page_title(rng, offset + i)
+            slug = allocate_slug(slug_base(title), taken)
+            taken.add(slug)
+            content = sample_markdown(rng, rng.randint(0, max_images))
+            visible_to = 'Admin' if rng.random() < 0.1 else 'All'
+            rows.append((title, content, visible_to, slug))
+        page_ids = execute_values(c, """
+            INSERT INTO pages (title, content, visible_to, created_at, updated_at, slug)
+            SELECT v.title, v.content, v.visible_to, NOW(), NOW(), v.slug
+            FROM (VALUES %s) AS v(title, content, visible_to, slug)
+            RETURNING id
+        """, rows, fetch=True)
+        links = []
+        for (page_id,) in page_ids:
+            links.append((page_id, page_tag_id))
+            for tid in rng.sample(other_tags, min(len(other_tags), rng.randint(0, 5))):
+                links.append((page_id, tid))
+        execute_values(c, "INSERT INTO page_tags (page_id, tag_id) VALUES %s ON CONFLICT DO NOTHING", links)
+        print(f"  stránky: {min(start + 500, count)}/{count}")
+
+
+def seed_history(c, count, days, seed):
+    # generuje sa priamo v DB, inak by prenos miliónov riadkov trval dlhšie než samotný INSERT
+    c.execute("SELECT setseed(%s)", (seed % 1000 / 1000.0,))
+    done = 0
+    while done < count:
+        batch = min(HISTORY_BATCH, count - done)
+        c.execute("""
+            INSERT INTO page_history (page_id, user_id, event_type, event_time)
+            SELECT p.ids[1 + floor(random() * array_length(p.ids, 1))::int],
+                   u.ids[1 + floor(random() * array_length(u.ids, 1))::int],
+                   CASE WHEN random() < 0.03 THEN 'edit' ELSE 'view' END,
+                   LOCALTIMESTAMP - random() * make_interval(days => %s)
+            FROM generate_series(1, %s),
+                 (SELECT array_agg(id) AS ids FROM pages) p,
+                 (SELECT array_agg(id) AS ids FROM users) u
+        """, (days, batch))
+        done += batch
+        print(f"  page_history: {done}/{count}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'))
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--tags', type=int, default=60)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--history', type=int, default=1000000)
+    parser.add_argument('--history-days', type=int, default=365)
+    parser.add_argument('--max-images', type=int, default=15)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help='najprv vyprázdni tabuľky (TRUNCATE)')
+    args = parser.parse_args()
+    if not args.dsn:
+        sys.exit("Chýba --dsn alebo DATABASE_URL")
+
+    rng = random.Random(args.seed)
+    conn = psycopg2.connect(args.dsn, cursor_factory=DictCursor)
+    started = time.monotonic()
+    migrations.upgrade(conn)
+    c = conn.cursor()
+    if args.reset:
+        reset(c)
+    seed_users(c, args.users)
+    tag_ids = seed_tags(c, args.tags)
+    seed_pages(c, rng, args.pages, tag_ids, args.max_images)
+    conn.commit()
+    seed_history(c, args.history, args.history_days, args.seed)
+    conn.commit()
+    # staré mesiace skončili v default partícii - presunú sa do mesačných
+    history_partitions.ensure_partitions(c)
+    conn.commit()
+    c.execute("ANALYZE")
+    conn.close()
+    print(f"Hotovo za {time.monotonic() - started:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
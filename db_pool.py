@@ -0,0 +1,210 @@
+import os
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.pool import PoolError
+
+
+# Spojenia zdedené po fork-e v detskom procese nikdy nezatvárame (PQfinish by
+# poslal Terminate cez socket, ktorý stále používa rodič). Držíme ich tu, aby
+# ich nezavrel ani garbage collector.
+_orphaned = []
+
+
+class ConnectionPool:
+    """
+    Pool PostgreSQL spojení pre jeden worker proces.
+
+    Thread-safe (gthread workery), s min/max veľkosťou, health checkom pri
+    výbere spojenia, znovupripojením po reštarte servera a resetom po fork-e.
+    Spojenia sa vytvárajú až pri prvom getconn(), takže vytvorenie poolu
+    nerobí žiadne I/O.
+    """
+
+    def __init__(self, dsn, minconn=1, maxconn=10, timeout=30.0,
+                 check_interval=30.0, **connect_kwargs):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Neplatná veľkosť poolu (min=%s, max=%s)" % (minconn, maxconn))
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_interval = check_interval
+        self.connect_kwargs = connect_kwargs
+
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset_state(self):
+        self._pid = os.getpid()
+        self._idle = []          # [(conn, čas_vrátenia)]
+        self._used = set()       # id() vypožičaných spojení
+        self._prefilled = False
+        self._closed = False
+        self._stats = {
+            'connections_created': 0,
+            'connections_discarded': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'health_check_failures': 0,
+        }
+
+    def _after_fork(self):
+        # Po fork-e nesmieme používať ani zatvárať spojenia rodiča.
+        _orphaned.extend(conn for conn, _ in self._idle)
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._after_fork()
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, **self.connect_kwargs)
+        self._stats['connections_created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        self._stats['connections_discarded'] += 1
+        try:
+            if not conn.closed:
+                conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        status = conn.get_transaction_status()
+        if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - idle_since < self.check_interval:
+            return True
+        try:
+            with conn.cursor() as c:
+                c.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self._stats['health_check_failures'] += 1
+            return False
+
+    def _prefill(self):
+        # volá sa mimo zámku; chyby pripojenia tu ignorujeme, getconn ich zopakuje
+        self._prefilled = True
+        conns = []
+        try:
+            for _ in range(self.minconn):
+                conns.append(self._connect())
+        except psycopg2.OperationalError:
+            pass
+        now = time.monotonic()
+        with self._cond:
+            self._idle.extend((conn, now) for conn in conns)
+            self._cond.notify_all()
+
+    def _total(self):
+        return len(self._idle) + len(self._used)
+
+    def getconn(self):
+        self._check_pid()
+        if self._closed:
+            raise PoolError("connection pool is closed")
+        if not self._prefilled and self.minconn:
+            self._prefill()
+
+        with self._cond:
+            waited_from = None
+            while not self._idle and self._total() >= self.maxconn:
+                if waited_from is None:
+                    waited_from = time.monotonic()
+                    deadline = waited_from + self.timeout
+                    self._stats['waits'] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats['wait_time'] += time.monotonic() - waited_from
+                    self._stats['timeouts'] += 1
+                    raise PoolError("connection pool exhausted")
+                self._cond.wait(remaining)
+            if waited_from is not None:
+                self._stats['wait_time'] += time.monotonic() - waited_from
+
+            if self._idle:
+                conn, idle_since = self._idle.pop()
+            else:
+                conn, idle_since = None, None
+            # miesto rezervujeme ešte pod zámkom
+            placeholder = object()
+            self._used.add(id(placeholder))
+
+        try:
+            if conn is not None and not self._is_healthy(conn, idle_since):
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._used.discard(id(placeholder))
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._used.discard(id(placeholder))
+            self._used.add(id(conn))
+            self._stats['checkouts'] += 1
+        return conn
+
+    def putconn(self, conn, close=False):
+        if self._pid != os.getpid():
+            # spojenie z iného procesu (napr. rodič pred fork-om)
+            _orphaned.append(conn)
+            return
+        with self._cond:
+            if id(conn) not in self._used:
+                raise PoolError("trying to put unkeyed connection")
+
+        if not close and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    close = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    # nepotvrdené zmeny sa zahodia, tak ako pri conn.close()
+                    conn.rollback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                close = True
+
+        with self._cond:
+            self._used.discard(id(conn))
+            if close or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+            self._cond.notify_all()
+
+    def stats(self):
+        self._check_pid()
+        with self._cond:
+            data = dict(self._stats)
+            data['pid'] = self._pid
+            data['min_size'] = self.minconn
+            data['max_size'] = self.maxconn
+            data['idle'] = len(self._idle)
+            data['checked_out'] = len(self._used)
+            data['wait_time'] = round(data['wait_time'], 6)
+        return data
@@ -0,0 +1,229 @@
+"""
+page_history rozdelená podľa mesiacov (PARTITION BY RANGE (event_time)).
+
+Mesačné partície page_history_pYYYYMM zakladá vopred `flask history-maintenance`
+(spúšťa sa z cronu); čo príde mimo nich, zachytí page_history_default a
+údržba to presunie do novej partície. Partície staršie ako okno retencie
+sa zrolujú: udalosti 'view' sa spočítajú do page_view_daily (stránka,
+používateľ, deň), ostatné (úpravy) sa presunú do page_history_archive
+(rozsah od MINVALUE) a mesačná partícia sa zmaže. Views tak existujú buď
+surové, alebo v súčtoch, nikdy v oboch - súčty oboch sa dajú sčítať.
+"""
+import re
+from datetime import date, datetime
+
+PARENT = 'page_history'
+DEFAULT = 'page_history_default'
+ARCHIVE = 'page_history_archive'
+COLUMNS = 'id, page_id, user_id, event_type, event_time'
+
+_PARTITION_RE = re.compile(r'^page_history_p(\d{4})(\d{2})$')
+_UPPER_BOUND_RE = re.compile(r"TO \('([^']+)'\)")
+
+
+def add_months(month, n):
+    years, index = divmod(month.month - 1 + n, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(month):
+    return f'page_history_p{month:%Y%m}'
+
+
+def current_month(c):
+    # podľa hodín DB - event_time je TIMESTAMP v jej časovej zóne
+    c.execute("SELECT date_trunc('month', LOCALTIMESTAMP)::date")
+    return c.fetchone()[0]
+
+
+def create_parent(c):
+    """Partíciovaná page_history (PK musí obsahovať kľúč partície) a default partícia."""
+    c.execute(f"""
+        CREATE TABLE {PARENT} (
+            id BIGINT NOT NULL DEFAULT nextval('page_history_id_seq'),
+            page_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL,
+            event_type TEXT NOT NULL,
+            event_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, event_time)
+        ) PARTITION BY RANGE (event_time)
+    """)
+    c.execute(f"CREATE INDEX page_history_page_time_idx ON {PARENT} (page_id, event_time, id)")
+    c.execute(f"CREATE INDEX page_history_page_type_time_idx ON {PARENT} (page_id, event_type, event_time, id)")
+    c.execute(f"CREATE TABLE {DEFAULT} PARTITION OF {PARENT} DEFAULT")
+
+
+def partitions(c):
+    """({mesiac: názov} mesačných partícií, horná hranica archívu alebo None)."""
+    c.execute("""
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits i
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+    """, (PARENT,))
+    months = {}
+    archive_bound = None
+    for name, bound in c.fetchall():
+        m = _PARTITION_RE.match(name)
+        if m:
+            months[date(int(m.group(1)), int(m.group(2)), 1)] = name
+        elif name == ARCHIVE:
+            archive_bound = datetime.fromisoformat(_UPPER_BOUND_RE.search(bound).group(1)).date()
+    return months, archive_bound
+
+
+def create_partition(c, month):
+    """
+    Založí partíciu mesiaca. Riadky toho mesiaca, ktoré zatiaľ skončili
+    v default partícii, sa do nej presunú ešte pred pripojením (inak by
+    ATTACH zlyhal).
+    """
+    name = partition_name(month)
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    c.execute(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    c.execute(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT} WHERE event_time >= %s AND event_time < %s
+            RETURNING {COLUMNS}
+        )
+        INSERT INTO {name} ({COLUMNS}) SELECT {COLUMNS} FROM moved
+    """, (lower, upper))
+    c.execute(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+    return name
+
+
+def ensure_partitions(c, months_ahead=3):
+    """Partície pre aktuálny a months_ahead ďalších mesiacov a pre riadky v default."""
+    months, archive_bound = partitions(c)
+    first = current_month(c)
+    wanted = {add_months(first, i) for i in range(months_ahead + 1)}
+    c.execute(f"SELECT DISTINCT date_trunc('month', event_time)::date FROM {DEFAULT}")
+    wanted.update(row[0] for row in c.fetchall())
+    created = []
+    for month in sorted(wanted):
+        # archív pokrýva všetko pred svojou hranicou, tam sa partície nezakladajú
+        if month not in months and (archive_bound is None or month >= archive_bound):
+            created.append(create_partition(c, month))
+    return created
+
+
+def rollup_views(c, table):
+    """Presunie udalosti 'view' z tabuľky do denných súčtov, vráti počet udalostí."""
+    c.execute(f"""
+        WITH moved AS (
+            DELETE FROM {table} WHERE event_type = 'view'
+            RETURNING page_id, user_id, event_time
+        ), daily AS (
+            INSERT INTO page_view_daily (page_id, user_id, day, count)
+            SELECT page_id, user_id, event_time::date, count(*) FROM moved
+            GROUP BY 1, 2, 3
+            ON CONFLICT (page_id, day, user_id) DO UPDATE
+            SET count = page_view_daily.count + EXCLUDED.count
+        )
+        SELECT count(*) FROM moved
+    """)
+    return c.fetchone()[0]
+
+
+def _archive_partition(c, name, upper, archive_bound):
+    """Zvyšok mesačnej partície (úpravy) do archívu, ktorého hranica sa posunie na upper."""
+    c.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+    if archive_bound is None:
+        c.execute(f"ALTER TABLE {name} RENAME TO {ARCHIVE}")
+    else:
+        c.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {ARCHIVE}")
+        c.execute(f"INSERT INTO {ARCHIVE} ({COLUMNS}) SELECT {COLUMNS} FROM {name}")
+        c.execute(f"DROP TABLE {name}")
+    c.execute(f"""
+        ALTER TABLE {PARENT} ATTACH PARTITION {ARCHIVE}
+        FOR VALUES FROM (MINVALUE) TO ('{upper.isoformat()}')
+    """)
+
+
+def apply_retention(conn, retention_months, log=print):
+    """
+    Zroluje mesačné partície, ktoré celé ležia pred oknom retention_months
+    (od najstaršej, každú vo vlastnej transakcii). Vráti počet zrolovaných views.
+    """
+    c = conn.cursor()
+    cutoff = add_months(current_month(c), -retention_months)
+    months, archive_bound = partitions(c)
+    conn.commit()
+    total = 0
+    if archive_bound is not None:
+        # napr. staré views z importu, ktoré sa vložili rovno do archívu
+        total += rollup_views(c, ARCHIVE)
+        conn.commit()
+    for month in sorted(months):
+        upper = add_months(month, 1)
+        if upper > cutoff:
+            break
+        name = months[month]
+        try:
+            views = rollup_views(c, name)
+            _archive_partition(c, name, upper, archive_bound)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        archive_bound = upper
+        total += views
+        log(f"  {name}: {views} views do page_view_daily, partícia zrušená")
+    return total
+
+
+def maintain(conn, months_ahead=3, retention_months=None, log=print):
+    """Založí partície dopredu a (ak je retention_months) zroluje staré."""
+    c = conn.cursor()
+    try:
+        created = ensure_partitions(c, months_ahead)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    for name in created:
+        log(f"  založená partícia {name}")
+    rolled_up = apply_retention(conn, retention_months, log) if retention_months else 0
+    return created, rolled_up
+
+
+def _drop_invalid_rows(c, table, log):
+    """
+    Staršie inštalácie nemali na page_history NOT NULL ani FK na pages - také
+    riadky by INSERT do novej tabuľky zhodili, preto sa vynechajú (s výpisom).
+    """
+    c.execute(f"""
+        DELETE FROM {table}
+        WHERE page_id IS NULL OR user_id IS NULL OR event_type IS NULL OR event_time IS NULL
+    """)
+    if c.rowcount:
+        log(f"  {PARENT}: vynechaných {c.rowcount} riadkov s prázdnym stĺpcom")
+    c.execute(f"""
+        DELETE FROM {table} h
+        WHERE NOT EXISTS (SELECT 1 FROM pages p WHERE p.id = h.page_id)
+    """)
+    if c.rowcount:
+        log(f"  {PARENT}: vynechaných {c.rowcount} udalostí zmazaných stránok")
+
+
+def convert_table(c, months_ahead=3, log=print):
+    """Prevedie pôvodnú (nepartíciovanú) page_history - volá ju migrácia."""
+    c.execute(f"ALTER TABLE {PARENT} RENAME TO page_history_old")
+    _drop_invalid_rows(c, 'page_history_old', log)
+    # názvy indexov sú v schéme spoločné - nová tabuľka ich použije
+    c.execute("ALTER TABLE page_history_old DROP CONSTRAINT IF EXISTS page_history_pkey")
+    c.execute("DROP INDEX IF EXISTS page_history_page_time_idx, page_history_page_type_time_idx")
+    create_parent(c)
+    c.execute("""
+        SELECT DISTINCT date_trunc('month', event_time)::date FROM page_history_old
+        WHERE event_time IS NOT NULL
+    """)
+    months = {row[0] for row in c.fetchall()}
+    first = current_month(c)
+    months.update(add_months(first, i) for i in range(months_ahead + 1))
+    for month in sorted(months):
+        create_partition(c, month)
+    c.execute(f"INSERT INTO {PARENT} ({COLUMNS}) SELECT {COLUMNS} FROM page_history_old")
+    # sekvencia id patrila starej tabuľke - bez toho by ju DROP zmazal
+    c.execute(f"ALTER SEQUENCE page_history_id_seq OWNED BY {PARENT}.id")
+    c.execute("DROP TABLE page_history_old")
@@ -0,0 +1,204 @@
+import os
+import queue
+import threading
+import time
+
+from psycopg2.extras import execute_values
+
+
+OVERLOAD_POLICIES = ('block', 'drop', 'sample')
+
+
+class HistoryWriter:
+    """
+    Zápis udalostí do page_history na pozadí, po dávkach.
+
+    Udalosti sa zbierajú v ohraničenej fronte a vlákno ich zapisuje jedným
+    viacriadkovým INSERT-om, keď sa nazbiera batch_size udalostí alebo uplynie
+    flush_interval. Pri plnej fronte record() počká na miesto najviac
+    put_timeout sekúnd (policy 'block', predvolená - spätný tlak na požiadavky);
+    až potom udalosť zahodí. Voliteľne sa udalosti 'view' pri preťažení hneď
+    zahadzujú (policy 'drop') alebo vzorkujú (policy 'sample'), ostatné
+    udalosti vždy čakajú. Dávka, ktorej zápis zlyhá max_retries
+    krát za sebou, sa zahodí (stat failed_events), aby neblokovala frontu.
+    Udalosti, ktoré patria k inej zmene v DB (napr. 'edit'), zapisuje
+    record_in() v jej transakcii.
+
+    Čas udalosti pečiatkuje DB (LOCALTIMESTAMP, rovnaké hodiny ako DEFAULT
+    stĺpca a hranice partícií) - z fronty sa posiela len, ako dlho udalosť čakala.
+    """
+
+    def __init__(self, pool, batch_size=500, flush_interval=1.0, max_queue=10000,
+                 overload_policy='block', put_timeout=2.0, sample_rate=10, max_retries=5,
+                 shutdown_timeout=10.0):
+        if overload_policy not in OVERLOAD_POLICIES:
+            raise ValueError(f"Neznáma overload_policy {overload_policy!r}")
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overload_policy = overload_policy
+        self.put_timeout = put_timeout
+        self.sample_rate = max(1, sample_rate)
+        self.max_retries = max(1, max_retries)
+        self.shutdown_timeout = shutdown_timeout
+        self._lock = threading.Lock()
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._queue = queue.Queue(self.max_queue)
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._stopping = False
+        self._sample_counter = 0
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'sampled_out': 0,
+            'blocked': 0,
+            'put_timeouts': 0,
+            'batches': 0,
+            'flush_errors': 0,
+            'failed_batches': 0,
+            'failed_events': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+        }
+
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+
+    def record(self, page_id, user_id, event_type):
+        self._ensure_started()
+        item = (page_id, user_id, event_type, time.monotonic())
+
+        shed = event_type == 'view' and self.overload_policy != 'block'
+        # pri policy 'sample' necháme z view v preplnenej fronte len každý N-tý
+        if shed and self.overload_policy == 'sample' and self._queue.qsize() >= self.max_queue // 2:
+            self._sample_counter += 1
+            if self._sample_counter % self.sample_rate:
+                self._stats['sampled_out'] += 1
+                return False
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if shed:
+                self._stats['dropped'] += 1
+                return False
+            # spätný tlak: zapisovač zobudíme hneď a počkáme, kým uvoľní miesto
+            self._stats['blocked'] += 1
+            self._wakeup.set()
+            try:
+                self._queue.put(item, timeout=self.put_timeout)
+            except queue.Full:
+                self._stats['put_timeouts'] += 1
+                self._stats['dropped'] += 1
+                return False
+        self._stats['enqueued'] += 1
+        if self._queue.qsize() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def record_in(self, c, page_id, user_id, event_type):
+        """Zapíše udalosť hneď, v transakcii volajúceho (spolu s úpravou stránky)."""
+        c.execute("""
+            INSERT INTO page_history (page_id, user_id, event_type, event_time)
+            VALUES (%s, %s, %s, LOCALTIMESTAMP)
+        """, (page_id, user_id, event_type))
+
+    def _drain(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        started = time.monotonic()
+        conn = self.pool.getconn()
+        try:
+            c = conn.cursor()
+            # stránka mohla byť medzitým zmazaná - takéto udalosti preskočíme;
+            # čas = hodiny DB mínus čakanie vo fronte
+            now = time.monotonic()
+            execute_values(c, """
+                INSERT INTO page_history (page_id, user_id, event_type, event_time)
+                SELECT v.page_id, v.user_id, v.event_type, LOCALTIMESTAMP - make_interval(secs => v.age)
+                FROM (VALUES %s) AS v(page_id, user_id, event_type, age)
+                WHERE EXISTS (SELECT 1 FROM pages p WHERE p.id = v.page_id)
+            """, [(page_id, user_id, event_type, max(0.0, now - enqueued_at))
+                  for page_id, user_id, event_type, enqueued_at in batch], page_size=len(batch))
+            conn.commit()
+        except Exception:
+            self.pool.putconn(conn, close=True)
+            raise
+        self.pool.putconn(conn)
+        elapsed = (time.monotonic() - started) * 1000
+        self._stats['batches'] += 1
+        self._stats['written'] += len(batch)
+        self._stats['last_flush_ms'] = elapsed
+        self._stats['total_flush_ms'] += elapsed
+        self._stats['max_flush_ms'] = max(self._stats['max_flush_ms'], elapsed)
+
+    def _run(self):
+        pending = []
+        attempts = 0
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while True:
+                if not pending:
+                    pending = self._drain()
+                if not pending:
+                    break
+                try:
+                    self._write(pending)
+                    pending = []
+                    attempts = 0
+                except Exception as e:
+                    self._stats['flush_errors'] += 1
+                    attempts += 1
+                    print("History flush error:", e)
+                    if attempts >= self.max_retries:
+                        # napr. chybné dáta - opakovanie by len zapĺňalo frontu
+                        self._stats['failed_batches'] += 1
+                        self._stats['failed_events'] += len(pending)
+                        pending = []
+                        attempts = 0
+                        continue
+                    if self._stopping:
+                        return
+                    time.sleep(self.flush_interval)
+            if self._stopping:
+                return
+
+    def shutdown(self):
+        """Vynúti zápis všetkého, čo je vo fronte (volá sa pri ukončení workera)."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(self.shutdown_timeout)
+
+    def stats(self):
+        data = dict(self._stats)
+        data['queue_depth'] = self._queue.qsize()
+        data['max_queue'] = self.max_queue
+        data['avg_flush_ms'] = data['total_flush_ms'] / data['batches'] if data['batches'] else 0.0
+        for key in ('last_flush_ms', 'max_flush_ms', 'total_flush_ms', 'avg_flush_ms'):
+            data[key] = round(data[key], 3)
+        return data
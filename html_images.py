@@ -0,0 +1,411 @@
+"""
+Prepis <img> tagov vo vyrenderovanom markdowne na <figure> jedným prechodom.
+
+Pôvodne sa to robilo cez BeautifulSoup (parse celého dokumentu do stromu,
+úprava a serializácia). Tento modul číta HTML prúdovo cez html.parser a rovno
+zapisuje výstup. Serializácia zámerne kopíruje správanie BeautifulSoup
+(html.parser builder + formatter "minimal"), aby bol výstup bajt po bajte
+rovnaký ako predtým: zoradené atribúty, <br/> pre prázdne void elementy,
+zlúčenie medzier medzi tagmi, implicitné zatváranie neuzavretých tagov atď.
+
+rewrite_image je pôvodný prepis (bajt po bajte ako BeautifulSoup verzia),
+responsive_image_hook k nemu pridá zmenšené varianty z Cloudinary
+(srcset/sizes, lazy loading, rozmery) - URL sa skladajú len lokálne.
+"""
+import re
+from collections import Counter
+from html.entities import html5
+from html.parser import HTMLParser
+
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr',
+    'basefont', 'bgsound', 'command', 'frame', 'image', 'isindex', 'nextid', 'spacer'
+])
+PRESERVE_WHITESPACE_TAGS = frozenset(['pre', 'textarea'])
+CDATA_CONTAINING_TAGS = frozenset(['script', 'style'])
+LIST_ATTRIBUTES = {
+    '*': ('class', 'accesskey', 'dropzone'),
+    'a': ('rel', 'rev'),
+    'link': ('rel', 'rev'),
+    'td': ('headers',),
+    'th': ('headers',),
+    'form': ('accept-charset',),
+    'object': ('archive',),
+    'area': ('rel',),
+    'icon': ('sizes',),
+    'iframe': ('sandbox',),
+    'output': ('for',),
+}
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+OUTPUT_ENCODING = 'utf-8'
+
+_ENTITIES = {}
+for _name, _char in sorted(html5.items()):
+    _ENTITIES.setdefault(_name[:-1] if _name.endswith(';') else _name, _char)
+
+_NON_WHITESPACE_RE = re.compile(r"\S+")
+_META_CHARSET_RE = re.compile(r"((^|;)\s*charset=)([^;]*)", re.M)
+
+FIGURE_STYLE = 'background:#f1f1f1; padding:5px; border:1px solid #ccc; clear:both;'
+IMG_STYLE = 'width:100%; display:block; height:auto;'
+FIGCAPTION_STYLE = 'text-align:center; color:#555; font-size:smaller;'
+
+CLOUDINARY_UPLOAD_RE = re.compile(r'^(https?://res\.cloudinary\.com/[^/]+/image/upload/)([^?#\s]+)$')
+CLOUDINARY_URL_RE = re.compile(r'https?://res\.cloudinary\.com/[^/\s]+/image/upload/[^\s)"\'<>]+')
+_TRANSFORMATION_RE = re.compile(r'^[a-z]{1,3}_[^,/]+(?:,[a-z]{1,3}_[^,/]+)*$')
+# Šírky variantov v srcset; src (pre prehliadače bez srcset) má DEFAULT_WIDTH
+RESPONSIVE_WIDTHS = (320, 480, 640, 800, 1024, 1280, 1600, 2048)
+DEFAULT_WIDTH = 1024
+# Stĺpec s obsahom stránky je od 768 px (col-md-8) 2/3 šírky okna, inak celá šírka
+CONTENT_BREAKPOINT = 768
+CONTENT_FRACTION = 2 / 3
+# Najširší slot (okno 1920 px, 2x displej) - väčšie varianty by sa nepoužili
+MAX_SLOT_WIDTH = 1920 * 2 * CONTENT_FRACTION
+
+
+def escape_text(value):
+    return value.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def quote_attribute(value):
+    value = escape_text(value)
+    if '"' in value:
+        if "'" in value:
+            return '"' + value.replace('"', '&quot;') + '"'
+        return "'" + value + "'"
+    return '"' + value + '"'
+
+
+def format_attributes(attrs):
+    return ''.join(f' {key}={quote_attribute(value)}' for key, value in sorted(attrs.items()))
+
+
+def parse_image_alt(alt):
+    """Rozparsuje alt v tvare 'popis | scale=50 | caption=... | align=left'."""
+    parts = [p.strip() for p in alt.split('|')]
+    base_alt = parts[0] if parts else 'Obrázok'
+    scale = 100
+    caption = '-'
+    align = 'center'
+    for p in parts[1:]:
+        if p.startswith('scale='):
+            try:
+                val = int(p.replace('scale=', '').strip())
+                if val < 10: val = 10
+                if val > 100: val = 100
+                scale = val
+            except:
+                pass
+        elif p.startswith('caption='):
+            caption = p.replace('caption=', '').strip()
+        elif p.startswith('align='):
+            align = p.replace('align=', '').strip().lower()
+    return base_alt, scale, caption, align
+
+
+def figure_style(scale, align):
+    style = FIGURE_STYLE
+    if align == 'left':
+        style += f'float:left; margin:0 10px 10px 0; width:{scale}%;'
+    elif align == 'right':
+        style += f'float:right; margin:0 0 10px 10px; width:{scale}%;'
+    else:
+        style += f'margin:0 auto; width:{scale}%; display:block;'
+    return style
+
+
+def rewrite_image(attrs):
+    """
+    Upraví atribúty <img> a vráti (začiatok, koniec) obalu <figure>.
+    Atribúty mení na mieste, tak ako to robil pôvodný process_images.
+    """
+    base_alt, scale, caption, align = parse_image_alt(attrs.get('alt', ''))
+    attrs['alt'] = base_alt
+    if not attrs.get('data-fullsrc'):
+        attrs['data-fullsrc'] = attrs.get('src', '')
+    attrs['style'] = IMG_STYLE
+
+    start = f'<figure style={quote_attribute(figure_style(scale, align))}>'
+    end = '</figure>'
+    if caption and caption != '-':
+        end = (f'<figcaption style={quote_attribute(FIGCAPTION_STYLE)}>'
+               f'{escape_text(caption)}</figcaption></figure>')
+    return start, end
+
+
+def find_cloudinary_urls(text):
+    """Cloudinary URL obrázkov v markdowne/HTML (na dohľadanie rozmerov v katalógu)."""
+    return set(CLOUDINARY_URL_RE.findall(text or ''))
+
+
+def cloudinary_variant(url, width):
+    """
+    URL zmenšeného variantu (c_limit nezväčšuje, f_auto/q_auto vyberú formát
+    a kvalitu). None, ak to nie je upload URL z Cloudinary alebo už obsahuje
+    vlastnú transformáciu.
+    """
+    m = CLOUDINARY_UPLOAD_RE.match(url)
+    if not m:
+        return None
+    path = m.group(2)
+    if _TRANSFORMATION_RE.match(path.split('/', 1)[0]) or path.lower().endswith('.svg'):
+        return None
+    return f'{m.group(1)}c_limit,w_{width},f_auto,q_auto/{path}'
+
+
+def image_sizes(scale):
+    """
+    Atribút sizes podľa šírky <figure> (scale % stĺpca, pri každom align
+    rovnaká - align mení len float a vonkajší okraj). Odpočíta sa padding
+    a rámik figure (12 px).
+    """
+    wide = round(scale * CONTENT_FRACTION, 2)
+    return (f'(min-width: {CONTENT_BREAKPOINT}px) calc({wide:g}vw - 12px), '
+            f'calc({scale}vw - 12px)')
+
+
+def srcset_widths(scale, intrinsic_width=None):
+    limit = max(RESPONSIVE_WIDTHS[0], MAX_SLOT_WIDTH * scale / 100)
+    widths = [w for w in RESPONSIVE_WIDTHS if w <= limit]
+    if len(widths) < len(RESPONSIVE_WIDTHS):
+        # jeden väčší variant, aby sa pokryl aj slot tesne nad limitom
+        widths.append(RESPONSIVE_WIDTHS[len(widths)])
+    if intrinsic_width and intrinsic_width < widths[-1]:
+        # menší originál sa nezväčšuje; väčší sa zmenší na varianty vyššie
+        widths = [w for w in widths if w < intrinsic_width] + [intrinsic_width]
+    return widths
+
+
+def responsive_image_hook(dimensions=None):
+    """
+    Hook pre process_images: ako rewrite_image, ale src/srcset ukazujú na
+    zmenšené varianty z Cloudinary a data-fullsrc na originál (lightbox).
+    dimensions je slovník url -> (šírka, výška) z katalógu obrázkov; so
+    známymi rozmermi dostane <img> width/height a stránka pri načítaní neposkakuje.
+    """
+    dimensions = dimensions or {}
+
+    def hook(attrs):
+        src = attrs.get('src', '')
+        scale = parse_image_alt(attrs.get('alt', ''))[1]
+        start, end = rewrite_image(attrs)
+        attrs['loading'] = 'lazy'
+        attrs['decoding'] = 'async'
+        width, height = dimensions.get(src) or (None, None)
+        if width and height:
+            attrs['width'] = str(width)
+            attrs['height'] = str(height)
+        if cloudinary_variant(src, DEFAULT_WIDTH) is None:
+            return start, end
+        widths = srcset_widths(scale, width)
+        attrs['src'] = cloudinary_variant(src, min(DEFAULT_WIDTH, widths[-1]))
+        attrs['srcset'] = ', '.join(f'{cloudinary_variant(src, w)} {w}w' for w in widths)
+        attrs['sizes'] = image_sizes(scale)
+        return start, end
+
+    return hook
+
+
+class _OpenTag:
+    __slots__ = ('name', 'start', 'index', 'has_content', 'suffix')
+
+    def __init__(self, name, start, index, suffix):
+        self.name = name
+        self.start = start
+        self.index = index
+        self.has_content = False
+        self.suffix = suffix
+
+
+class ImageRewriter(HTMLParser):
+    """
+    Prúdový prepisovač HTML. Každý <img> obalí do <figure> pomocou
+    image_hook(attrs) -> (začiatok, koniec) a zvyšok dokumentu serializuje
+    tak, ako by to urobil str(BeautifulSoup(html, 'html.parser')).
+    """
+
+    def __init__(self, image_hook=rewrite_image):
+        super().__init__(convert_charrefs=False)
+        self.image_hook = image_hook
+        self.out = []
+        self.stack = []
+        self.open_counter = Counter()
+        self.preserve_depth = 0
+        self.already_closed_empty = []
+        self.current_data = []
+
+    # ----- výstup -----
+
+    def _content_added(self):
+        # Void element s obsahom sa nevypíše ako <br/>, ale ako <br>...</br>
+        if self.stack:
+            top = self.stack[-1]
+            if top.index is not None and not top.has_content:
+                self.out[top.index] = top.start + '>'
+            top.has_content = True
+
+    def _end_data(self, kind='text'):
+        if not self.current_data:
+            return
+        data = ''.join(self.current_data)
+        self.current_data = []
+        if not self.preserve_depth and not data.strip(ASCII_SPACES):
+            data = '\n' if '\n' in data else ' '
+        self._content_added()
+        if kind == 'text':
+            if self.stack and self.stack[-1].name in CDATA_CONTAINING_TAGS:
+                self.out.append(data)
+            else:
+                self.out.append(escape_text(data))
+        elif kind == 'comment':
+            self.out.append('<!--' + data + '-->')
+        elif kind == 'doctype':
+            self.out.append('<!DOCTYPE ' + data + '>\n')
+        elif kind == 'cdata':
+            self.out.append('<![CDATA[' + data + ']]>')
+        elif kind == 'declaration':
+            self.out.append('<?' + data + '?>')
+        elif kind == 'pi':
+            self.out.append('<?' + data + '>')
+
+    def _output_attributes(self, name, attrs):
+        attrs = dict(attrs)
+        list_attrs = LIST_ATTRIBUTES['*'] + LIST_ATTRIBUTES.get(name, ())
+        for key in attrs:
+            if key in list_attrs:
+                attrs[key] = ' '.join(_NON_WHITESPACE_RE.findall(attrs[key]))
+        if name == 'meta':
+            http_equiv = attrs.get('http-equiv')
+            if 'charset' in attrs:
+                attrs['charset'] = OUTPUT_ENCODING
+            elif ('content' in attrs and http_equiv is not None
+                  and http_equiv.lower() == 'content-type'):
+                attrs['content'] = _META_CHARSET_RE.sub(
+                    lambda m: m.group(1) + OUTPUT_ENCODING, attrs['content'])
+        return format_attributes(attrs)
+
+    def _push(self, name, attrs):
+        self._content_added()
+        suffix = None
+        if name == 'img':
+            prefix, suffix = self.image_hook(attrs)
+            self.out.append(prefix)
+        start = '<' + name + self._output_attributes(name, attrs)
+        if name in VOID_ELEMENTS:
+            self.out.append(None)
+            index = len(self.out) - 1
+        else:
+            self.out.append(start + '>')
+            index = None
+        self.stack.append(_OpenTag(name, start, index, suffix))
+        self.open_counter[name] += 1
+        if name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth += 1
+
+    def _pop(self):
+        tag = self.stack.pop()
+        self.open_counter[tag.name] -= 1
+        if tag.name in PRESERVE_WHITESPACE_TAGS:
+            self.preserve_depth -= 1
+        if tag.index is not None and not tag.has_content:
+            self.out[tag.index] = tag.start + '/>'
+        else:
+            self.out.append('</' + tag.name + '>')
+        if tag.suffix:
+            self.out.append(tag.suffix)
+
+    def _pop_to(self, name):
+        while self.stack and self.open_counter[name]:
+            if self.stack[-1].name == name:
+                self._pop()
+                break
+            self._pop()
+
+    # ----- udalosti html.parser -----
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, handle_empty_element=False)
+        self.handle_endtag(tag)
+
+    def handle_starttag(self, tag, attrs, handle_empty_element=True):
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = '' if value is None else value
+        self._end_data()
+        self._push(tag, attr_dict)
+        if tag in VOID_ELEMENTS and handle_empty_element:
+            self.handle_endtag(tag, check_already_closed=False)
+            self.already_closed_empty.append(tag)
+
+    def handle_endtag(self, tag, check_already_closed=True):
+        if check_already_closed and tag in self.already_closed_empty:
+            self.already_closed_empty.remove(tag)
+        else:
+            self._end_data()
+            self._pop_to(tag)
+
+    def handle_data(self, data):
+        self.current_data.append(data)
+
+    def handle_charref(self, name):
+        if name.startswith('x'):
+            real_name = int(name.lstrip('x'), 16)
+        elif name.startswith('X'):
+            real_name = int(name.lstrip('X'), 16)
+        else:
+            real_name = int(name)
+        data = None
+        if real_name < 256:
+            try:
+                data = bytearray([real_name]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(real_name)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or '\N{REPLACEMENT CHARACTER}')
+
+    def handle_entityref(self, name):
+        character = _ENTITIES.get(name)
+        self.handle_data(character if character is not None else '&%s' % name)
+
+    def handle_comment(self, data):
+        self._end_data()
+        self.handle_data(data)
+        self._end_data('comment')
+
+    def handle_decl(self, data):
+        self._end_data()
+        self.handle_data(data[len('DOCTYPE '):])
+        self._end_data('doctype')
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            kind = 'cdata'
+            data = data[len('CDATA['):]
+        else:
+            kind = 'declaration'
+        self._end_data()
+        self.handle_data(data)
+        self._end_data(kind)
+
+    def handle_pi(self, data):
+        self._end_data()
+        self.handle_data(data)
+        self._end_data('pi')
+
+    def result(self):
+        self._end_data()
+        while self.stack:
+            self._pop()
+        return ''.join(self.out)
+
+
+def process_images(html, image_hook=rewrite_image):
+    parser = ImageRewriter(image_hook)
+    parser.feed(html)
+    parser.close()
+    return parser.result()
@@ -0,0 +1,170 @@
+import threading
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+
+def parse_cloudinary_time(value):
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ')
+
+
+class ImageCatalog:
+    """
+    Lokálny katalóg obrázkov z Cloudinary (tabuľka image_catalog).
+
+    Zoznamy obrázkov sa čítajú z DB namiesto volania Admin API pri každej
+    požiadavke. Katalóg udržiavajú upload/delete a občasné zosúladenie
+    (reconcile) s Cloudinary cez stránkovanie next_cursor. Klient Cloudinary
+    (api) sa dá nahradiť stubom.
+    """
+
+    def __init__(self, api, pool, folder='lehotskydracak', page_size=500, reconcile_interval=3600):
+        self.api = api
+        self.pool = pool
+        self.folder = folder
+        self.page_size = page_size
+        self.reconcile_interval = reconcile_interval
+        self._refreshing = threading.Lock()
+
+    def _row(self, resource):
+        return (
+            resource['public_id'],
+            resource.get('secure_url') or resource.get('url'),
+            resource.get('bytes'),
+            resource.get('width'),
+            resource.get('height'),
+            resource.get('format'),
+            parse_cloudinary_time(resource.get('created_at')) or datetime.utcnow(),
+        )
+
+    def upsert(self, c, resources):
+        rows = [self._row(r) for r in resources]
+        if not rows:
+            return
+        execute_values(c, """
+            INSERT INTO image_catalog (public_id, url, bytes, width, height, format, created_at)
+            VALUES %s
+            ON CONFLICT (public_id) DO UPDATE
+            SET url=EXCLUDED.url, bytes=EXCLUDED.bytes, width=EXCLUDED.width,
+                height=EXCLUDED.height, format=EXCLUDED.format, created_at=EXCLUDED.created_at
+        """, rows)
+
+    def remove(self, c, public_id):
+        c.execute("DELETE FROM image_catalog WHERE public_id=%s", (public_id,))
+
+    def dimensions(self, c, urls):
+        """Slovník url -> (šírka, výška) pre známe obrázky (width/height v <img>)."""
+        if not urls:
+            return {}
+        c.execute("""
+            SELECT url, width, height FROM image_catalog
+            WHERE url = ANY(%s) AND width IS NOT NULL AND height IS NOT NULL
+        """, (list(urls),))
+        return {r[0]: (r[1], r[2]) for r in c.fetchall()}
+
+    def list(self, c, limit=50, cursor=None):
+        """Obrázky od najnovších, keyset stránkovanie podľa (created_at, public_id)."""
+        params = []
+        where = ""
+        if cursor:
+            created_at, _, public_id = cursor.partition('|')
+            where = "WHERE (created_at, public_id) < (%s, %s)"
+            params.extend([datetime.fromisoformat(created_at), public_id])
+        c.execute(f"""
+            SELECT public_id, url, bytes, width, height, format, created_at
+            FROM image_catalog
+            {where}
+            ORDER BY created_at DESC, public_id DESC
+            LIMIT %s
+        """, params + [limit + 1])
+        rows = c.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1]['created_at'].isoformat()}|{rows[-1]['public_id']}"
+        images = [{
+            'public_id': r['public_id'],
+            'url': r['url'],
+            'bytes': r['bytes'],
+            'width': r['width'],
+            'height': r['height'],
+            'format': r['format'],
+            'created_at': r['created_at'].strftime('%Y-%m-%d %H:%M:%S') if r['created_at'] else None,
+        } for r in rows]
+        return images, next_cursor
+
+    def is_stale(self, c):
+        """None = ešte nikdy nezosúladený, inak True/False podľa veku."""
+        c.execute("""
+            SELECT changed_at < CURRENT_TIMESTAMP - make_interval(secs => %s) AS stale
+            FROM cache_versions WHERE name = 'image_catalog'
+        """, (self.reconcile_interval,))
+        row = c.fetchone()
+        return None if row is None else row['stale']
+
+    def refresh(self, conn):
+        """
+        Zosúladí katalóg, ak je starší ako reconcile_interval. Prázdny katalóg
+        sa naplní hneď (požiadavka počká), zastaraný sa obnoví vo vlákne na
+        pozadí s vlastným spojením z poolu.
+        """
+        stale = self.is_stale(conn.cursor())
+        conn.commit()
+        if stale is None:
+            self.reconcile(conn)
+        elif stale and self._refreshing.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_background, name='image-catalog', daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            conn = self.pool.getconn()
+            try:
+                self.reconcile(conn)
+            except Exception:
+                self.pool.putconn(conn, close=True)
+                raise
+            self.pool.putconn(conn)
+        except Exception as e:
+            print("Image catalog reconcile error:", e)
+        finally:
+            self._refreshing.release()
+
+    def reconcile(self, conn):
+        """
+        Prejde všetky obrázky v priečinku cez next_cursor, doplní/aktualizuje
+        katalóg a zmaže z neho, čo už v Cloudinary nie je. Vráti počet obrázkov.
+        Súbežné zosúladenie z iného workera preskočí (advisory lock).
+        """
+        c = conn.cursor()
+        c.execute("SELECT pg_try_advisory_xact_lock(hashtext('image_catalog_reconcile'))")
+        if not c.fetchone()[0]:
+            conn.rollback()
+            return None
+
+        seen = []
+        next_cursor = None
+        while True:
+            kwargs = {'type': 'upload', 'prefix': self.folder + '/', 'max_results': self.page_size}
+            if next_cursor:
+                kwargs['next_cursor'] = next_cursor
+            result = self.api.resources(**kwargs)
+            resources = result.get('resources', [])
+            self.upsert(c, resources)
+            seen.extend(r['public_id'] for r in resources)
+            next_cursor = result.get('next_cursor')
+            if not next_cursor:
+                break
+
+        c.execute("DELETE FROM image_catalog WHERE NOT (public_id = ANY(%s))", (seen,))
+        c.execute("""
+            INSERT INTO cache_versions (name, version, changed_at)
+            VALUES ('image_catalog', 1, CURRENT_TIMESTAMP)
+            ON CONFLICT (name) DO UPDATE
+            SET version = cache_versions.version + 1, changed_at = CURRENT_TIMESTAMP
+        """)
+        conn.commit()
+        return len(seen)
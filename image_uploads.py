@@ -0,0 +1,310 @@
+"""
+Nahrávanie obrázkov mimo požiadavky.
+
+Súbor sa najprv uloží do vlastného spool adresára (s limitom veľkosti), overí
+sa podľa magických bajtov a samotný prenos do úložiska (Cloudinary alebo
+lokálny adresár) beží v exekútore na pozadí. Stav úlohy sa drží v tabuľke
+upload_jobs, aby sa naň dalo pýtať z ktoréhokoľvek workera.
+"""
+import os
+import re
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import psycopg2
+
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+ALLOWED_EXTENSIONS = {'png': 'png', 'jpg': 'jpeg', 'jpeg': 'jpeg', 'gif': 'gif'}
+COPY_BUFFER_SIZE = 64 * 1024
+
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def extension_type(filename):
+    if '.' not in filename:
+        return None
+    return ALLOWED_EXTENSIONS.get(filename.rsplit('.', 1)[1].lower())
+
+
+def sniff_image_type(path):
+    with open(path, 'rb') as f:
+        head = f.read(16)
+    for signature, image_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_type
+    return None
+
+
+def validate_image(path, filename):
+    """Prípona aj obsah musia byť povolený obrázok (a rovnakého typu)."""
+    expected = extension_type(filename)
+    if expected is None:
+        raise UploadError("File not allowed")
+    actual = sniff_image_type(path)
+    if actual is None or actual != expected:
+        raise UploadError("Obsah súboru nie je obrázok typu " + expected)
+    return actual
+
+
+class CloudinaryStorage:
+    def __init__(self, uploader, folder='lehotskydracak'):
+        self.uploader = uploader
+        self.folder = folder
+
+    def store(self, path, filename):
+        return self.uploader.upload(path, folder=self.folder)
+
+
+class LocalStorage:
+    """Náhrada Cloudinary pre vývoj a testy - súbory ukladá do adresára."""
+
+    def __init__(self, directory, base_url='/static/uploads/', folder='lehotskydracak'):
+        self.directory = directory
+        self.base_url = base_url.rstrip('/') + '/'
+        self.folder = folder
+
+    def store(self, path, filename):
+        os.makedirs(self.directory, exist_ok=True)
+        image_type = sniff_image_type(path)
+        name = f'{uuid.uuid4().hex}.{"jpg" if image_type == "jpeg" else image_type}'
+        shutil.copyfile(path, os.path.join(self.directory, name))
+        return {
+            'public_id': f'{self.folder}/{name.rsplit(".", 1)[0]}',
+            'secure_url': self.base_url + name,
+            'bytes': os.path.getsize(path),
+            'format': image_type,
+            'created_at': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        }
+
+
+class UploadSpool:
+    """
+    Dočasné súbory nahrávaných obrázkov. Jednorazový upload sa skopíruje
+    z požiadavky, veľké súbory prichádzajú po častiach (offset = počet bajtov,
+    ktoré server už má), takže prerušený upload sa dá dokončiť.
+    """
+
+    def __init__(self, directory, max_bytes=50 * 1024 * 1024, max_age=24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def _ensure_dir(self):
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _copy(self, stream, f, limit):
+        written = 0
+        while True:
+            buf = stream.read(COPY_BUFFER_SIZE)
+            if not buf:
+                return written
+            written += len(buf)
+            if written > limit:
+                raise UploadError("Súbor je príliš veľký", 413)
+            f.write(buf)
+
+    def save(self, stream):
+        self._ensure_dir()
+        path = os.path.join(self.directory, uuid.uuid4().hex + '.upload')
+        try:
+            with open(path, 'wb') as f:
+                self._copy(stream, f, self.max_bytes)
+        except Exception:
+            self.discard(path)
+            raise
+        return path
+
+    def _part_path(self, upload_id):
+        if not _UPLOAD_ID_RE.match(upload_id or ''):
+            raise UploadError("Neplatné upload_id")
+        return os.path.join(self.directory, upload_id + '.part')
+
+    def start_chunked(self):
+        self._ensure_dir()
+        self.cleanup()
+        upload_id = uuid.uuid4().hex
+        open(self._part_path(upload_id), 'wb').close()
+        return upload_id
+
+    def append_chunk(self, upload_id, offset, stream):
+        """Pripojí časť na koniec a vráti novú veľkosť súboru."""
+        path = self._part_path(upload_id)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            raise UploadError("Neznámy upload", 404)
+        if offset != size:
+            raise UploadError(f"Nesprávny offset, server má {size} bajtov", 409)
+        with open(path, 'ab') as f:
+            try:
+                size += self._copy(stream, f, self.max_bytes - size)
+            except UploadError:
+                f.truncate(offset)
+                raise
+        return size
+
+    def finish_chunked(self, upload_id):
+        path = self._part_path(upload_id)
+        if not os.path.exists(path):
+            raise UploadError("Neznámy upload", 404)
+        final_path = path[:-len('.part')] + '.upload'
+        os.replace(path, final_path)
+        return final_path
+
+    def discard(self, path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+    def cleanup(self):
+        # opustené čiastočné uploady
+        limit = datetime.now().timestamp() - self.max_age
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.unlink(path)
+            except OSError:
+                pass
+
+
+class UploadJobs:
+    """
+    Exekútor prenosov do úložiska. submit() zapíše úlohu (stav 'pending')
+    a vráti jej id, vlákno ju prenesie a stav zmení na 'done' (s url)
+    alebo 'error'. on_stored(cursor, result) beží v tej istej transakcii
+    ako zápis stavu 'done' (napr. doplnenie katalógu obrázkov). Úloha, ktorá
+    nie je hotová ani po stale_after sekundách (napr. worker s ňou skončil),
+    sa pri ďalšom dopyte označí ako 'error'.
+    """
+
+    def __init__(self, pool, storage, spool, max_workers=2, on_stored=None, stale_after=30 * 60):
+        self.pool = pool
+        self.storage = storage
+        self.spool = spool
+        self.max_workers = max_workers
+        self.on_stored = on_stored
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._executor = None
+
+    def _get_executor(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='image-upload')
+        return self._executor
+
+    def submit(self, conn, path, filename):
+        """
+        Zapíše úlohu a spustí prenos. Súbor na path patrí úlohe až po úspešnom
+        návrate - pri výnimke ho upratuje volajúci.
+        """
+        job_id = uuid.uuid4().hex
+        c = conn.cursor()
+        try:
+            c.execute("DELETE FROM upload_jobs WHERE created_at < CURRENT_TIMESTAMP - INTERVAL '1 day'")
+            c.execute("""
+                INSERT INTO upload_jobs (id, status, filename, bytes)
+                VALUES (%s, 'pending', %s, %s)
+            """, (job_id, filename, os.path.getsize(path)))
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+        try:
+            self._get_executor().submit(self._run, job_id, path, filename)
+        except Exception as e:
+            # napr. exekútor po shutdown() - úloha by inak ostala navždy 'pending'
+            try:
+                self._set_status(job_id, 'error', error=str(e))
+            except Exception as e2:
+                print("Image upload status error:", e2)
+            raise UploadError("Prenos sa nepodarilo spustiť", 503)
+        return job_id
+
+    def _set_status(self, job_id, status, result=None, error=None):
+        conn = self.pool.getconn()
+        try:
+            c = conn.cursor()
+            if status == 'done' and self.on_stored is not None:
+                # chyba v on_stored nesmie označiť úspešný upload ako chybný
+                c.execute("SAVEPOINT on_stored")
+                try:
+                    self.on_stored(c, result)
+                except Exception as e:
+                    c.execute("ROLLBACK TO SAVEPOINT on_stored")
+                    print("Image upload on_stored error:", e)
+            c.execute("""
+                UPDATE upload_jobs
+                SET status=%s, url=%s, public_id=%s, error=%s,
+                    finished_at=CASE WHEN %s IN ('done', 'error') THEN CURRENT_TIMESTAMP END
+                WHERE id=%s
+            """, (status,
+                  result.get('secure_url') if result else None,
+                  result.get('public_id') if result else None,
+                  error, status, job_id))
+            conn.commit()
+        except Exception:
+            self.pool.putconn(conn, close=True)
+            raise
+        self.pool.putconn(conn)
+
+    def _run(self, job_id, path, filename):
+        try:
+            self._set_status(job_id, 'running')
+            result = self.storage.store(path, filename)
+            if not result or 'secure_url' not in result:
+                raise UploadError("Upload failed", 500)
+            self._set_status(job_id, 'done', result)
+        except Exception as e:
+            print("Image upload error:", e)
+            try:
+                self._set_status(job_id, 'error', error=str(e))
+            except Exception as e2:
+                print("Image upload status error:", e2)
+        finally:
+            self.spool.discard(path)
+
+    def get(self, conn, job_id):
+        c = conn.cursor()
+        c.execute("""
+            UPDATE upload_jobs
+            SET status='error', error='Prenos sa nedokončil včas', finished_at=CURRENT_TIMESTAMP
+            WHERE id=%s AND status IN ('pending', 'running')
+              AND created_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        """, (job_id, self.stale_after))
+        conn.commit()
+        c.execute("""
+            SELECT id, status, filename, bytes, url, public_id, error
+            FROM upload_jobs WHERE id=%s
+        """, (job_id,))
+        row = c.fetchone()
+        return dict(row) if row else None
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=True)
@@ -0,0 +1,221 @@
+import os
+import select
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+# Kanál, na ktorý posiela trigger bump_cache_version() názov zmenenej časti
+CHANNEL = 'wiki_index'
+
+# Spojenia listenera zdedené po fork-e (rovnako ako v db_pool nezatvárame)
+_orphaned = []
+
+
+def load_tags(c):
+    c.execute("SELECT id, name, color FROM tags WHERE name <> 'stránka' ORDER BY name")
+    return [dict(r) for r in c.fetchall()]
+
+
+def load_pages(c):
+    c.execute("""
+        SELECT p.id, p.title, p.slug, p.visible_to,
+               COALESCE(array_agg(pt.tag_id) FILTER (WHERE pt.tag_id IS NOT NULL), '{}') AS tag_ids
+        FROM pages p
+        LEFT JOIN page_tags pt ON pt.page_id = p.id
+        GROUP BY p.id
+        ORDER BY p.title
+    """)
+    return [dict(r) for r in c.fetchall()]
+
+
+LOADERS = {'tags': load_tags, 'pages': load_pages}
+
+
+class Snapshot:
+    __slots__ = ('name', 'version', 'changed_at', 'rows', 'position', 'loaded_at')
+
+    def __init__(self, name, version, changed_at, rows):
+        self.name = name
+        self.version = version
+        self.changed_at = changed_at
+        self.rows = rows
+        # poradie riadkov je poradie z DB (ORDER BY s jej collation)
+        key = 'title' if name == 'pages' else 'name'
+        self.position = {row[key]: i for i, row in enumerate(rows)}
+        self.loaded_at = time.monotonic()
+
+
+class IndexCache:
+    """
+    Verzovaná cache tabuľky štítkov a indexu stránok (id, title, slug,
+    visible_to, tag_ids) v pamäti workera.
+
+    Každý worker počúva na kanáli CHANNEL vlastným spojením. Trigger
+    bump_cache_version() po každej zmene pages/page_tags/tags pošle NOTIFY
+    s názvom časti ('pages' alebo 'tags') a worker ju zahodí. Kým listener
+    nie je pripojený, snapshot() vracia None a volajúci číta priamo z DB -
+    bez živého listenera by sme nevedeli, či je cache aktuálna.
+
+    Ostatné NOTIFY na kanáli (napr. 'session:<user_id>') dostanú odberatelia
+    zaregistrovaní cez subscribe().
+    """
+
+    def __init__(self, dsn, enabled=True, poll_interval=30.0, reconnect_delay=5.0):
+        self.dsn = dsn
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self.reconnect_delay = reconnect_delay
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._thread = None
+        self._listen_conn = None
+        self._live = False
+        self._snapshots = {}
+        self._generation = {name: 0 for name in LOADERS}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'invalidations': 0,
+            'discarded_loads': 0,
+            'reconnects': 0,
+            'last_load_ms': 0.0,
+        }
+        self._last_notify = {}
+
+    def _after_fork(self):
+        if self._listen_conn is not None:
+            _orphaned.append(self._listen_conn)
+        self._reset()
+
+    def _ensure_started(self):
+        if self._pid != os.getpid():
+            self._after_fork()
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name='index-cache', daemon=True)
+                self._thread.start()
+
+    def invalidate(self, name=None):
+        with self._lock:
+            for key in ([name] if name else list(self._generation)):
+                if key not in self._generation:
+                    continue
+                self._generation[key] += 1
+                self._snapshots.pop(key, None)
+                self._last_notify[key] = time.time()
+            self._stats['invalidations'] += 1
+
+    def subscribe(self, callback):
+        """
+        callback(payload) pre každé NOTIFY na kanáli a callback(None) pri
+        (pre)pripojení listenera, keď sa mohli správy stratiť.
+        """
+        self._subscribers.append(callback)
+
+    def listening(self):
+        """Spustí listener (aj pri vypnutej cache) a vráti, či je pripojený."""
+        self._ensure_started()
+        return self._live
+
+    def _dispatch(self, payload):
+        if payload is None or payload in self._generation:
+            self.invalidate(payload)
+        for callback in self._subscribers:
+            callback(payload)
+
+    def _listen(self):
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                self._listen_conn = conn
+                conn.cursor().execute(f"LISTEN {CHANNEL}")
+                # čo sa zmenilo, kým sme neboli pripojení, nevieme
+                self._dispatch(None)
+                self._live = True
+                while True:
+                    if select.select([conn], [], [], self.poll_interval) == ([], [], []):
+                        # ticho - overíme, že spojenie ešte žije
+                        conn.cursor().execute("SELECT 1")
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except Exception as e:
+                print("Index cache listener error:", e)
+            self._live = False
+            self._dispatch(None)
+            self._listen_conn = None
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._stats['reconnects'] += 1
+            time.sleep(self.reconnect_delay)
+
+    def snapshot(self, conn, name):
+        """
+        Aktuálny Snapshot časti 'tags' alebo 'pages'; pri chýbajúcom ho
+        načíta cez conn. None, ak je cache vypnutá alebo listener nebeží.
+        """
+        if not self.enabled:
+            return None
+        self._ensure_started()
+        if not self._live:
+            self._stats['bypassed'] += 1
+            return None
+        snap = self._snapshots.get(name)
+        if snap is not None:
+            self._stats['hits'] += 1
+            return snap
+        self._stats['misses'] += 1
+
+        generation = self._generation[name]
+        started = time.monotonic()
+        c = conn.cursor()
+        c.execute("SELECT version, changed_at FROM cache_versions WHERE name=%s", (name,))
+        version, changed_at = c.fetchone()
+        snap = Snapshot(name, version, changed_at, LOADERS[name](c))
+        self._stats['last_load_ms'] = (time.monotonic() - started) * 1000
+        with self._lock:
+            # NOTIFY počas načítania - snapshot mohol zachytiť starý stav
+            if generation != self._generation[name] or not self._live:
+                self._stats['discarded_loads'] += 1
+            else:
+                self._snapshots[name] = snap
+        return snap
+
+    def stats(self):
+        data = dict(self._stats)
+        data['enabled'] = self.enabled
+        data['listener_connected'] = self._live
+        data['last_load_ms'] = round(data['last_load_ms'], 3)
+        lookups = data['hits'] + data['misses']
+        data['hit_ratio'] = round(data['hits'] / lookups, 3) if lookups else None
+        now = time.monotonic()
+        data['parts'] = {}
+        for name in LOADERS:
+            snap = self._snapshots.get(name)
+            last_notify = self._last_notify.get(name)
+            data['parts'][name] = {
+                'cached': snap is not None,
+                'version': snap.version if snap else None,
+                'rows': len(snap.rows) if snap else 0,
+                'age_seconds': round(now - snap.loaded_at, 3) if snap else None,
+                'last_invalidation': (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(last_notify))
+                                      if last_notify else None),
+            }
+        return data
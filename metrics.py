@@ -0,0 +1,372 @@
+"""
+Ľahká inštrumentácia požiadaviek a export v textovom formáte Prometheus.
+
+Každý worker si metriky (countery a histogramy) drží v pamäti a vlákno na
+pozadí ich každých pár sekúnd zapíše do súboru v METRICS_DIR (predvolene
+zdieľaný adresár v tempdir). Endpoint /metrics spojí súbory všetkých
+workerov, takže výsledok nezávisí od toho, ktorý worker scrape obslúžil.
+Súbory mŕtvych workerov sa zlúčia do dead.json, aby countery po reštarte
+workera neklesali. Worker je živý, kým drží flock na svojom súbore .alive
+(názov má náhodnú časť) - opätovne použité PID teda nič nepomýli.
+
+Metrika s callback-om (napr. štatistiky poolu spojení) sa neráta cez inc(),
+jej hodnota sa zistí pri každom zápise súboru workera. Gauge mŕtveho
+workera sa zahodí, do dead.json idú len countery a histogramy.
+"""
+import fcntl
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+from psycopg2.extras import DictCursor
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Metric:
+    def __init__(self, registry, name, help_text, kind, buckets=None, callback=None):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.buckets = buckets
+        self.callback = callback
+
+    def inc(self, value=1, **labels):
+        self.registry._add(self, tuple(sorted(labels.items())), value)
+
+    def observe(self, value, **labels):
+        self.registry._add(self, tuple(sorted(labels.items())), value)
+
+
+class Registry:
+    """
+    Metriky jedného procesu. Hodnoty: counter -> [súčet],
+    histogram -> [počty v bucketoch..., súčet, počet].
+    """
+
+    def __init__(self, directory=None, flush_interval=5.0):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.metrics = {}
+        self._lock = threading.Lock()
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # po fork-e: zámok rodiča patrí rodičovi, dieťa zatvorí len svoju kópiu
+        alive = getattr(self, '_alive', None)
+        if alive is not None and self._pid != os.getpid():
+            alive.close()
+        self._pid = os.getpid()
+        self._values = {}
+        self._thread = None
+        self._alive = None
+        self._file_name = f'worker-{self._pid}-{secrets.token_hex(8)}.json'
+
+    def counter(self, name, help_text, callback=None):
+        metric = Metric(self, name, help_text, 'counter', callback=callback)
+        self.metrics[name] = metric
+        return metric
+
+    def gauge(self, name, help_text, callback):
+        metric = Metric(self, name, help_text, 'gauge', callback=callback)
+        self.metrics[name] = metric
+        return metric
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        metric = Metric(self, name, help_text, 'histogram', tuple(buckets))
+        self.metrics[name] = metric
+        return metric
+
+    def _add(self, metric, labels, value):
+        if self._pid != os.getpid():
+            self._reset()
+        key = (metric.name, labels)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(metric.buckets) + 2 if metric.buckets else 1)
+            if metric.kind == 'counter':
+                values[0] += value
+                return
+            for i, bound in enumerate(metric.buckets):
+                if value <= bound:
+                    values[i] += 1
+                    break
+            values[-2] += value
+            values[-1] += 1
+        if self.directory and self._thread is None:
+            self._start_flusher()
+
+    # ----- zdieľanie medzi workermi -----
+
+    def _start_flusher(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True)
+                self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print("Metrics flush error:", e)
+
+    def _snapshot(self):
+        with self._lock:
+            entries = [[name, list(labels), list(values)] for (name, labels), values in self._values.items()]
+        entries.extend([metric.name, [], [metric.callback()]]
+                       for metric in list(self.metrics.values()) if metric.callback)
+        return entries
+
+    def flush(self):
+        if not self.directory or self._pid != os.getpid():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if self._alive is None:
+            # zámok drží proces až do konca; súbor s metrikami vznikne až po ňom
+            self._alive = open(os.path.join(self.directory, _alive_name(self._file_name)), 'w')
+            fcntl.flock(self._alive, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._snapshot(), f)
+        os.replace(tmp_path, os.path.join(self.directory, self._file_name))
+
+    def _merge(self, total, entries):
+        for name, labels, values in entries:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            current = total.get(key)
+            if current is None:
+                total[key] = list(values)
+            else:
+                for i, v in enumerate(values):
+                    current[i] += v
+
+    def collect(self):
+        """Hodnoty všetkých workerov (alebo len tohto procesu bez METRICS_DIR)."""
+        if not self.directory:
+            total = {}
+            self._merge(total, self._snapshot())
+            return total
+        self.flush()
+        total = {}
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            dead_path = os.path.join(self.directory, 'dead.json')
+            dead = {}
+            dead_changed = False
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(self.directory, name)
+                try:
+                    with open(path) as f:
+                        entries = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if name == 'dead.json':
+                    self._merge(dead, entries)
+                    continue
+                if _worker_alive(os.path.join(self.directory, _alive_name(name))):
+                    self._merge(total, entries)
+                else:
+                    self._merge(dead, [e for e in entries if self._kind(e[0]) != 'gauge'])
+                    os.unlink(path)
+                    dead_changed = True
+            dead_entries = [[n, list(l), v] for (n, l), v in dead.items()]
+            if dead_changed:
+                with open(dead_path + '.tmp', 'w') as f:
+                    json.dump(dead_entries, f)
+                os.replace(dead_path + '.tmp', dead_path)
+            self._merge(total, dead_entries)
+        return total
+
+    def _kind(self, name):
+        metric = self.metrics.get(name)
+        return metric.kind if metric else None
+
+    def render(self):
+        total = self.collect()
+        lines = []
+        for metric in self.metrics.values():
+            series = sorted((labels, values) for (name, labels), values in total.items() if name == metric.name)
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for labels, values in series:
+                if metric.kind in ('counter', 'gauge'):
+                    lines.append(f'{metric.name}{_labels(labels)} {_number(values[0])}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets, values):
+                    cumulative += count
+                    lines.append(f'{metric.name}_bucket{_labels(labels + (("le", _number(bound)),))} {cumulative}')
+                lines.append(f'{metric.name}_bucket{_labels(labels + (("le", "+Inf"),))} {values[-1]}')
+                lines.append(f'{metric.name}_sum{_labels(labels)} {_number(values[-2])}')
+                lines.append(f'{metric.name}_count{_labels(labels)} {values[-1]}')
+        return '\n'.join(lines) + '\n'
+
+
+def _alive_name(file_name):
+    return file_name[:-len('.json')] + '.alive'
+
+
+def _worker_alive(alive_path):
+    """Zámok .alive uvoľní až skončenie procesu; ak ho získame, worker je mŕtvy."""
+    try:
+        f = open(alive_path, 'r+')
+    except FileNotFoundError:
+        return False
+    with f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        os.unlink(alive_path)
+        return False
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in labels)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + '}'
+
+
+# bez zdieľaného adresára by /metrics ukázal len worker, ktorý scrape obslúžil
+registry = Registry(os.environ.get('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'lehotskydracak-metrics'))
+
+http_request_duration = registry.histogram(
+    'wiki_http_request_duration_seconds', 'Trvanie HTTP požiadavky podľa endpointu.')
+sql_queries = registry.counter(
+    'wiki_sql_queries_total', 'Počet SQL dotazov podľa endpointu.')
+sql_duration = registry.counter(
+    'wiki_sql_duration_seconds_total', 'Celkový čas SQL dotazov podľa endpointu.')
+sql_queries_per_request = registry.histogram(
+    'wiki_sql_queries_per_request', 'Počet SQL dotazov na jednu požiadavku.', COUNT_BUCKETS)
+render_stage_duration = registry.histogram(
+    'wiki_render_stage_duration_seconds', 'Trvanie fáz renderovania stránky.')
+external_call_duration = registry.histogram(
+    'wiki_external_call_duration_seconds', 'Trvanie volaní externých služieb (Cloudinary).')
+
+
+def _endpoint():
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return 'background'
+
+
+class TimedCursor(DictCursor):
+    """DictCursor, ktorý meria počet a čas dotazov (na požiadavku aj do metrík)."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            _record_query(time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            _record_query(time.perf_counter() - started)
+
+
+def _record_query(elapsed):
+    endpoint = _endpoint()
+    if endpoint != 'background' and 'metrics_sql' in g:
+        g.metrics_sql[0] += 1
+        g.metrics_sql[1] += elapsed
+    sql_queries.inc(endpoint=endpoint)
+    sql_duration.inc(elapsed, endpoint=endpoint)
+
+
+@contextmanager
+def stage(name):
+    """Zmeria fázu renderovania; v požiadavke sa objaví aj v Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        render_stage_duration.observe(elapsed, stage=name)
+        if has_request_context() and 'metrics_stages' in g:
+            g.metrics_stages.append((name, elapsed))
+
+
+class TimedClient:
+    """Obal klienta externej služby (napr. cloudinary.api) - meria každé volanie."""
+
+    def __init__(self, client, service):
+        self._client = client
+        self._service = service
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            status = 'ok'
+            try:
+                return attr(*args, **kwargs)
+            except Exception:
+                status = 'error'
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                external_call_duration.observe(elapsed, service=self._service, operation=name, status=status)
+                if has_request_context() and 'metrics_stages' in g:
+                    g.metrics_stages.append((f'{self._service}-{name}', elapsed))
+        return timed
+
+
+def init_app(app, server_timing=True):
+    def start_request():
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+        g.metrics_stages = []
+
+    def finish_request(response):
+        if 'metrics_started' not in g or g.get('metrics_done'):
+            return response
+        g.metrics_done = True
+        elapsed = time.perf_counter() - g.metrics_started
+        endpoint = request.endpoint or 'unknown'
+        http_request_duration.observe(elapsed, endpoint=endpoint, method=request.method,
+                                      status=str(response.status_code))
+        sql_queries_per_request.observe(g.metrics_sql[0], endpoint=endpoint)
+        if server_timing:
+            parts = [f'db;dur={g.metrics_sql[1] * 1000:.1f};desc="{g.metrics_sql[0]} queries"']
+            parts.extend(f'{name};dur={value * 1000:.1f}' for name, value in g.metrics_stages)
+            parts.append(f'total;dur={elapsed * 1000:.1f}')
+            response.headers.add('Server-Timing', ', '.join(parts))
+        return response
+
+    def failed_request(exception):
+        # nespracovaná výnimka - after_request sa nezavolal
+        if exception is not None and 'metrics_started' in g and not g.get('metrics_done'):
+            g.metrics_done = True
+            http_request_duration.observe(time.perf_counter() - g.metrics_started,
+                                          endpoint=request.endpoint or 'unknown',
+                                          method=request.method, status='500')
+
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.teardown_request(failed_request)
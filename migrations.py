@@ -0,0 +1,384 @@
+"""
+Verzované migrácie schémy.
+
+Schéma sa už nevytvára pri importe aplikácie; spúšťa sa príkazom
+`flask db upgrade` (pri nasadení, pred štartom workerov). Každá migrácia
+beží vo vlastnej transakcii a po úspechu sa zapíše do schema_version.
+Prvé migrácie používajú IF NOT EXISTS, aby ich šlo bez problémov pustiť
+aj na databázu, ktorú ešte vytvoril pôvodný init_db().
+"""
+import time
+
+from psycopg2.extras import execute_values
+
+import history_partitions
+import revisions
+from index_cache import CHANNEL as INDEX_CACHE_CHANNEL
+from page_links import extract_links
+from slugs import repair_slugs
+
+MIGRATIONS = []
+# riadkov na jedno fetchmany pri dopĺňaní dát zo všetkých stránok
+BACKFILL_BATCH_SIZE = 500
+
+
+def migration(version, description):
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return register
+
+
+@migration(1, 'pages, tags, page_tags, users')
+def _base_tables(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            id SERIAL PRIMARY KEY,
+            title TEXT UNIQUE NOT NULL,
+            content TEXT,
+            visible_to TEXT NOT NULL DEFAULT 'All',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            slug TEXT
+        );
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS tags (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            color TEXT NOT NULL
+        );
+    """)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS page_tags (
+            page_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            PRIMARY KEY(page_id, tag_id),
+            FOREIGN KEY (page_id) REFERENCES pages(id) ON DELETE CASCADE,
+            FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+        );
+    """)
+    # pre filtrovanie stránok podľa štítku (PK page_tags je (page_id, tag_id))
+    c.execute("CREATE INDEX IF NOT EXISTS page_tags_tag_page_idx ON page_tags (tag_id, page_id)")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            email TEXT NOT NULL,
+            first_name TEXT,
+            last_name TEXT,
+            role TEXT NOT NULL DEFAULT 'Player'
+        );
+    """)
+    # ON CONFLICT (email) v load_or_create_user
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS users_email_key ON users (email);")
+
+
+@migration(2, 'unique page slugs')
+def _page_slugs(c):
+    # pred vytvorením indexu opravíme prípadné duplicity
+    c.execute("SELECT to_regclass('pages_slug_key') IS NULL")
+    if c.fetchone()[0]:
+        repair_slugs(c)
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS pages_slug_key ON pages (slug);")
+    # LIKE 'slug-%' pri hľadaní voľného slugu
+    c.execute("CREATE INDEX IF NOT EXISTS pages_slug_pattern_idx ON pages (slug text_pattern_ops);")
+
+
+@migration(3, 'fulltext search')
+def _fulltext(c):
+    # unaccent + 'simple' slovník, aby sa diakritika normalizovala
+    # rovnako ako pri slugoch (remove_diacritics)
+    c.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    c.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'wiki_sk') THEN
+                CREATE TEXT SEARCH CONFIGURATION wiki_sk (COPY = simple);
+                ALTER TEXT SEARCH CONFIGURATION wiki_sk
+                    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple;
+            END IF;
+        END
+        $$;
+    """)
+    c.execute("""
+        ALTER TABLE pages ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('wiki_sk', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('wiki_sk', coalesce(content, '')), 'B')
+        ) STORED
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS pages_search_idx ON pages USING GIN (search_vector)")
+
+
+@migration(4, 'page_history')
+def _page_history(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS page_history (
+            id BIGSERIAL PRIMARY KEY,
+            page_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL,
+            event_type TEXT NOT NULL,
+            event_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    # staršie inštalácie mohli mať page_history bez id - potrebujeme ho pre keyset stránkovanie
+    c.execute("ALTER TABLE page_history ADD COLUMN IF NOT EXISTS id BIGSERIAL")
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS page_history_page_time_idx
+        ON page_history (page_id, event_time, id)
+    """)
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS page_history_page_type_time_idx
+        ON page_history (page_id, event_type, event_time, id)
+    """)
+
+
+@migration(5, 'render cache, cache versions and NOTIFY triggers')
+def _cache_versions(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS page_render_cache (
+            page_id INTEGER PRIMARY KEY REFERENCES pages(id) ON DELETE CASCADE,
+            updated_at TIMESTAMP NOT NULL,
+            html TEXT NOT NULL,
+            tags JSON NOT NULL
+        );
+    """)
+    # Verzie pre podmienené odpovede (ETag) - zvyšujú ich triggre pri každej zmene
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS cache_versions (
+            name TEXT PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 1,
+            changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    c.execute("INSERT INTO cache_versions (name) VALUES ('pages'), ('tags') ON CONFLICT DO NOTHING")
+    c.execute("""
+        CREATE OR REPLACE FUNCTION bump_cache_version() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE cache_versions
+            SET version = version + 1, changed_at = CURRENT_TIMESTAMP
+            WHERE name = TG_ARGV[0];
+            -- workery si podľa toho zahodia index_cache (doručí sa až po COMMIT)
+            PERFORM pg_notify('%s', TG_ARGV[0]);
+            RETURN NULL;
+        END
+        $$;
+    """ % INDEX_CACHE_CHANNEL)
+    for table, version_name in (('pages', 'pages'), ('page_tags', 'pages'), ('tags', 'tags')):
+        c.execute(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = '{table}_cache_version') THEN
+                    CREATE TRIGGER {table}_cache_version
+                    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                    FOR EACH STATEMENT EXECUTE FUNCTION bump_cache_version('{version_name}');
+                END IF;
+            END
+            $$;
+        """)
+
+
+@migration(6, 'image catalog and upload jobs')
+def _images(c):
+    # Katalóg obrázkov z Cloudinary (zoznamy sa nečítajú z Admin API pri každej požiadavke)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS image_catalog (
+            public_id TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            bytes BIGINT,
+            width INTEGER,
+            height INTEGER,
+            format TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS image_catalog_created_idx
+        ON image_catalog (created_at DESC, public_id DESC);
+    """)
+    # Úlohy nahrávania obrázkov (stav sa pýta z ľubovoľného workera)
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS upload_jobs (
+            id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            filename TEXT,
+            bytes BIGINT,
+            url TEXT,
+            public_id TEXT,
+            error TEXT,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+    """)
+
+
+@migration(7, 'page links and slug redirects')
+def _page_links(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS page_links (
+            source_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+            target_slug TEXT NOT NULL,
+            PRIMARY KEY (source_id, target_slug)
+        );
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS page_links_target_idx ON page_links (target_slug);")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS slug_redirects (
+            old_slug TEXT PRIMARY KEY,
+            page_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS slug_redirects_page_idx ON slug_redirects (page_id);")
+    # Odkazy existujúcich stránok - pomenovaný (serverový) kurzor, obsah všetkých
+    # stránok sa do pamäte nenačíta naraz
+    pages = c.connection.cursor(name='migration_page_links')
+    pages.execute("SELECT id, content FROM pages")
+    while True:
+        batch = pages.fetchmany(BACKFILL_BATCH_SIZE)
+        if not batch:
+            break
+        rows = [(r[0], slug) for r in batch for slug in extract_links(r[1])]
+        if rows:
+            execute_values(c, "INSERT INTO page_links (source_id, target_slug) VALUES %s ON CONFLICT DO NOTHING",
+                           rows, page_size=1000)
+    pages.close()
+
+
+@migration(8, 'pre-rendered page HTML')
+def _content_html(c):
+    # vypĺňa sa pri zápise (RENDER_MODE=write) a príkazom flask rerender-pages
+    c.execute("ALTER TABLE pages ADD COLUMN IF NOT EXISTS content_html TEXT")
+    c.execute("ALTER TABLE pages ADD COLUMN IF NOT EXISTS content_html_version TEXT")
+
+
+@migration(9, 'server-side sessions')
+def _sessions(c):
+    # id je sha256 hodnoty cookie, data sú session vo formáte TaggedJSONSerializer
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+            data JSONB NOT NULL,
+            expires_at TIMESTAMP NOT NULL
+        );
+    """)
+    c.execute("CREATE INDEX IF NOT EXISTS sessions_user_idx ON sessions (user_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS sessions_expires_idx ON sessions (expires_at)")
+
+
+@migration(10, 'monthly partitioned page_history and page_view_daily')
+def _partitioned_history(c):
+    # denné súčty zobrazení z partícií starších ako okno retencie
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS page_view_daily (
+            page_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (page_id, day, user_id)
+        );
+    """)
+    c.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('page_history')")
+    if c.fetchone()[0] != 'p':
+        history_partitions.convert_table(c)
+
+
+@migration(11, 'page revisions (snapshots and deltas)')
+def _page_revisions(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS page_revisions (
+            page_id INTEGER NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+            revision INTEGER NOT NULL,
+            snapshot BOOLEAN NOT NULL,
+            data BYTEA NOT NULL,
+            title TEXT NOT NULL,
+            content_length INTEGER NOT NULL,
+            user_id INTEGER,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (page_id, revision)
+        );
+    """)
+    # hľadanie posledného snapshotu pred revíziou
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS page_revisions_snapshot_idx
+        ON page_revisions (page_id, revision) WHERE snapshot
+    """)
+    # Súčasný obsah existujúcich stránok je ich prvá revízia (serverový kurzor ako v migrácii 7)
+    pages = c.connection.cursor(name='migration_page_revisions')
+    pages.execute("""
+        SELECT p.id, p.title, p.content FROM pages p
+        WHERE NOT EXISTS (SELECT 1 FROM page_revisions r WHERE r.page_id = p.id)
+    """)
+    while True:
+        rows = pages.fetchmany(BACKFILL_BATCH_SIZE)
+        if not rows:
+            break
+        execute_values(c, revisions.INSERT_SNAPSHOTS, revisions.snapshot_rows(rows), page_size=len(rows))
+    pages.close()
+
+
+@migration(12, 'tags version in render cache key')
+def _render_cache_tags_version(c):
+    # položky sa kľúčujú aj verziou štítkov (cache_versions 'tags')
+    c.execute("DELETE FROM page_render_cache")
+    c.execute("ALTER TABLE page_render_cache ADD COLUMN IF NOT EXISTS tags_version BIGINT NOT NULL DEFAULT 0")
+
+
+def _ensure_version_table(c):
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+
+
+def applied_versions(conn):
+    c = conn.cursor()
+    c.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+    if not c.fetchone()[0]:
+        conn.rollback()
+        return set()
+    c.execute("SELECT version FROM schema_version")
+    versions = {row[0] for row in c.fetchall()}
+    conn.rollback()
+    return versions
+
+
+def pending(conn):
+    done = applied_versions(conn)
+    return [m for m in MIGRATIONS if m[0] not in done]
+
+
+def upgrade(conn, target=None, log=print):
+    """
+    Spustí čakajúce migrácie (do verzie target vrátane). Súbežné spustenie
+    z viacerých procesov serializuje advisory lock. Vráti zoznam verzií.
+    """
+    applied = []
+    for version, description, func in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        c = conn.cursor()
+        c.execute("SELECT pg_advisory_xact_lock(hashtext('schema_version'))")
+        _ensure_version_table(c)
+        c.execute("SELECT 1 FROM schema_version WHERE version=%s", (version,))
+        if c.fetchone():
+            conn.commit()
+            continue
+        started = time.monotonic()
+        try:
+            func(c)
+            c.execute("INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                      (version, description))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        log(f"{version:>4}  {description}  ({(time.monotonic() - started) * 1000:.0f} ms)")
+        applied.append(version)
+    return applied
@@ -0,0 +1,92 @@
+"""
+Interné odkazy medzi stránkami (/page/<slug> v markdowne).
+
+Množina odkazov sa extrahuje pri uložení stránky do tabuľky page_links,
+takže "Čo sem odkazuje" je jeden indexovaný dotaz. Pri premenovaní stránky
+sa starý slug zapíše do slug_redirects a ďalej vedie na tú istú stránku.
+"""
+import re
+from urllib.parse import unquote
+
+# [text](/page/slug), [id]: /page/slug, <a href="/page/slug"> (aj s hostom)
+_LINK_RE = re.compile(r"""
+    (?: \]\(\s*<?                  # inline odkaz / obrázok
+      | ^[ ]{0,3}\[[^\]]+\]:\s*<?  # referencia
+      | href\s*=\s*["']            # HTML
+    )
+    (?:https?://[^/\s)"'>]+)?
+    /page/([^\s)"'>#?]+)
+""", re.VERBOSE | re.MULTILINE | re.IGNORECASE)
+
+
+def extract_links(content):
+    """Množina slugov, na ktoré obsah stránky odkazuje."""
+    slugs = set()
+    for m in _LINK_RE.finditer(content or ''):
+        slug = unquote(m.group(1)).rstrip('/')
+        if slug:
+            slugs.add(slug)
+    return slugs
+
+
+def save_links(c, page_id, content):
+    """Prepíše odkazy stránky podľa obsahu (len rozdiel, jedným príkazom)."""
+    c.execute("""
+        WITH targets AS (
+            SELECT DISTINCT unnest(%(slugs)s::text[]) AS target_slug
+        ), removed AS (
+            DELETE FROM page_links l
+            WHERE l.source_id = %(page_id)s
+              AND l.target_slug NOT IN (SELECT target_slug FROM targets)
+        )
+        INSERT INTO page_links (source_id, target_slug)
+        SELECT %(page_id)s, t.target_slug FROM targets t
+        ON CONFLICT DO NOTHING
+    """, {'slugs': sorted(extract_links(content)), 'page_id': page_id})
+
+
+def record_rename(c, page_id, old_slug, new_slug):
+    """
+    Starý slug bude presmerovaný na stránku. Nový slug už presmerovaním
+    byť nesmie (inak by ho zatienilo, keby ho stránka neskôr opustila).
+    """
+    c.execute("DELETE FROM slug_redirects WHERE old_slug = %s", (new_slug,))
+    if old_slug and old_slug != new_slug:
+        c.execute("""
+            INSERT INTO slug_redirects (old_slug, page_id) VALUES (%s, %s)
+            ON CONFLICT (old_slug) DO UPDATE SET page_id = EXCLUDED.page_id, created_at = NOW()
+        """, (old_slug, page_id))
+
+
+def claim_slug(c, slug):
+    """Nová stránka so slugom, ktorý bol presmerovaním, ho prevezme."""
+    c.execute("DELETE FROM slug_redirects WHERE old_slug = %s", (slug,))
+
+
+def resolve_redirect(c, slug):
+    """Aktuálny slug stránky pre starý slug, alebo None."""
+    c.execute("""
+        SELECT p.slug FROM slug_redirects r
+        JOIN pages p ON p.id = r.page_id
+        WHERE r.old_slug = %s
+    """, (slug,))
+    row = c.fetchone()
+    return row[0] if row else None
+
+
+def backlinks(c, page_id, include_admin=False):
+    """Stránky, ktoré odkazujú na page_id (aktuálnym aj starým slugom)."""
+    c.execute("""
+        SELECT DISTINCT p.id, p.title, p.slug
+        FROM page_links l
+        JOIN pages p ON p.id = l.source_id
+        WHERE l.target_slug IN (
+                SELECT slug FROM pages WHERE id = %(page_id)s
+                UNION ALL
+                SELECT old_slug FROM slug_redirects WHERE page_id = %(page_id)s
+              )
+          AND p.id <> %(page_id)s
+          AND (%(include_admin)s OR p.visible_to <> 'Admin')
+        ORDER BY p.title
+    """, {'page_id': page_id, 'include_admin': include_admin})
+    return [dict(r) for r in c.fetchall()]
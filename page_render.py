@@ -0,0 +1,81 @@
+"""
+Renderovanie markdownu stránok do HTML.
+
+V režime RENDER_MODE=write sa HTML vyrenderuje pri uložení stránky do
+pages.content_html spolu s verziou renderera. Keď sa renderer zmení
+(RENDERER_REVISION, rozšírenia markdownu, html_images), staré HTML sa
+prerenderuje príkazom `flask rerender-pages` paralelne v procesoch.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import markdown as md
+from psycopg2.extras import execute_values
+
+from html_images import find_cloudinary_urls, process_images, responsive_image_hook
+
+MARKDOWN_EXTENSIONS = ['extra']
+# Zvýšiť pri každej zmene výstupu renderovania
+RENDERER_REVISION = 2
+RENDERER_VERSION = f'{RENDERER_REVISION}/markdown-{md.__version__}'
+
+
+def render_markdown(content):
+    return md.markdown(content or '', extensions=MARKDOWN_EXTENSIONS)
+
+
+def render_images(html, dimensions=None):
+    return process_images(html, responsive_image_hook(dimensions))
+
+
+def render_html(content, dimensions=None):
+    """dimensions: url -> (šírka, výška) obrázkov z katalógu (ImageCatalog.dimensions)."""
+    return render_images(render_markdown(content), dimensions)
+
+
+def _render_rows(rows, dimensions):
+    return [(page_id, render_html(content, dimensions), updated_at, RENDERER_VERSION)
+            for page_id, content, updated_at in rows]
+
+
+def _batch_dimensions(rows, dimensions):
+    urls = set()
+    for _, content, _ in rows:
+        urls |= find_cloudinary_urls(content)
+    return {url: dimensions[url] for url in urls if url in dimensions}
+
+
+def rerender_pages(conn, workers=None, batch_size=100, force=False, log=print):
+    """
+    Prerenderuje content_html stránok so zastaranou verziou (s force všetkých).
+    Stránka upravená počas behu sa neprepíše (porovnáva sa updated_at).
+    Vráti počet prerenderovaných stránok.
+    """
+    c = conn.cursor()
+    c.execute("""
+        SELECT id, content, updated_at FROM pages
+        WHERE %s OR content_html_version IS DISTINCT FROM %s
+        ORDER BY id
+    """, (force, RENDERER_VERSION))
+    rows = [tuple(r) for r in c.fetchall()]
+    c.execute("SELECT url, width, height FROM image_catalog WHERE width IS NOT NULL AND height IS NOT NULL")
+    dimensions = {r[0]: (r[1], r[2]) for r in c.fetchall()}
+    conn.rollback()
+    if not rows:
+        return 0
+
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    done = 0
+    # spawn: workery nededia vlákna a spojenia aplikácie
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        for rendered in executor.map(_render_rows, batches,
+                                     [_batch_dimensions(b, dimensions) for b in batches]):
+            execute_values(c, """
+                UPDATE pages SET content_html = v.html, content_html_version = v.version
+                FROM (VALUES %s) AS v(id, html, updated_at, version)
+                WHERE pages.id = v.id AND pages.updated_at = v.updated_at
+            """, rendered)
+            conn.commit()
+            done += len(rendered)
+            log(f"  {done}/{len(rows)}")
+    return done
@@ -0,0 +1,208 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from psycopg2.extras import Json
+
+
+class LRUCache:
+    """Ohraničená LRU cache v pamäti procesu, voliteľne s TTL na položku."""
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, stored_at = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class PostgresRenderStore:
+    """Zdieľaná vrstva v tabuľke page_render_cache - vidia ju všetky workery."""
+
+    def get(self, conn, page_id, version):
+        updated_at, tags_version = version
+        c = conn.cursor()
+        c.execute("""
+            SELECT html, tags FROM page_render_cache
+            WHERE page_id=%s AND updated_at=%s AND tags_version=%s
+        """, (page_id, updated_at, tags_version))
+        row = c.fetchone()
+        if not row:
+            return None
+        return {'html': row['html'], 'tags': row['tags']}
+
+    def set(self, conn, page_id, version, entry):
+        updated_at, tags_version = version
+        c = conn.cursor()
+        c.execute("""
+            INSERT INTO page_render_cache (page_id, updated_at, tags_version, html, tags)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (page_id) DO UPDATE
+            SET updated_at=EXCLUDED.updated_at, tags_version=EXCLUDED.tags_version,
+                html=EXCLUDED.html, tags=EXCLUDED.tags
+            WHERE (page_render_cache.updated_at, page_render_cache.tags_version)
+                  <= (EXCLUDED.updated_at, EXCLUDED.tags_version)
+        """, (page_id, updated_at, tags_version, entry['html'], Json(entry['tags'])))
+
+    def invalidate(self, conn, page_id):
+        c = conn.cursor()
+        c.execute("DELETE FROM page_render_cache WHERE page_id=%s", (page_id,))
+
+    def clear(self, conn):
+        c = conn.cursor()
+        c.execute("DELETE FROM page_render_cache")
+
+
+class DiskRenderStore:
+    """Zdieľaná vrstva na lokálnom disku (jeden JSON súbor na stránku)."""
+
+    def __init__(self, directory):
+        # adresár sa vytvorí až pri prvom zápise (import aplikácie nerobí I/O)
+        self.directory = directory
+
+    def _path(self, page_id):
+        return os.path.join(self.directory, f'{int(page_id)}.json')
+
+    def get(self, conn, page_id, version):
+        try:
+            with open(self._path(page_id), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != _version_str(version):
+            return None
+        return {'html': data['html'], 'tags': data['tags']}
+
+    def set(self, conn, page_id, version, entry):
+        data = {'version': _version_str(version), 'html': entry['html'], 'tags': entry['tags']}
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self._path(page_id))
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def invalidate(self, conn, page_id):
+        try:
+            os.unlink(self._path(page_id))
+        except OSError:
+            pass
+
+    def clear(self, conn):
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+
+def _version_str(version):
+    # (updated_at stránky, verzia štítkov z cache_versions)
+    return '|'.join(v.isoformat() if hasattr(v, 'isoformat') else str(v) for v in version)
+
+
+class RenderCache:
+    """
+    Cache vyrenderovaného HTML stránok a ich štítkov.
+
+    Kľúčom je (page_id, updated_at, verzia štítkov), takže úprava stránky
+    aj zmena štítkov (cache_versions 'tags', ktorú view_page už číta)
+    vytvorí nový kľúč a staré položky z LRU postupne vypadnú - aj v iných
+    workeroch, bez čakania na TTL.
+    """
+
+    def __init__(self, maxsize=256, ttl=300, shared=None):
+        self.lru = LRUCache(maxsize, ttl)
+        self.shared = shared
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def get(self, conn, page_id, updated_at, tags_version):
+        version = (updated_at, tags_version)
+        key = (page_id, _version_str(version))
+        entry = self.lru.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        if self.shared is not None:
+            entry = self.shared.get(conn, page_id, version)
+            if entry is not None:
+                self.shared_hits += 1
+                self.lru.set(key, entry)
+                return entry
+        self.misses += 1
+        return None
+
+    def set(self, conn, page_id, updated_at, tags_version, entry):
+        version = (updated_at, tags_version)
+        self.lru.discard_where(lambda k: k[0] == page_id)
+        self.lru.set((page_id, _version_str(version)), entry)
+        if self.shared is not None:
+            self.shared.set(conn, page_id, version, entry)
+
+    def invalidate(self, conn, page_id):
+        self.lru.discard_where(lambda k: k[0] == page_id)
+        if self.shared is not None:
+            self.shared.invalidate(conn, page_id)
+
+    def clear(self, conn):
+        self.lru.clear()
+        if self.shared is not None:
+            self.shared.clear(conn)
+
+    def stats(self):
+        return {
+            'size': len(self.lru),
+            'maxsize': self.lru.maxsize,
+            'hits': self.hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+        }
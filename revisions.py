@@ -0,0 +1,190 @@
+"""
+Revízie obsahu stránok.
+
+Každé uloženie stránky pridá do page_revisions revíziu (číslovanú v rámci
+stránky od 1). Revízia je buď snapshot (celý text), alebo delta voči
+predchádzajúcej revízii - zoznam operácií nad riadkami: kladné číslo =
+skopírovať toľko riadkov, záporné = toľko preskočiť, reťazec = vložiť.
+Oboje je uložené skomprimované zlibom. Snapshot sa zapíše aspoň každých
+SNAPSHOT_INTERVAL revízií (alebo keď by delta nebola oveľa menšia), takže
+rekonštrukcia ľubovoľnej revízie je jeden dotaz a najviac
+SNAPSHOT_INTERVAL - 1 aplikovaných delt.
+"""
+import difflib
+import json
+import zlib
+
+SNAPSHOT_INTERVAL = 20
+# delta sa oplatí, len keď je skomprimovaná menšia ako tento zlomok snapshotu
+DELTA_MAX_RATIO = 0.5
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), 9)
+
+
+def _unpack(data):
+    return json.loads(zlib.decompress(bytes(data)).decode('utf-8'))
+
+
+def make_delta(old, new):
+    """Operácie, ktoré z riadkov old vyrobia new."""
+    a = old.splitlines(keepends=True)
+    b = new.splitlines(keepends=True)
+    # úprava býva na jednom mieste - spoločný začiatok a koniec sa neporovnávajú
+    prefix = 0
+    limit = min(len(a), len(b))
+    while prefix < limit and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and a[-1 - suffix] == b[-1 - suffix]:
+        suffix += 1
+    ops = [prefix] if prefix else []
+    matcher = difflib.SequenceMatcher(None, a[prefix:len(a) - suffix], b[prefix:len(b) - suffix])
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(''.join(b[prefix + j1:prefix + j2]))
+    if suffix:
+        ops.append(suffix)
+    return ops
+
+
+def apply_delta(old, ops):
+    lines = old.splitlines(keepends=True)
+    out = []
+    pos = 0
+    for op in ops:
+        if isinstance(op, str):
+            out.append(op)
+        elif op > 0:
+            out.extend(lines[pos:pos + op])
+            pos += op
+        else:
+            pos -= op
+    return ''.join(out)
+
+
+def encode(previous, content, since_snapshot):
+    """
+    (snapshot?, data) novej revízie. previous je obsah predchádzajúcej
+    revízie (None pri prvej), since_snapshot počet revízií od snapshotu.
+    """
+    snapshot = _pack(content)
+    if previous is None or since_snapshot + 1 >= SNAPSHOT_INTERVAL:
+        return True, snapshot
+    delta = _pack(make_delta(previous, content))
+    if len(delta) < len(snapshot) * DELTA_MAX_RATIO:
+        return False, delta
+    return True, snapshot
+
+
+def rebuild(rows):
+    """Obsah poslednej z riadkov (snapshot, delta, delta, ...)."""
+    content = None
+    for r in rows:
+        value = _unpack(r['data'])
+        content = value if r['snapshot'] else apply_delta(content, value)
+    return content
+
+
+def _chain(c, page_id, revision):
+    # posledný snapshot <= revision a všetky delty po revision (jedným dotazom)
+    c.execute("""
+        SELECT revision, snapshot, data FROM page_revisions
+        WHERE page_id = %(page_id)s AND revision <= %(revision)s
+          AND revision >= (SELECT max(revision) FROM page_revisions
+                           WHERE page_id = %(page_id)s AND revision <= %(revision)s AND snapshot)
+        ORDER BY revision
+    """, {'page_id': page_id, 'revision': revision})
+    return c.fetchall()
+
+
+def get_content(c, page_id, revision):
+    """Obsah revízie, alebo None, ak neexistuje."""
+    rows = _chain(c, page_id, revision)
+    if not rows or rows[-1]['revision'] != revision:
+        return None
+    return rebuild(rows)
+
+
+def latest(c, page_id):
+    c.execute("SELECT max(revision) FROM page_revisions WHERE page_id = %s", (page_id,))
+    return c.fetchone()[0]
+
+
+def record(c, page_id, title, content, user_id):
+    """
+    Pridá revíziu v transakcii volajúceho (po UPDATE stránky, ktorý drží
+    zámok riadku - súbežné uloženia tej istej stránky sa tak serializujú).
+    Ak sa obsah ani názov nezmenili, nič nepridá. Vráti číslo revízie.
+    """
+    content = content or ''
+    c.execute("""
+        SELECT revision, title,
+               revision - (SELECT max(revision) FROM page_revisions
+                           WHERE page_id = %(page_id)s AND snapshot) AS since_snapshot
+        FROM page_revisions
+        WHERE page_id = %(page_id)s
+        ORDER BY revision DESC
+        LIMIT 1
+    """, {'page_id': page_id})
+    last = c.fetchone()
+    if last is None:
+        revision, previous, since_snapshot = 1, None, 0
+    else:
+        previous = get_content(c, page_id, last['revision'])
+        if previous == content and last['title'] == title:
+            return last['revision']
+        revision, since_snapshot = last['revision'] + 1, last['since_snapshot']
+    is_snapshot, data = encode(previous, content, since_snapshot)
+    c.execute("""
+        INSERT INTO page_revisions (page_id, revision, snapshot, data, title, content_length, user_id)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """, (page_id, revision, is_snapshot, data, title, len(content), user_id))
+    return revision
+
+
+def snapshot_rows(pages, user_id=None):
+    """
+    Riadky (page_id, snapshot, data, title, content_length, user_id) pre
+    hromadný zápis snapshotov - import a migrácia; číslo revízie doplní
+    INSERT_SNAPSHOTS.
+    """
+    return [(page_id, True, _pack(content or ''), title, len(content or ''), user_id)
+            for page_id, title, content in pages]
+
+
+# pre execute_values; revízia = nasledujúca po poslednej revízii stránky
+INSERT_SNAPSHOTS = """
+    INSERT INTO page_revisions (page_id, revision, snapshot, data, title, content_length, user_id)
+    SELECT v.page_id,
+           COALESCE((SELECT max(r.revision) FROM page_revisions r WHERE r.page_id = v.page_id), 0) + 1,
+           v.snapshot, v.data, v.title, v.content_length, v.user_id::int
+    FROM (VALUES %s) AS v(page_id, snapshot, data, title, content_length, user_id)
+"""
+
+
+def list_revisions(c, page_id, limit, before=None):
+    """Revízie od najnovšej (keyset podľa čísla revízie), limit + 1 riadkov."""
+    c.execute("""
+        SELECT r.revision, r.title, r.snapshot, r.content_length, length(r.data) AS stored_bytes,
+               to_char(r.created_at, 'YYYY-MM-DD HH24:MI:SS') AS created_at,
+               r.user_id, u.first_name, u.last_name
+        FROM page_revisions r
+        LEFT JOIN users u ON u.id = r.user_id
+        WHERE r.page_id = %s AND (%s::int IS NULL OR r.revision < %s)
+        ORDER BY r.revision DESC
+        LIMIT %s
+    """, (page_id, before, before, limit + 1))
+    return [dict(r) for r in c.fetchall()]
+
+
+def diff_lines(old, new, from_label, to_label, context=3):
+    return [line.rstrip('\n') for line in difflib.unified_diff(
+        old.splitlines(keepends=True), new.splitlines(keepends=True),
+        fromfile=from_label, tofile=to_label, n=context)]
@@ -0,0 +1,346 @@
+"""
+Session na strane servera.
+
+Cookie nesie len náhodné id session; dáta (session['user'], stav OAuth)
+sú v tabuľke sessions (v DB je len hash id) a pred ňou je LRU v pamäti
+workera, takže bežná požiadavka session nečíta z DB ani neoveruje HMAC.
+
+Zmenu session z iného workera (update_role) oznámi NOTIFY
+'session:<user_id>' na kanáli index_cache a worker zahodí svoju LRU.
+Uloženie existujúcej session nikdy neprepíše session['user'] kópiou, ktorú
+požiadavka načítala na začiatku - v uložení platí 'user' zo store (inak by
+súbežná požiadavka vrátila zmenenú rolu späť); požiadavka ho môže len zmazať.
+Kým listener nie je pripojený, LRU sa obchádza a session sa číta z DB.
+DiskSessionStore je pre lokálny vývoj s jedným procesom.
+"""
+import copy
+import hashlib
+import json
+import os
+import secrets
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSession, SessionInterface
+
+from index_cache import CHANNEL as NOTIFY_CHANNEL
+from render_cache import LRUCache
+
+NOTIFY_PREFIX = 'session:'
+
+
+def _key(sid):
+    # v DB/na disku nie je samotné id z cookie
+    return hashlib.sha256(sid.encode()).hexdigest()
+
+
+class ServerSession(SecureCookieSession):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        super().__init__(initial)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.rotated = False
+
+    def rotate(self):
+        """Po prihlásení nové id session (ochrana pred session fixation)."""
+        self.rotated = True
+        self.modified = True
+
+
+class PostgresSessionStore:
+    """Tabuľka sessions - zdieľajú ju všetky workery."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def _run(self, func):
+        conn = self.pool.getconn()
+        try:
+            result = func(conn.cursor())
+            conn.commit()
+            return result
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.pool.putconn(conn)
+
+    def load(self, key):
+        def load(c):
+            c.execute("""
+                SELECT data::text, expires_at FROM sessions
+                WHERE id = %s AND expires_at > %s
+            """, (key, datetime.utcnow()))
+            row = c.fetchone()
+            return (row[0], row[1]) if row else None
+        return self._run(load)
+
+    def save(self, key, data, user_id, expires_at):
+        """Vráti uložené dáta (pri existujúcej session s 'user' zo store)."""
+        def save(c):
+            c.execute("""
+                INSERT INTO sessions (id, user_id, data, expires_at) VALUES (%s, %s, %s::jsonb, %s)
+                ON CONFLICT (id) DO UPDATE
+                SET user_id = EXCLUDED.user_id,
+                    data = CASE WHEN EXCLUDED.data ? 'user' AND sessions.data ? 'user'
+                                THEN jsonb_set(EXCLUDED.data, '{user}', sessions.data->'user')
+                                ELSE EXCLUDED.data END,
+                    expires_at = EXCLUDED.expires_at
+                RETURNING data::text
+            """, (key, user_id, data, expires_at))
+            return c.fetchone()[0]
+        return self._run(save)
+
+    def delete(self, key):
+        self._run(lambda c: c.execute("DELETE FROM sessions WHERE id = %s", (key,)))
+
+    def update_user(self, c, user_id, fields):
+        """V transakcii volajúceho; NOTIFY sa doručí workerom až po COMMIT."""
+        c.execute("""
+            UPDATE sessions SET data = jsonb_set(data, '{user}', (data->'user') || %s::jsonb)
+            WHERE user_id = %s AND data ? 'user'
+        """, (json.dumps(fields), user_id))
+        c.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, f'{NOTIFY_PREFIX}{user_id}'))
+
+    def delete_expired(self, batch_size):
+        def delete(c):
+            c.execute("""
+                DELETE FROM sessions WHERE id IN (
+                    SELECT id FROM sessions WHERE expires_at <= %s
+                    LIMIT %s FOR UPDATE SKIP LOCKED
+                )
+            """, (datetime.utcnow(), batch_size))
+            return c.rowcount
+        total = 0
+        while True:
+            deleted = self._run(delete)
+            total += deleted
+            if deleted < batch_size:
+                return total
+
+
+class DiskSessionStore:
+    """Session v súboroch (jeden JSON na session) - pre lokálny vývoj."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def _read(self, path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry['expires_at'] = datetime.fromisoformat(entry['expires_at'])
+        return entry
+
+    def _write(self, path, entry):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(dict(entry, expires_at=entry['expires_at'].isoformat()), f)
+        os.replace(tmp, path)
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith('.json'):
+                path = os.path.join(self.directory, name)
+                entry = self._read(path)
+                if entry is not None:
+                    yield path, entry
+
+    def load(self, key):
+        entry = self._read(self._path(key))
+        if entry is None or entry['expires_at'] <= datetime.utcnow():
+            return None
+        return entry['data'], entry['expires_at']
+
+    def save(self, key, data, user_id, expires_at):
+        stored = self._read(self._path(key))
+        if stored is not None:
+            new, old = json.loads(data), json.loads(stored['data'])
+            if 'user' in new and 'user' in old:
+                new['user'] = old['user']
+                data = json.dumps(new)
+        self._write(self._path(key), {'data': data, 'user_id': user_id, 'expires_at': expires_at})
+        return data
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def update_user(self, c, user_id, fields):
+        for path, entry in self._entries():
+            if entry['user_id'] == user_id:
+                data = json.loads(entry['data'])
+                if 'user' in data:
+                    data['user'].update(fields)
+                    entry['data'] = json.dumps(data)
+                    self._write(path, entry)
+
+    def delete_expired(self, batch_size):
+        now = datetime.utcnow()
+        total = 0
+        for path, entry in self._entries():
+            if entry['expires_at'] <= now:
+                try:
+                    os.remove(path)
+                    total += 1
+                except FileNotFoundError:
+                    pass
+        return total
+
+
+class ServerSessionInterface(SessionInterface):
+    """
+    Flask SessionInterface nad store (PostgresSessionStore/DiskSessionStore).
+    notifier je IndexCache - jeho listener doručuje NOTIFY 'session:<id>'.
+    Platnosť sa posúva, keď zostáva menej ako polovica lifetime; expirované
+    session maže najviac raz za cleanup_interval vlákno na pozadí po dávkach.
+    """
+
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, store, lifetime, cache_size=10000, cache_ttl=300, notifier=None,
+                 cleanup_interval=600, cleanup_batch=1000):
+        self.store = store
+        self.lifetime = lifetime
+        self.notifier = notifier
+        self.cleanup_interval = cleanup_interval
+        self.cleanup_batch = cleanup_batch
+        self.lru = LRUCache(cache_size, cache_ttl)
+        self._next_cleanup = time.monotonic() + cleanup_interval
+        self._cleanup_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'invalidations': 0, 'expired_deleted': 0}
+        if notifier is not None:
+            notifier.subscribe(self._on_notify)
+
+    def _on_notify(self, payload):
+        # rola sa mení zriedka - stačí zahodiť celú LRU
+        if payload is None or payload.startswith(NOTIFY_PREFIX):
+            self.lru.clear()
+            self._stats['invalidations'] += 1
+
+    def _use_cache(self):
+        return self.notifier is None or self.notifier.listening()
+
+    def _load(self, sid):
+        use_cache = self._use_cache()
+        if use_cache:
+            entry = self.lru.get(sid)
+            if entry is not None and entry[1] > datetime.utcnow():
+                self._stats['hits'] += 1
+                return copy.deepcopy(entry[0]), entry[1]
+            self._stats['misses'] += 1
+        else:
+            self._stats['bypassed'] += 1
+        stored = self.store.load(_key(sid))
+        if stored is None:
+            return None
+        data, expires_at = self.serializer.loads(stored[0]), stored[1]
+        if use_cache:
+            self.lru.set(sid, (copy.deepcopy(data), expires_at))
+        return data, expires_at
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        loaded = self._load(sid) if sid else None
+        if loaded is None:
+            return ServerSession()
+        return ServerSession(loaded[0], sid=sid, expires_at=loaded[1])
+
+    def create(self, data):
+        """Uloží novú session s dátami a vráti jej id (hodnotu cookie)."""
+        sid = secrets.token_urlsafe(32)
+        expires_at = datetime.utcnow() + self.lifetime
+        self.store.save(_key(sid), self.serializer.dumps(data), data.get('user', {}).get('id'), expires_at)
+        return sid
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            if session.sid is not None and session.modified:
+                self.store.delete(_key(session.sid))
+                self.lru.pop(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        now = datetime.utcnow()
+        refresh = session.expires_at is not None and session.expires_at - now < self.lifetime / 2
+        if not (session.modified or refresh or session.sid is None):
+            return
+
+        if session.rotated and session.sid is not None:
+            self.store.delete(_key(session.sid))
+            self.lru.pop(session.sid)
+            session.sid = None
+        data = dict(session)
+        if session.sid is None:
+            session.sid = self.create(data)
+            session.expires_at = now + self.lifetime
+        else:
+            session.expires_at = now + self.lifetime
+            stored = self.store.save(_key(session.sid), self.serializer.dumps(data),
+                                     data.get('user', {}).get('id'), session.expires_at)
+            # do LRU ide to, čo je v store (napr. rola zmenená počas požiadavky)
+            data = self.serializer.loads(stored)
+        if self._use_cache():
+            self.lru.set(session.sid, (copy.deepcopy(data), session.expires_at))
+
+        response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                            httponly=httponly, domain=domain, path=path, secure=secure,
+                            samesite=samesite)
+        self._maybe_cleanup()
+
+    def update_user(self, c, user_id, **fields):
+        """Zmení údaje používateľa vo všetkých jeho session (napr. rolu) okamžite."""
+        self.store.update_user(c, user_id, fields)
+        self.lru.clear()
+
+    def _maybe_cleanup(self):
+        if time.monotonic() < self._next_cleanup or not self._cleanup_lock.acquire(blocking=False):
+            return
+        self._next_cleanup = time.monotonic() + self.cleanup_interval
+        threading.Thread(target=self._cleanup, name='session-cleanup', daemon=True).start()
+
+    def _cleanup(self):
+        try:
+            self._stats['expired_deleted'] += self.cleanup()
+        except Exception as e:
+            print("Session cleanup error:", e)
+        finally:
+            self._cleanup_lock.release()
+
+    def cleanup(self):
+        """Zmaže expirované session po dávkach, vráti ich počet."""
+        return self.store.delete_expired(self.cleanup_batch)
+
+    def stats(self):
+        data = dict(self._stats)
+        data['cached'] = len(self.lru)
+        data['listener_connected'] = self.notifier.listening() if self.notifier is not None else None
+        lookups = data['hits'] + data['misses']
+        data['hit_ratio'] = round(data['hits'] / lookups, 3) if lookups else None
+        return data
@@ -0,0 +1,98 @@
+import re
+import unicodedata
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+
+def remove_diacritics(text):
+    nfkd_form = unicodedata.normalize('NFKD', text)
+    only_ascii = nfkd_form.encode('ASCII', 'ignore').decode('ASCII')
+    return only_ascii
+
+
+SLUG_RETRIES = 5
+_SLUG_SUFFIX_RE = re.compile(r'-([0-9]+)$')
+
+
+def slug_base(title):
+    base = remove_diacritics(title)
+    base = re.sub(r'[^a-zA-Z0-9\s]+', '', base)
+    base = re.sub(r'\s+', ' ', base).strip()
+    base = base.replace(' ', '+')
+    return base.lower() if base else 'stranka'
+
+
+def allocate_slug(base, taken):
+    """Prvý voľný z base, base-2, base-3, ... (taken = množina obsadených slugov)."""
+    if base not in taken:
+        return base
+    used = set()
+    for s in taken:
+        if s.startswith(base + '-'):
+            m = _SLUG_SUFFIX_RE.match(s, len(base))
+            if m:
+                used.add(int(m.group(1)))
+    i = 2
+    while i in used:
+        i += 1
+    return f"{base}-{i}"
+
+
+def generate_slug(title, c, existing_id=None):
+    # Všetky obsadené slug / slug-N jedným dotazom (index pages_slug_pattern_idx)
+    base = slug_base(title)
+    c.execute("""
+        SELECT slug FROM pages
+        WHERE (slug = %s OR slug LIKE %s) AND id IS DISTINCT FROM %s
+    """, (base, base + '-%', existing_id))
+    return allocate_slug(base, {row[0] for row in c.fetchall()})
+
+
+def save_with_unique_slug(c, title, write, existing_id=None):
+    """
+    Vygeneruje slug a zavolá write(slug). Ak ten istý slug medzitým obsadila
+    súbežná požiadavka (unikátny index pages_slug_key), skúsi ďalší voľný.
+    Vráti (slug, výsledok write).
+    """
+    for attempt in range(SLUG_RETRIES):
+        slug = generate_slug(title, c, existing_id)
+        c.execute("SAVEPOINT page_slug")
+        try:
+            result = write(slug)
+        except psycopg2.errors.UniqueViolation as e:
+            if e.diag.constraint_name != 'pages_slug_key' or attempt == SLUG_RETRIES - 1:
+                raise
+            c.execute("ROLLBACK TO SAVEPOINT page_slug")
+            continue
+        c.execute("RELEASE SAVEPOINT page_slug")
+        return slug, result
+
+
+def repair_slugs(c):
+    """
+    Doplní chýbajúce slugy a premenuje duplicitné (ponechá ich najstaršej
+    stránke). Vráti zoznam (id, starý slug, nový slug).
+    """
+    c.execute("""
+        SELECT id, title, slug,
+               slug IS NULL OR slug = ''
+               OR row_number() OVER (PARTITION BY slug ORDER BY id) > 1 AS broken
+        FROM pages
+        ORDER BY id
+    """)
+    rows = c.fetchall()
+    taken = {r['slug'] for r in rows if r['slug'] and not r['broken']}
+    changes = []
+    for r in rows:
+        if r['broken']:
+            new_slug = allocate_slug(slug_base(r['title'] or ''), taken)
+            taken.add(new_slug)
+            changes.append((r['id'], r['slug'], new_slug))
+    if changes:
+        execute_values(c, """
+            UPDATE pages SET slug = v.slug
+            FROM (VALUES %s) AS v(id, slug)
+            WHERE pages.id = v.id
+        """, [(page_id, new_slug) for page_id, _, new_slug in changes])
+    return changes
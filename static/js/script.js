@@ -183,19 +183,26 @@ document.addEventListener("DOMContentLoaded", function() {
         });
     }
 
+    const galleryLoadMoreBtn = document.getElementById('gallery-load-more');
     let galleryLoaded = false;
-    function showImageModal() {
-        if (galleryLoaded) return;
-        fetch('/api/list_images')
+    let galleryCursor = null;
+
+    function loadGalleryPage(firstPage) {
+        let url = '/api/list_images?limit=60';
+        if (!firstPage && galleryCursor) {
+            url += `&cursor=${encodeURIComponent(galleryCursor)}`;
+        }
+        return fetch(url)
           .then(r => r.json())
           .then(data => {
               const galleryContainer = document.getElementById('gallery-container');
-              if (!galleryContainer) return;
-              galleryContainer.innerHTML = '';
+              if (!galleryContainer || !data.images) return;
+              if (firstPage) galleryContainer.innerHTML = '';
 
               data.images.forEach(img => {
                   let thumb = document.createElement('img');
                   thumb.src = img.url;
+                  thumb.loading = 'lazy';
                   thumb.style.maxWidth = '100px';
                   thumb.style.maxHeight = '100px';
                   thumb.style.cursor = 'pointer';
@@ -213,11 +220,84 @@ document.addEventListener("DOMContentLoaded", function() {
 
                   galleryContainer.appendChild(thumb);
               });
+              galleryCursor = data.next_cursor;
+              if (galleryLoadMoreBtn) {
+                  galleryLoadMoreBtn.style.display = galleryCursor ? 'inline-block' : 'none';
+              }
               galleryLoaded = true;
           })
           .catch(err => console.error("Chyba pri načítaní galérie:", err));
     }
 
+    function showImageModal() {
+        if (galleryLoaded) return;
+        loadGalleryPage(true);
+    }
+
+    if (galleryLoadMoreBtn) {
+        galleryLoadMoreBtn.addEventListener('click', () => loadGalleryPage(false));
+    }
+
+    // Nahrávanie prebieha na pozadí: server vráti job_id a stav sa zisťuje
+    // pollovaním. Veľké súbory sa posielajú po častiach.
+    const UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024;
+    const UPLOAD_POLL_INTERVAL = 1000;
+
+    function postUploadForm(url, formData) {
+        return fetch(url, { method: 'POST', body: formData })
+            .then(r => r.json().then(data => {
+                if (!r.ok) throw new Error(data.error || r.statusText);
+                return data;
+            }));
+    }
+
+    function uploadInChunks(file) {
+        function sendFrom(uploadId, offset) {
+            const formData = new FormData();
+            if (uploadId) formData.append('upload_id', uploadId);
+            formData.append('offset', offset);
+            if (offset < file.size) {
+                formData.append('chunk', file.slice(offset, offset + UPLOAD_CHUNK_SIZE));
+            } else {
+                formData.append('final', '1');
+                formData.append('filename', file.name);
+            }
+            return postUploadForm('/upload_image/chunk', formData)
+                .then(data => data.job_id ? data : sendFrom(data.upload_id, data.received));
+        }
+        return sendFrom(null, 0);
+    }
+
+    function waitForUploadJob(jobId) {
+        return new Promise((resolve, reject) => {
+            function poll() {
+                fetch(`/api/upload_jobs/${jobId}`)
+                    .then(r => r.json())
+                    .then(job => {
+                        if (job.status === 'done') resolve({ url: job.url });
+                        else if (job.status === 'error' || job.error) resolve({ error: job.error });
+                        else setTimeout(poll, UPLOAD_POLL_INTERVAL);
+                    })
+                    .catch(reject);
+            }
+            poll();
+        });
+    }
+
+    function uploadImageFile(file) {
+        let started;
+        if (file.size > UPLOAD_CHUNK_SIZE) {
+            started = uploadInChunks(file);
+        } else {
+            const formData = new FormData();
+            formData.append('image', file);
+            started = postUploadForm('/upload_image', formData);
+        }
+        return started
+            .then(data => waitForUploadJob(data.job_id))
+            .catch(err => ({ error: err.message }));
+    }
+
     if (insertBtn) {
         insertBtn.addEventListener('click', function() {
             if (!textarea) return;
@@ -254,13 +334,7 @@ document.addEventListener("DOMContentLoaded", function() {
             }
 
             if (fileInput && fileInput.files && fileInput.files.length > 0) {
-                const formData = new FormData();
-                formData.append('image', fileInput.files[0]);
-                fetch('/upload_image', {
-                    method: 'POST',
-                    body: formData
-                })
-                .then(r => r.json())
+                uploadImageFile(fileInput.files[0])
                 .then(data => {
                     if (data.url) {
                         insertImage(data.url);
@@ -529,27 +603,27 @@ document.addEventListener("DOMContentLoaded", function() {
     }
 
     // =========================================================
-    // 9) HLAVNÁ STRÁNKA: FILTROVANIE OR/AND
+    // 9) HLAVNÁ STRÁNKA: FILTROVANIE OR/AND (na serveri, po častiach)
     // =========================================================
     const tagFilterContainer = document.getElementById('tag-filter');
     const filterModeToggle = document.getElementById('filter-mode-toggle');
     const pageListContainer = document.getElementById('page-list');
+    const pageSearchInput = document.getElementById('page-search');
+    const pageListMoreBtn = document.getElementById('page-list-more');
+    const PAGE_LIST_SIZE = 50;
 
     if (tagFilterContainer && filterModeToggle && pageListContainer) {
-        let allTags = [];
-        let allPages = [];
-
-        Promise.all([
-            fetch('/api/tags').then(r => r.json()),
-            fetch('/api/pages').then(r => r.json())
-        ]).then(([tags, pages]) => {
-            allTags = tags;
-            allPages = pages;
-            renderTagFilter(allTags);
-            renderPageList(allPages, []);
-        }).catch(err => {
-            console.error("Chyba pri načítaní tags/pages:", err);
-        });
+        let nextCursor = null;
+        let requestSeq = 0;
+        let searchTimer = null;
+
+        fetch('/api/tags')
+            .then(r => r.json())
+            .then(tags => renderTagFilter(tags))
+            .catch(err => {
+                console.error("Chyba pri načítaní tags:", err);
+            });
+        loadPages(true);
 
         function renderTagFilter(tags) {
             tagFilterContainer.innerHTML = '';
@@ -578,46 +652,69 @@ document.addEventListener("DOMContentLoaded", function() {
                 btn.style.color = btn.style.borderColor;
                 btn.style.backgroundColor = 'transparent';
             }
-            refreshFilter();
+            loadPages(true);
         }
 
         filterModeToggle.addEventListener('change', function() {
-            refreshFilter();
+            loadPages(true);
         });
 
-        function refreshFilter() {
+        if (pageSearchInput) {
+            pageSearchInput.addEventListener('input', function() {
+                clearTimeout(searchTimer);
+                searchTimer = setTimeout(() => loadPages(true), 250);
+            });
+        }
+
+        if (pageListMoreBtn) {
+            pageListMoreBtn.addEventListener('click', function() {
+                if (nextCursor) loadPages(false);
+            });
+        }
+
+        function buildPagesUrl(reset) {
             const activeTagIds = [];
             document.querySelectorAll('.tag-filter-btn').forEach(b => {
                 if (b.dataset.active === '1') {
-                    activeTagIds.push(parseInt(b.dataset.tagId, 10));
+                    activeTagIds.push(b.dataset.tagId);
                 }
             });
-            renderPageList(allPages, activeTagIds);
+            const params = new URLSearchParams();
+            params.set('limit', PAGE_LIST_SIZE);
+            if (activeTagIds.length) {
+                params.set('tags', activeTagIds.join(','));
+                params.set('mode', filterModeToggle.checked ? 'and' : 'or');
+            }
+            if (pageSearchInput && pageSearchInput.value.trim()) {
+                params.set('q', pageSearchInput.value.trim());
+            }
+            if (!reset && nextCursor) {
+                params.set('cursor', nextCursor);
+            }
+            return '/api/pages?' + params.toString();
         }
 
-        function renderPageList(pages, activeTagIds) {
-            pageListContainer.innerHTML = '';
-            const isAndMode = filterModeToggle.checked;
-            if (activeTagIds.length === 0) {
-                pages.forEach(p => {
-                    pageListContainer.appendChild(createPageRow(p));
-                });
-                return;
-            }
-            pages.forEach(p => {
-                const pTagIds = p.tags.map(t => t.tag_id);
-                if (isAndMode) {
-                    const hasAll = activeTagIds.every(tid => pTagIds.includes(tid));
-                    if (hasAll) {
-                        pageListContainer.appendChild(createPageRow(p));
-                    }
-                } else {
-                    const hasAny = activeTagIds.some(tid => pTagIds.includes(tid));
-                    if (hasAny) {
-                        pageListContainer.appendChild(createPageRow(p));
+        function loadPages(reset) {
+            // odpovede na staršie požiadavky (napr. pri rýchlom klikaní) ignorujeme
+            const seq = ++requestSeq;
+            fetch(buildPagesUrl(reset))
+                .then(r => r.json())
+                .then(data => {
+                    if (seq !== requestSeq || !data.pages) return;
+                    if (reset) pageListContainer.innerHTML = '';
+                    const fragment = document.createDocumentFragment();
+                    data.pages.forEach(p => {
+                        fragment.appendChild(createPageRow(p));
+                    });
+                    pageListContainer.appendChild(fragment);
+                    nextCursor = data.next_cursor;
+                    if (pageListMoreBtn) {
+                        pageListMoreBtn.style.display = nextCursor ? 'inline-block' : 'none';
                     }
-                }
-            });
+                })
+                .catch(err => {
+                    console.error("Chyba pri načítaní stránok:", err);
+                });
         }
 
         function createPageRow(page) {
@@ -646,47 +743,171 @@ document.addEventListener("DOMContentLoaded", function() {
     }
 
     //
-    // 10 HISTÓRIA
+    // 10 HISTÓRIA (po stránkach, najnovšie záznamy ako prvé)
     //
     const historyBtn = document.getElementById('historyBtn');
     const pageHistoryModal = new bootstrap.Modal(document.getElementById('pageHistoryModal'));
     const historyContainer = document.getElementById('history-container');
+    const historyLoadMoreBtn = document.getElementById('history-load-more');
+    const HISTORY_PAGE_SIZE = 100;
+    let historyPageId = null;
+    let historyCursor = null;
+
+    function createHistoryRow(item) {
+        // event_time, event_type, count (zrolované zobrazenia za deň), first_name, last_name
+        let eventLabel = (item.event_type === 'view') ? 'Zobrazenie' : 'Úprava';
+        if (item.count > 1) {
+            eventLabel += ` ×${item.count}`;
+        }
+        let row = document.createElement('div');
+        row.classList.add('mb-1');
+        row.textContent = `[${item.event_time}] ${item.first_name} ${item.last_name} – ${eventLabel}`;
+        return row;
+    }
+
+    function loadHistoryPage(firstPage) {
+        let url = `/api/page_history/${historyPageId}?limit=${HISTORY_PAGE_SIZE}`;
+        if (!firstPage && historyCursor) {
+            url += `&cursor=${encodeURIComponent(historyCursor)}`;
+        }
+        return fetch(url)
+            .then(res => res.json())
+            .then(data => {
+                if (!data.history) return;
+                if (firstPage) historyContainer.innerHTML = "";
+                // API vracia od najnovších, staršie záznamy pridávame navrch
+                const prevHeight = historyContainer.scrollHeight;
+                const fragment = document.createDocumentFragment();
+                data.history.slice().reverse().forEach(item => {
+                    fragment.appendChild(createHistoryRow(item));
+                });
+                historyContainer.insertBefore(fragment, historyContainer.firstChild);
+                historyCursor = data.next_cursor;
+                if (historyLoadMoreBtn) {
+                    historyLoadMoreBtn.style.display = historyCursor ? 'inline-block' : 'none';
+                }
+                if (firstPage) {
+                    pageHistoryModal.show();
+                    // Scrollneme na spodok
+                    historyContainer.scrollTop = historyContainer.scrollHeight;
+                } else {
+                    historyContainer.scrollTop = historyContainer.scrollHeight - prevHeight;
+                }
+            })
+            .catch(err => console.error(err));
+    }
 
     if(historyBtn) {
         historyBtn.addEventListener('click', function() {
-        // Zistíme ID stránky (napr. hidden input alebo cez page.id v šablóne)
-        const pageIdInput = document.querySelector('input[name="page_id"]');
-        if(!pageIdInput) {
-            console.error("page_id not found.");
-            return;
-        }
-        const pageId = pageIdInput.value;
+            // Zistíme ID stránky (napr. hidden input alebo cez page.id v šablóne)
+            const pageIdInput = document.querySelector('input[name="page_id"]');
+            if(!pageIdInput) {
+                console.error("page_id not found.");
+                return;
+            }
+            historyPageId = pageIdInput.value;
+            historyCursor = null;
+            loadHistoryPage(true);
+        });
+    }
 
-        // Ajax call na /api/page_history/<page_id>
-        fetch(`/api/page_history/${pageId}`)
+    if (historyLoadMoreBtn) {
+        historyLoadMoreBtn.addEventListener('click', function() {
+            if (historyPageId && historyCursor) loadHistoryPage(false);
+        });
+    }
+
+    //
+    // 10b ODKAZUJÚ SEM (načítava sa zvlášť, stránka sa cachuje podľa ETag)
+    //
+    const backlinksBox = document.getElementById('backlinks');
+    if (backlinksBox) {
+        fetch(`/api/backlinks/${backlinksBox.dataset.pageId}`)
             .then(res => res.json())
             .then(data => {
-            if(data.history) {
-                // Vyčistíme container
-                historyContainer.innerHTML = "";
-                // Naplníme záznamy
-                data.history.forEach(item => {
-                // event_time, event_type, first_name, last_name
-                let eventLabel = (item.event_type === 'view') ? 'Zobrazenie' : 'Úprava';
-                let row = document.createElement('div');
-                row.classList.add('mb-1');
-                row.textContent = `[${item.event_time}] ${item.first_name} ${item.last_name} – ${eventLabel}`;
-                historyContainer.appendChild(row);
+                if (!data.backlinks || data.backlinks.length === 0) return;
+                const list = document.getElementById('backlinks-list');
+                data.backlinks.forEach((b, i) => {
+                    if (i > 0) list.appendChild(document.createTextNode(', '));
+                    const a = document.createElement('a');
+                    a.href = `/page/${b.slug}`;
+                    a.textContent = b.title;
+                    list.appendChild(a);
                 });
+                backlinksBox.style.display = 'block';
+            })
+            .catch(err => console.error(err));
+    }
+
+    // =========================================================
+    // 11) FULLTEXTOVÉ VYHĽADÁVANIE (horná lišta)
+    // =========================================================
+    const fulltextInput = document.getElementById('fulltext-search');
+    const fulltextResults = document.getElementById('fulltext-results');
+    if (fulltextInput && fulltextResults) {
+        let fulltextTimer = null;
+        let fulltextSeq = 0;
+        let fulltextCursor = null;
+
+        function renderSearchResults(results, append) {
+            if (!append) fulltextResults.innerHTML = '';
+            const oldMore = fulltextResults.querySelector('.fulltext-more');
+            if (oldMore) oldMore.remove();
+            if (!append && results.length === 0) {
+                fulltextResults.innerHTML = '<div class="text-muted small">Nič sa nenašlo.</div>';
+            }
+            results.forEach(r => {
+                const item = document.createElement('a');
+                item.href = `/page/${r.slug}`;
+                item.classList.add('dropdown-item', 'text-wrap', 'mb-1');
+                const title = document.createElement('strong');
+                title.textContent = r.title;
+                const snippet = document.createElement('div');
+                snippet.classList.add('small', 'text-muted');
+                // snippet je escapovaný na serveri, obsahuje len <mark>
+                snippet.innerHTML = r.snippet;
+                item.appendChild(title);
+                item.appendChild(snippet);
+                fulltextResults.appendChild(item);
+            });
+            if (fulltextCursor) {
+                const more = document.createElement('button');
+                more.type = 'button';
+                more.classList.add('btn', 'btn-sm', 'btn-link', 'fulltext-more');
+                more.textContent = 'Ďalšie výsledky';
+                more.addEventListener('click', () => runSearch(true));
+                fulltextResults.appendChild(more);
+            }
+            fulltextResults.classList.add('show');
+        }
 
-                // Zobraz modal
-                pageHistoryModal.show();
+        function runSearch(append) {
+            const q = fulltextInput.value.trim();
+            const seq = ++fulltextSeq;
+            if (!q) {
+                fulltextResults.classList.remove('show');
+                return;
+            }
+            let url = `/api/search?q=${encodeURIComponent(q)}`;
+            if (append && fulltextCursor) url += `&cursor=${encodeURIComponent(fulltextCursor)}`;
+            fetch(url)
+                .then(r => r.json())
+                .then(data => {
+                    if (seq !== fulltextSeq || !data.results) return;
+                    fulltextCursor = data.next_cursor;
+                    renderSearchResults(data.results, append);
+                })
+                .catch(err => console.error("Chyba pri vyhľadávaní:", err));
+        }
 
-                // Scrollneme na spodok
-                historyContainer.scrollTop = historyContainer.scrollHeight;
+        fulltextInput.addEventListener('input', function() {
+            clearTimeout(fulltextTimer);
+            fulltextTimer = setTimeout(() => runSearch(false), 300);
+        });
+        document.addEventListener('click', function(e) {
+            if (!fulltextResults.contains(e.target) && e.target !== fulltextInput) {
+                fulltextResults.classList.remove('show');
             }
-            })
-            .catch(err => console.error(err));
         });
     }
 
@@ -0,0 +1,84 @@
+"""
+Spoločné fixtures. Testy, ktoré potrebujú PostgreSQL, bežia len s
+TEST_DATABASE_URL (prázdna databáza, migrácie sa spustia samé); bez nej
+sa preskočia. Aplikácia sa pripojí na tú istú databázu.
+"""
+import os
+import sys
+
+import psycopg2
+import pytest
+from psycopg2.extras import DictCursor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+# app.py číta DATABASE_URL pri importe (spojenia otvára až pri použití)
+os.environ['DATABASE_URL'] = TEST_DATABASE_URL or 'postgresql://localhost/lehotskydracak_test'
+os.environ.setdefault('ASSET_AUTO_BUILD', '0')
+os.environ.setdefault('INDEX_CACHE', '0')
+
+# tabuľky so stavom, ktorý vytvorili migrácie, sa nemažú
+KEEP_TABLES = ('schema_version', 'cache_versions')
+
+
+@pytest.fixture
+def db():
+    if not TEST_DATABASE_URL:
+        pytest.skip('TEST_DATABASE_URL nie je nastavená')
+    import migrations
+    conn = psycopg2.connect(TEST_DATABASE_URL, cursor_factory=DictCursor)
+    migrations.upgrade(conn, log=lambda *args: None)
+    c = conn.cursor()
+    c.execute("""
+        SELECT tablename FROM pg_tables
+        WHERE schemaname = 'public' AND tablename <> ALL(%s)
+    """, (list(KEEP_TABLES),))
+    tables = [row[0] for row in c.fetchall()]
+    if tables:
+        c.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+    # verzie, ktoré nezaložila migrácia (napr. image_catalog), vznikajú až pri behu
+    c.execute("DELETE FROM cache_versions WHERE name NOT IN ('pages', 'tags')")
+    conn.commit()
+    yield conn
+    conn.rollback()
+    conn.close()
+
+
+@pytest.fixture
+def pool(db):
+    """Vlastný pool do testovacej DB (pre vlákna na pozadí)."""
+    from db_pool import ConnectionPool
+    pool = ConnectionPool(TEST_DATABASE_URL, minconn=0, maxconn=2, cursor_factory=DictCursor)
+    yield pool
+    pool.closeall()
+
+
+@pytest.fixture
+def app(db):
+    from app import app as flask_app
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+
+@pytest.fixture
+def client(app, db):
+    """Klient prihlásený ako admin (používateľ musí existovať - sessions.user_id je FK)."""
+    c = db.cursor()
+    c.execute("""
+        INSERT INTO users (email, first_name, last_name, role)
+        VALUES ('admin@example.com', 'Test', 'Admin', 'Admin') RETURNING id
+    """)
+    user_id = c.fetchone()[0]
+    db.commit()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = {
+            'id': user_id,
+            'email': 'admin@example.com',
+            'role': 'Admin',
+            'first_name': 'Test',
+            'last_name': 'Admin',
+        }
+    return client
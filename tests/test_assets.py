@@ -0,0 +1,57 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from assets import build, minify_js
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static')
+NODE = shutil.which('node')
+needs_node = pytest.mark.skipif(NODE is None, reason='node nie je nainštalovaný')
+
+# regulárne výrazy po kľúčových slovách, v ktorých sú úvodzovky, // a /* ako obsah
+KEYWORD_REGEXES = [
+    'function quoted(s) {\n    return /"[^"]*"/.test(s);   // komentár\n}\nconsole.log(quoted(\'a "b"\'));\n',
+    "function kind() {\n    return typeof /[//] nie komentár/;\n}\nconsole.log(kind());\n",
+    "function* parts() {\n    yield /[/*] ani toto */.source;\n}\nconsole.log([...parts()]);\n",
+    "switch ('x') {\n    case /'/.source: break;\n    default: console.log('default'); // '\n}\n",
+    "console.log(void /\"/ === undefined, 'a/b' in {'a/b': 1}); // \"\n",
+    "var obj = {in: 10, of: 4};\nconsole.log(obj.in / 2 / 1, obj.of /2/ 1);\n",
+]
+
+
+def run_node(source, tmp_path, name):
+    path = tmp_path / name
+    path.write_text(source, encoding='utf-8')
+    result = subprocess.run([NODE, str(path)], capture_output=True, text=True, timeout=30)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_regex_after_keyword_is_copied_verbatim():
+    minified = minify_js('function f(s) {\n    return /[//]"/g.test(s);  // komentár\n}\n')
+    assert minified == 'function f(s) {\nreturn /[//]"/g.test(s);\n}\n'
+
+
+def test_division_is_not_taken_for_regex():
+    assert minify_js('x = a / b / c; // delenie\n') == 'x = a / b / c;\n'
+    assert minify_js('y = obj.in / 2 / 1;\n') == 'y = obj.in / 2 / 1;\n'
+
+
+@needs_node
+@pytest.mark.parametrize('source', KEYWORD_REGEXES)
+def test_minified_keyword_regexes_behave_the_same(source, tmp_path):
+    expected = run_node(source, tmp_path, 'original.js')
+    assert run_node(minify_js(source), tmp_path, 'minified.js') == expected
+
+
+@needs_node
+def test_built_bundle_passes_node_check(tmp_path):
+    manifest = build(STATIC_DIR, str(tmp_path))
+    scripts = [hashed for source, hashed in manifest.items() if source.endswith('.js')]
+    assert scripts
+    for hashed in scripts:
+        result = subprocess.run([NODE, '--check', str(tmp_path / hashed)],
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 0, f'{hashed}: {result.stderr}'
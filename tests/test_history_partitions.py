@@ -0,0 +1,49 @@
+import pytest
+
+import history_partitions
+
+
+@pytest.fixture
+def legacy_schema(db):
+    """Pôvodná nepartíciovaná page_history bez NOT NULL a FK, v samostatnej schéme."""
+    c = db.cursor()
+    c.execute("CREATE SCHEMA legacy_history")
+    c.execute("SET LOCAL search_path TO legacy_history")
+    c.execute("CREATE TABLE pages (id SERIAL PRIMARY KEY, title TEXT)")
+    c.execute("""
+        CREATE TABLE page_history (
+            id BIGSERIAL PRIMARY KEY,
+            page_id INTEGER,
+            user_id INTEGER,
+            event_type TEXT,
+            event_time TIMESTAMP
+        )
+    """)
+    yield c
+    # aj DDL sa vráti - schéma po teste nezostane
+    db.rollback()
+
+
+def test_convert_table_skips_invalid_legacy_rows(legacy_schema):
+    c = legacy_schema
+    c.execute("INSERT INTO pages (title) VALUES ('Drak'), ('Jaskyňa')")
+    c.execute("""
+        INSERT INTO page_history (page_id, user_id, event_type, event_time) VALUES
+        (1, 1, 'view', '2023-01-15 10:00'),
+        (2, 1, 'edit', '2023-03-02 08:00'),
+        (1, 1, 'view', NULL),
+        (NULL, 1, 'view', '2023-01-16 10:00'),
+        (1, NULL, 'view', '2023-01-16 10:00'),
+        (99, 1, 'view', '2023-02-01 10:00')
+    """)
+    messages = []
+    history_partitions.convert_table(c, months_ahead=0, log=messages.append)
+
+    c.execute("SELECT page_id, event_type, event_time::date::text FROM page_history ORDER BY id")
+    assert [tuple(r) for r in c.fetchall()] == [(1, 'view', '2023-01-15'), (2, 'edit', '2023-03-02')]
+    months, _ = history_partitions.partitions(c)
+    assert {m.isoformat() for m in months} >= {'2023-01-01', '2023-03-01'}
+    # mesiac, v ktorom bola len udalosť zmazanej stránky, sa nezakladá
+    assert '2023-02-01' not in {m.isoformat() for m in months}
+    assert any('3 riadkov' in m for m in messages)
+    assert any('1 udalostí' in m for m in messages)
@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from history_writer import HistoryWriter
+
+
+@pytest.fixture
+def make_writer(monkeypatch):
+    """Writer bez vlákna zapisovača - fronta sa vyprázdňuje len v teste."""
+    def make(**kwargs):
+        writer = HistoryWriter(pool=None, max_queue=2, **kwargs)
+        monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+        return writer
+    return make
+
+
+def free_slot_later(writer, delay=0.05):
+    timer = threading.Timer(delay, writer._queue.get)
+    timer.start()
+    return timer
+
+
+def test_block_policy_waits_for_room(make_writer):
+    writer = make_writer(put_timeout=5)
+    assert writer.record(1, 1, 'view') and writer.record(1, 1, 'view')
+    timer = free_slot_later(writer)
+    started = time.monotonic()
+    assert writer.record(1, 1, 'view')
+    assert time.monotonic() - started >= 0.04
+    timer.join()
+    stats = writer.stats()
+    assert (stats['blocked'], stats['dropped'], stats['enqueued']) == (1, 0, 3)
+
+
+def test_block_policy_gives_up_after_timeout(make_writer):
+    writer = make_writer(put_timeout=0.05)
+    writer.record(1, 1, 'view')
+    writer.record(1, 1, 'view')
+    assert not writer.record(1, 1, 'view')
+    stats = writer.stats()
+    assert (stats['put_timeouts'], stats['dropped']) == (1, 1)
+
+
+def test_drop_policy_sheds_only_views(make_writer):
+    writer = make_writer(overload_policy='drop', put_timeout=5)
+    writer.record(1, 1, 'view')
+    writer.record(1, 1, 'view')
+    started = time.monotonic()
+    assert not writer.record(1, 1, 'view')
+    assert time.monotonic() - started < 0.04
+    # iné udalosti než view sa nezahadzujú - čakajú ako pri 'block'
+    timer = free_slot_later(writer)
+    assert writer.record(1, 1, 'edit')
+    timer.join()
+    stats = writer.stats()
+    assert (stats['dropped'], stats['blocked']) == (1, 1)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        HistoryWriter(pool=None, overload_policy='ignore')
@@ -0,0 +1,94 @@
+import os
+import random
+import sys
+
+import pytest
+from bs4 import BeautifulSoup
+
+from html_images import process_images, responsive_image_hook
+from page_render import render_markdown
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks'))
+from bench_process_images import process_images_bs4  # noqa: E402
+from sample_data import sample_markdown  # noqa: E402
+
+UPLOAD = 'https://res.cloudinary.com/demo/image/upload/'
+IMAGE = UPLOAD + 'v1/lehotskydracak/drak.jpg'
+
+
+def render_img(src, alt='Drak', dimensions=None):
+    html = process_images(f'<p><img alt="{alt}" src="{src}"/></p>', responsive_image_hook(dimensions))
+    return BeautifulSoup(html, 'html.parser').img
+
+
+def variant(width):
+    return f'{UPLOAD}c_limit,w_{width},f_auto,q_auto/v1/lehotskydracak/drak.jpg'
+
+
+def test_srcset_and_sizes_for_full_width_image():
+    img = render_img(IMAGE)
+    widths = (320, 480, 640, 800, 1024, 1280, 1600, 2048)
+    assert img['src'] == variant(1024)
+    assert img['srcset'] == ', '.join(f'{variant(w)} {w}w' for w in widths)
+    assert img['sizes'] == '(min-width: 768px) calc(66.67vw - 12px), calc(100vw - 12px)'
+    assert img['data-fullsrc'] == IMAGE
+    assert img['loading'] == 'lazy'
+    assert not img.has_attr('width')
+
+
+def test_srcset_limited_by_scale_and_intrinsic_width():
+    img = render_img(IMAGE, alt='Drak | scale=50 | align=left', dimensions={IMAGE: (1200, 800)})
+    # 50 % stĺpca stačí do 1280 px (+ jeden väčší variant), originál má len 1200 px
+    assert img['srcset'] == ', '.join(f'{variant(w)} {w}w' for w in (320, 480, 640, 800, 1024, 1200))
+    assert img['sizes'] == '(min-width: 768px) calc(33.33vw - 12px), calc(50vw - 12px)'
+    assert (img['width'], img['height']) == ('1200', '800')
+    assert img['alt'] == 'Drak'
+
+
+def test_small_original_is_not_upscaled():
+    img = render_img(IMAGE, dimensions={IMAGE: (400, 300)})
+    assert img['src'] == variant(400)
+    assert img['srcset'] == f'{variant(320)} 320w, {variant(400)} 400w'
+
+
+def test_large_original_is_scaled_down():
+    img = render_img(IMAGE, alt='Drak | scale=10', dimensions={IMAGE: (4000, 3000)})
+    # 10 % stĺpca: najmenší variant + jeden väčší, originálnych 4000 px nie
+    assert img['srcset'] == f'{variant(320)} 320w, {variant(480)} 480w'
+    assert img['src'] == variant(480)
+    assert (img['width'], img['height']) == ('4000', '3000')
+
+
+@pytest.mark.parametrize('src', [
+    'https://example.com/obrazok.jpg',
+    '/static/uploads/obrazok.png',
+    UPLOAD + 'w_300,c_fill/v1/lehotskydracak/drak.jpg',
+    UPLOAD + 'v1/lehotskydracak/mapa.svg',
+    'https://res.cloudinary.com/demo/video/upload/v1/lehotskydracak/film.mp4',
+])
+def test_other_urls_pass_through(src):
+    img = render_img(src, dimensions={src: (640, 480)})
+    assert img['src'] == src
+    assert img['data-fullsrc'] == src
+    assert not img.has_attr('srcset')
+    assert not img.has_attr('sizes')
+    assert (img['width'], img['height']) == ('640', '480')
+
+
+def test_hook_off_matches_beautifulsoup_on_sample_pages():
+    rng = random.Random(7)
+    for _ in range(5):
+        html = render_markdown(sample_markdown(rng, 20))
+        assert process_images(html) == process_images_bs4(html)
+
+
+@pytest.mark.parametrize('html', [
+    '<p><img alt="a | caption=Hrad &quot;Lehota&quot; &amp; okolie | scale=5" src="x.jpg" data-fullsrc="y.jpg"></p>',
+    '<img src="a.png" alt="bez odseku | align=right | scale=150">',
+    '<div class="  a   b "><br>text<br>  <img src="b.png"></div>',
+    '<pre>  medzery\n  <img src="c.png" alt="v pre">  </pre>',
+    '<ul><li>neuzavretý<li>zoznam <b>tučné</ul><p>&nbsp;&copy;&#8364;&#x41;&bogus; <!-- komentár --></p>',
+    '<table><tr><td><img src="d.gif" alt="| caption=-"></td></tr></table><script>if (a < b) {}</script>',
+])
+def test_hook_off_matches_beautifulsoup_on_edge_cases(html):
+    assert process_images(html) == process_images_bs4(html)
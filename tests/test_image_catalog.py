@@ -0,0 +1,118 @@
+import pytest
+
+from image_catalog import ImageCatalog
+
+FOLDER = 'lehotskydracak'
+
+
+def resource(name, created_at='2024-01-01T10:00:00Z'):
+    return {
+        'public_id': f'{FOLDER}/{name}',
+        'secure_url': f'https://res.cloudinary.com/demo/image/upload/v1/{FOLDER}/{name}.jpg',
+        'bytes': 1000, 'width': 1200, 'height': 800, 'format': 'jpg',
+        'created_at': created_at,
+    }
+
+
+class StubAdminApi:
+    """Admin API Cloudinary (resources s next_cursor) nad zoznamom v pamäti."""
+
+    def __init__(self, resources):
+        self.resources_list = list(resources)
+        self.calls = []
+
+    def resources(self, type, prefix, max_results, next_cursor=None):
+        self.calls.append(next_cursor)
+        matching = [r for r in self.resources_list if r['public_id'].startswith(prefix)]
+        start = int(next_cursor or 0)
+        page = matching[start:start + max_results]
+        result = {'resources': page}
+        if start + max_results < len(matching):
+            result['next_cursor'] = str(start + max_results)
+        return result
+
+
+def catalog_ids(db):
+    c = db.cursor()
+    c.execute("SELECT public_id FROM image_catalog ORDER BY public_id")
+    ids = [r[0] for r in c.fetchall()]
+    db.rollback()
+    return ids
+
+
+def wait_for_background_refresh(catalog):
+    assert catalog._refreshing.acquire(timeout=10)
+    catalog._refreshing.release()
+
+
+def test_refresh_reconciles_inserts_and_deletes(db, pool):
+    api = StubAdminApi([resource(f'img{i}') for i in range(5)])
+    catalog = ImageCatalog(api, pool, folder=FOLDER, page_size=2, reconcile_interval=0)
+    # obrázok, ktorý už v Cloudinary nie je
+    catalog.upsert(db.cursor(), [resource('gone')])
+    db.commit()
+
+    # prázdny (nikdy nezosúladený) katalóg sa naplní hneď, po stránkach cez next_cursor
+    catalog.refresh(db)
+    assert api.calls == [None, '2', '4']
+    assert catalog_ids(db) == [f'{FOLDER}/img{i}' for i in range(5)]
+
+    api.resources_list = [r for r in api.resources_list if r['public_id'] != f'{FOLDER}/img0']
+    api.resources_list.append(resource('new'))
+    # zastaraný katalóg sa obnoví na pozadí
+    catalog.refresh(db)
+    wait_for_background_refresh(catalog)
+    assert catalog_ids(db) == sorted([f'{FOLDER}/img{i}' for i in range(1, 5)] + [f'{FOLDER}/new'])
+
+
+def test_is_stale_gates_refresh(db, pool):
+    api = StubAdminApi([resource('img0')])
+    catalog = ImageCatalog(api, pool, folder=FOLDER, reconcile_interval=3600)
+    assert catalog.is_stale(db.cursor()) is None
+    db.rollback()
+
+    catalog.refresh(db)
+    assert len(api.calls) == 1
+    assert catalog.is_stale(db.cursor()) is False
+    db.rollback()
+
+    # čerstvý katalóg sa Admin API nepýta
+    catalog.refresh(db)
+    wait_for_background_refresh(catalog)
+    assert len(api.calls) == 1
+
+    c = db.cursor()
+    c.execute("""
+        UPDATE cache_versions SET changed_at = CURRENT_TIMESTAMP - interval '2 hours'
+        WHERE name = 'image_catalog'
+    """)
+    db.commit()
+    assert catalog.is_stale(db.cursor()) is True
+    db.rollback()
+    catalog.refresh(db)
+    wait_for_background_refresh(catalog)
+    assert len(api.calls) == 2
+
+
+def test_load_image_page_keyset_cursor(db, client, monkeypatch):
+    import app as wiki
+    # viac obrázkov s rovnakým created_at - poradie v rámci neho určuje public_id
+    images = [resource(f'img{i}', f'2024-01-0{1 + i // 3}T10:00:00Z') for i in range(8)]
+    monkeypatch.setattr(wiki.image_catalog, 'api', StubAdminApi(images))
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 3}
+        if cursor:
+            params['cursor'] = cursor
+        data = client.get('/api/list_images', query_string=params).get_json()
+        assert len(data['images']) <= 3
+        seen.extend(image['public_id'] for image in data['images'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            break
+
+    expected = sorted(images, key=lambda r: (r['created_at'], r['public_id']), reverse=True)
+    assert seen == [r['public_id'] for r in expected]
+
+    assert client.get('/api/list_images', query_string={'cursor': 'zlý kurzor'}).status_code == 400
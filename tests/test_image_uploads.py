@@ -0,0 +1,172 @@
+import io
+import os
+import threading
+
+import psycopg2
+import pytest
+
+from image_uploads import LocalStorage, UploadError, UploadJobs, UploadSpool
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 40
+
+
+@pytest.fixture
+def spool(tmp_path):
+    return UploadSpool(str(tmp_path / 'spool'), max_bytes=len(PNG))
+
+
+def upload_in_chunks(spool, data, size):
+    upload_id = spool.start_chunked()
+    received = 0
+    for start in range(0, len(data), size):
+        received = spool.append_chunk(upload_id, received, io.BytesIO(data[start:start + size]))
+    return upload_id, received
+
+
+def test_chunks_are_assembled(spool):
+    upload_id, received = upload_in_chunks(spool, PNG, 1000)
+    assert received == len(PNG)
+    path = spool.finish_chunked(upload_id)
+    with open(path, 'rb') as f:
+        assert f.read() == PNG
+    assert os.listdir(spool.directory) == [upload_id + '.upload']
+
+
+def test_out_of_order_chunk_is_rejected(spool):
+    upload_id = spool.start_chunked()
+    spool.append_chunk(upload_id, 0, io.BytesIO(PNG[:1000]))
+    with pytest.raises(UploadError) as e:
+        spool.append_chunk(upload_id, 2000, io.BytesIO(PNG[2000:3000]))
+    assert e.value.status == 409
+    # klient pokračuje od offsetu, ktorý má server
+    assert spool.append_chunk(upload_id, 1000, io.BytesIO(PNG[1000:])) == len(PNG)
+    with open(spool.finish_chunked(upload_id), 'rb') as f:
+        assert f.read() == PNG
+
+
+def test_duplicate_chunk_is_not_appended_twice(spool):
+    upload_id = spool.start_chunked()
+    spool.append_chunk(upload_id, 0, io.BytesIO(PNG[:1000]))
+    with pytest.raises(UploadError) as e:
+        spool.append_chunk(upload_id, 0, io.BytesIO(PNG[:1000]))
+    assert e.value.status == 409
+    assert os.path.getsize(os.path.join(spool.directory, upload_id + '.part')) == 1000
+
+
+def test_oversized_chunk_is_truncated_back(spool):
+    upload_id = spool.start_chunked()
+    spool.append_chunk(upload_id, 0, io.BytesIO(PNG[:1000]))
+    with pytest.raises(UploadError) as e:
+        spool.append_chunk(upload_id, 1000, io.BytesIO(PNG))
+    assert e.value.status == 413
+    assert os.path.getsize(os.path.join(spool.directory, upload_id + '.part')) == 1000
+
+
+def test_unknown_or_invalid_upload_id(spool):
+    spool.start_chunked()
+    with pytest.raises(UploadError) as e:
+        spool.append_chunk('0' * 32, 0, io.BytesIO(b'x'))
+    assert e.value.status == 404
+    with pytest.raises(UploadError) as e:
+        spool.finish_chunked('../etc/passwd')
+    assert e.value.status == 400
+
+
+class BlockingStorage(LocalStorage):
+    """LocalStorage, ktorá počká na release - dá sa tak pozorovať stav 'running'."""
+
+    def __init__(self, directory, fail=False):
+        super().__init__(directory)
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = fail
+
+    def store(self, path, filename):
+        self.started.set()
+        self.release.wait(10)
+        if self.fail:
+            raise OSError("úložisko je nedostupné")
+        return super().store(path, filename)
+
+
+def spooled_png(spool):
+    return spool.save(io.BytesIO(PNG))
+
+
+def wait_for(jobs, db, job_id, status):
+    for _ in range(200):
+        job = jobs.get(db, job_id)
+        if job['status'] == status:
+            return job
+        threading.Event().wait(0.05)
+    raise AssertionError(f"úloha nie je v stave {status}: {job}")
+
+
+@pytest.mark.parametrize('fail', [False, True])
+def test_job_status_transitions(db, pool, spool, tmp_path, fail):
+    storage = BlockingStorage(str(tmp_path / 'uploads'), fail=fail)
+    stored = []
+    jobs = UploadJobs(pool, storage, spool, max_workers=1, on_stored=lambda c, result: stored.append(result))
+    path = spooled_png(spool)
+    try:
+        job_id = jobs.submit(db, path, 'obrazok.png')
+        assert jobs.get(db, job_id)['status'] in ('pending', 'running')
+        assert storage.started.wait(10)
+        assert wait_for(jobs, db, job_id, 'running')['url'] is None
+        storage.release.set()
+        if fail:
+            job = wait_for(jobs, db, job_id, 'error')
+            assert 'nedostupné' in job['error']
+            assert stored == []
+        else:
+            job = wait_for(jobs, db, job_id, 'done')
+            assert job['url'].startswith('/static/uploads/')
+            assert stored[0]['public_id'] == job['public_id']
+        assert not os.path.exists(path)
+    finally:
+        storage.release.set()
+        jobs.shutdown()
+
+
+def test_stale_pending_job_is_reported_failed(db, pool, spool, tmp_path):
+    jobs = UploadJobs(pool, LocalStorage(str(tmp_path / 'uploads')), spool, stale_after=60)
+    c = db.cursor()
+    c.execute("""
+        INSERT INTO upload_jobs (id, status, filename, bytes, created_at) VALUES
+        ('stale', 'pending', 'a.png', 1, CURRENT_TIMESTAMP - interval '2 minutes'),
+        ('fresh', 'pending', 'b.png', 1, CURRENT_TIMESTAMP)
+    """)
+    db.commit()
+    assert jobs.get(db, 'stale')['status'] == 'error'
+    assert jobs.get(db, 'fresh')['status'] == 'pending'
+
+
+def test_submit_after_shutdown_marks_job_failed(db, pool, spool, tmp_path):
+    jobs = UploadJobs(pool, LocalStorage(str(tmp_path / 'uploads')), spool)
+    jobs._get_executor().shutdown()
+    with pytest.raises(UploadError) as e:
+        jobs.submit(db, spooled_png(spool), 'obrazok.png')
+    assert e.value.status == 503
+    c = db.cursor()
+    c.execute("SELECT status FROM upload_jobs")
+    assert [r[0] for r in c.fetchall()] == ['error']
+
+
+def test_upload_route_cleans_up_on_db_error(client, spool, monkeypatch):
+    import app as wiki
+
+    def failing_submit(conn, path, filename):
+        raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    monkeypatch.setattr(wiki, 'upload_spool', spool)
+    monkeypatch.setattr(wiki.upload_jobs, 'submit', failing_submit)
+
+    response = client.post('/upload_image', data={'image': (io.BytesIO(PNG), 'obrazok.png')})
+    assert response.status_code == 503
+    assert os.listdir(spool.directory) == []
+
+    response = client.post('/upload_image/chunk', data={
+        'offset': '0', 'final': '1', 'filename': 'obrazok.png', 'chunk': (io.BytesIO(PNG), 'blob'),
+    })
+    assert response.status_code == 503
+    assert os.listdir(spool.directory) == []
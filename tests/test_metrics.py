@@ -0,0 +1,60 @@
+import json
+import os
+
+from metrics import Registry
+
+
+def make_registry(tmp_path):
+    registry = Registry(str(tmp_path / 'metrics'), flush_interval=3600)
+    return registry, registry.counter('requests_total', 'Počet požiadaviek')
+
+
+def total(registry):
+    return {name: values[0] for (name, labels), values in registry.collect().items()}
+
+
+def test_dead_worker_is_merged_once(tmp_path):
+    registry, requests = make_registry(tmp_path)
+    requests.inc()
+    pid = os.fork()
+    if pid == 0:
+        # worker dostane po fork-e vlastný súbor a skončí
+        requests.inc(5)
+        registry.flush()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert total(registry) == {'requests_total': 6}
+    assert total(registry) == {'requests_total': 6}
+    names = sorted(os.listdir(registry.directory))
+    assert 'dead.json' in names
+    assert [n for n in names if n.startswith('worker-')] == [
+        registry._file_name[:-len('.json')] + '.alive', registry._file_name]
+
+
+def test_reused_pid_does_not_keep_dead_file_alive(tmp_path):
+    registry, requests = make_registry(tmp_path)
+    requests.inc()
+    # súbor mŕtveho workera s rovnakým PID, aký má teraz tento proces
+    os.makedirs(registry.directory, exist_ok=True)
+    stale = os.path.join(registry.directory, f'worker-{os.getpid()}-0123456789abcdef.json')
+    with open(stale, 'w') as f:
+        json.dump([['requests_total', [], [2]]], f)
+    assert total(registry) == {'requests_total': 3}
+    assert not os.path.exists(stale)
+    assert total(registry) == {'requests_total': 3}
+
+
+def test_callback_metrics_of_dead_worker(tmp_path):
+    registry = make_registry(tmp_path)[0]
+    state = {'checkouts': 3, 'idle': 2}
+    registry.counter('checkouts_total', 'Výpožičky', callback=lambda: state['checkouts'])
+    registry.gauge('idle', 'Voľné spojenia', callback=lambda: state['idle'])
+    pid = os.fork()
+    if pid == 0:
+        state.update(checkouts=4, idle=1)
+        registry.flush()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    # counter mŕtveho workera ostane, jeho gauge nie
+    assert total(registry) == {'checkouts_total': 7, 'idle': 2}
+    assert 'idle 2\n' in registry.render()
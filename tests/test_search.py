@@ -0,0 +1,40 @@
+def add_pages(db, count, content):
+    c = db.cursor()
+    for i in range(count):
+        c.execute("INSERT INTO pages (title, slug, content) VALUES (%s, %s, %s)",
+                  (f'Strana {i}', f'strana-{i}', content))
+    db.commit()
+
+
+def search_all(client, q, limit):
+    ids, cursor = [], None
+    while True:
+        params = {'q': q, 'limit': limit}
+        if cursor:
+            params['cursor'] = cursor
+        data = client.get('/api/search', query_string=params).get_json()
+        ids.extend(r['page_id'] for r in data['results'])
+        cursor = data['next_cursor']
+        if cursor is None:
+            return ids
+
+
+def test_search_pages_through_tied_ranks(db, client):
+    # rovnaký obsah = rovnaký rank, poradie určuje až id
+    add_pages(db, 7, 'Drak strážil jaskyňu plnú zlata.')
+    ids = search_all(client, 'drak', limit=2)
+    assert ids == [7, 6, 5, 4, 3, 2, 1]
+
+
+def test_search_cursor_between_rank_groups(db, client):
+    add_pages(db, 3, 'drak')
+    c = db.cursor()
+    c.execute("""
+        INSERT INTO pages (title, slug, content)
+        VALUES ('Drak', 'drak', 'drak drak drak'), ('Drak 2', 'drak-2', 'drak drak drak')
+    """)
+    db.commit()
+    first = client.get('/api/search', query_string={'q': 'drak', 'limit': 50}).get_json()
+    ids = search_all(client, 'drak', limit=1)
+    assert ids == [r['page_id'] for r in first['results']]
+    assert sorted(ids) == [1, 2, 3, 4, 5]
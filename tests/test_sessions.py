@@ -0,0 +1,71 @@
+from datetime import timedelta
+
+import pytest
+from flask import Flask, session
+
+from sessions import DiskSessionStore, PostgresSessionStore, ServerSessionInterface
+
+
+@pytest.fixture(params=['disk', 'postgres'])
+def backend(request, tmp_path):
+    """(store, funkcia na zmenu používateľa v session ako z iného workera, id používateľa)."""
+    if request.param == 'disk':
+        return DiskSessionStore(str(tmp_path / 'sessions')), lambda change: change(None), 1
+    db = request.getfixturevalue('db')
+    c = db.cursor()
+    c.execute("INSERT INTO users (email, role) VALUES ('hrac@example.com', 'Admin') RETURNING id")
+    user_id = c.fetchone()[0]
+    db.commit()
+
+    def in_transaction(change):
+        change(db.cursor())
+        db.commit()
+    return PostgresSessionStore(request.getfixturevalue('pool')), in_transaction, user_id
+
+
+def make_app(store, run_change, user_id):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = ServerSessionInterface(store, lifetime=timedelta(days=30))
+
+    @app.route('/login')
+    def login():
+        session['user'] = {'id': user_id, 'role': 'Admin'}
+        return ''
+
+    @app.route('/demote-during-request')
+    def demote_during_request():
+        # požiadavka už má načítanú session s rolou Admin, rolu zmení iný worker
+        assert session['user']['role'] == 'Admin'
+        run_change(lambda c: app.session_interface.update_user(c, user_id, role='Player'))
+        session['flash'] = 'uložené'
+        return ''
+
+    @app.route('/role')
+    def role():
+        return session.get('user', {}).get('role', '-')
+
+    @app.route('/logout')
+    def logout():
+        session.pop('user', None)
+        return ''
+
+    return app
+
+
+def test_stale_session_save_keeps_updated_role(backend):
+    client = make_app(*backend).test_client()
+    client.get('/login')
+    assert client.get('/role').text == 'Admin'
+
+    client.get('/demote-during-request')
+    assert client.get('/role').text == 'Player'
+    with client.session_transaction() as s:
+        assert s['flash'] == 'uložené'
+
+
+def test_request_can_still_remove_user(backend):
+    client = make_app(*backend).test_client()
+    client.get('/login')
+    client.get('/logout')
+    assert client.get('/role').text == '-'
@@ -0,0 +1,89 @@
+import io
+import json
+
+from wiki_transfer import export_ndjson, import_wiki
+
+
+def test_history_user_ids_are_remapped_by_email(db):
+    c = db.cursor()
+    c.execute("""
+        INSERT INTO users (email, first_name, last_name, role) VALUES
+        ('admin@example.com', 'A', 'Admin', 'Admin'),
+        ('hrac@example.com', 'H', 'Hráč', 'Player')
+    """)
+    c.execute("INSERT INTO pages (title, slug, content) VALUES ('Drak', 'drak', 'obsah') RETURNING id")
+    page_id = c.fetchone()[0]
+    c.execute("""
+        INSERT INTO page_history (page_id, user_id, event_type, event_time)
+        VALUES (%s, 2, 'edit', LOCALTIMESTAMP), (%s, 2, 'view', LOCALTIMESTAMP)
+    """, (page_id, page_id))
+    db.commit()
+    data = b''.join(export_ndjson(db, history=True))
+    users = [r for r in map(json.loads, data.splitlines()) if r['type'] == 'user']
+    assert [u['email'] for u in users] == ['admin@example.com', 'hrac@example.com']
+
+    # cieľová DB má iné id používateľov a hráča ešte nepozná
+    c.execute("TRUNCATE users, pages, page_history, page_view_daily RESTART IDENTITY CASCADE")
+    c.execute("""
+        INSERT INTO users (email, first_name, last_name, role) VALUES
+        ('iny@example.com', 'I', 'Iný', 'Admin'),
+        ('admin@example.com', 'A', 'Admin', 'Player')
+    """)
+    db.commit()
+
+    stats = import_wiki(db, io.BytesIO(data), log=lambda line: None)
+    assert stats['users'] == 2
+    assert stats['users_created'] == 1
+    c.execute("SELECT email, role FROM users ORDER BY id")
+    # existujúci používateľ si ponechá svoju rolu
+    assert [tuple(r) for r in c.fetchall()] == [
+        ('iny@example.com', 'Admin'), ('admin@example.com', 'Player'), ('hrac@example.com', 'Player')]
+    c.execute("""
+        SELECT DISTINCT u.email FROM page_history h JOIN users u ON u.id = h.user_id
+    """)
+    assert [r[0] for r in c.fetchall()] == ['hrac@example.com']
+    db.rollback()
+
+
+def test_version_1_export_keeps_history_user_ids(db):
+    c = db.cursor()
+    c.execute("INSERT INTO users (email) VALUES ('a@example.com')")
+    db.commit()
+    lines = [
+        {'type': 'meta', 'format': 'lehotskydracak-wiki', 'version': 1},
+        {'type': 'page', 'id': 7, 'title': 'Drak', 'slug': 'drak', 'content': ''},
+        {'type': 'history', 'page_id': 7, 'user_id': 42, 'event_type': 'edit',
+         'event_time': '2024-01-01T10:00:00'},
+    ]
+    data = '\n'.join(json.dumps(r) for r in lines).encode('utf-8')
+    stats = import_wiki(db, io.BytesIO(data), log=lambda line: None)
+    assert stats['history'] == 1
+    c.execute("SELECT user_id FROM page_history")
+    assert [r[0] for r in c.fetchall()] == [42]
+    db.rollback()
+
+
+def test_failed_admin_import_reports_committed_batches(client, db):
+    # prvá dávka (1000 štítkov) sa zapíše, na poškodenom riadku import skončí
+    tags = [{'type': 'tag', 'id': i, 'name': f'štítok {i}', 'color': '#ffffff'} for i in range(1001)]
+    data = '\n'.join(json.dumps(r) for r in tags).encode('utf-8') + b'\n{nie je json\n'
+    response = client.post('/admin/import', data=data)
+    assert response.status_code == 400
+    assert response.get_json()['imported']['tags'] == 1000
+    c = db.cursor()
+    c.execute("SELECT count(*) FROM tags WHERE name LIKE 'štítok %%'")
+    assert c.fetchone()[0] == 1000
+    db.rollback()
+
+
+def test_admin_import_rerenders_in_write_mode(client, db, monkeypatch):
+    import app as wiki
+    monkeypatch.setattr(wiki, 'RENDER_MODE', 'write')
+    page = {'type': 'page', 'id': 1, 'title': 'Drak', 'slug': 'drak', 'content': '**drak**'}
+    response = client.post('/admin/import', data=json.dumps(page).encode('utf-8'))
+    assert response.status_code == 200
+    assert response.get_json()['rerendered'] == 1
+    c = db.cursor()
+    c.execute("SELECT content_html FROM pages WHERE slug = 'drak'")
+    assert '<strong>drak</strong>' in c.fetchone()[0]
+    db.rollback()
@@ -0,0 +1,514 @@
+"""
+Export a import celej wiki (štítky, používatelia, stránky, page_tags, voliteľne
+page_history a denné súčty zobrazení page_view_daily).
+
+Formát je NDJSON - jeden JSON záznam na riadok s kľúčom "type" (meta, tag, user,
+page, page_tag, history, view_daily) - buď ako jeden súbor, alebo tar so súborom na
+každú tabuľku; oboje môže byť zabalené v gzip. Export číta tabuľky
+pomenovanými (server-side) kurzormi v jednej REPEATABLE READ transakcii,
+JSON skladá PostgreSQL a výstup sa posiela po kúskoch, takže pamäť
+nezávisí od veľkosti wiki.
+
+Import spracúva záznamy po dávkach (execute_values, história cez COPY),
+každú dávku vo vlastnej transakcii. Štítky sa párujú podľa mena, stránky
+podľa názvu: existujúca stránka dostane importovaný obsah, nová si ponechá
+exportovaný slug, ak je voľný, inak dostane ďalší podľa pravidiel
+generate_slug. Používatelia sa párujú podľa emailu: existujúci ostanú bez
+zmeny (aj s rolou), chýbajúci sa založia s exportovanou rolou a user_id
+v histórii sa preložia na id v tejto DB. Opakovaný import stránky, štítky
+a používateľov nezdvojí, históriu áno. Ak import zlyhá, dávky pred chybou
+ostanú zapísané a výnimka nesie ich štatistiku v atribúte import_stats.
+"""
+import csv
+import gzip
+import io
+import json
+import tarfile
+import tempfile
+import time
+import zlib
+from collections import Counter
+from datetime import datetime
+
+import psycopg2.extensions
+from psycopg2.extras import execute_values
+
+import revisions
+from page_links import extract_links
+from slugs import allocate_slug, slug_base
+
+FORMAT = 'lehotskydracak-wiki'
+FORMAT_VERSION = 2
+# od verzie 2 export obsahuje používateľov; staršia história má user_id pôvodnej DB
+USERS_SINCE_VERSION = 2
+
+# (sekcia, dotaz) v poradí, v akom ich import potrebuje
+SECTIONS = (
+    ('tags', "SELECT 'tag' AS type, id, name, color FROM tags ORDER BY id"),
+    ('users', "SELECT 'user' AS type, id, email, first_name, last_name, role FROM users ORDER BY id"),
+    ('pages', """
+        SELECT 'page' AS type, id, title, slug, visible_to, created_at, updated_at, content
+        FROM pages ORDER BY id
+    """),
+    ('page_tags', "SELECT 'page_tag' AS type, page_id, tag_id FROM page_tags"),
+    ('page_history', "SELECT 'history' AS type, page_id, user_id, event_type, event_time FROM page_history"),
+    ('page_view_daily', "SELECT 'view_daily' AS type, page_id, user_id, day, count FROM page_view_daily"),
+)
+# sekcie, ktoré sa exportujú len s históriou
+HISTORY_SECTIONS = ('page_history', 'page_view_daily')
+CHUNK_BYTES = 64 * 1024
+# sekcia tar archívu sa do tejto veľkosti drží v pamäti, potom v dočasnom súbore
+SPOOL_BYTES = 8 * 1024 * 1024
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+# -------- export --------
+
+def _section_lines(conn, name, query, itersize):
+    # bez DictCursor - riadok je jeden text s hotovým JSON
+    c = conn.cursor(name=f'wiki_export_{name}', cursor_factory=psycopg2.extensions.cursor)
+    c.itersize = itersize
+    try:
+        c.execute(f"SELECT row_to_json(r)::text FROM ({query}) r")
+        for (line,) in c:
+            yield line
+    finally:
+        c.close()
+
+
+def _export_sections(conn, history, itersize):
+    """(sekcia, generátor riadkov) v jednom snapshote; na konci transakciu ukončí."""
+    conn.rollback()
+    c = conn.cursor()
+    try:
+        c.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        meta = {'type': 'meta', 'format': FORMAT, 'version': FORMAT_VERSION,
+                'exported_at': datetime.utcnow().isoformat(timespec='seconds'), 'history': history}
+        yield 'meta', iter([json.dumps(meta)])
+        for name, query in SECTIONS:
+            if name in HISTORY_SECTIONS and not history:
+                continue
+            yield name, _section_lines(conn, name, query, itersize)
+    finally:
+        conn.rollback()
+
+
+def _chunks(lines):
+    buf = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8') + b'\n'
+        buf.append(data)
+        size += len(data)
+        if size >= CHUNK_BYTES:
+            yield b''.join(buf)
+            buf.clear()
+            size = 0
+    if buf:
+        yield b''.join(buf)
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = hlavička gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_ndjson(conn, history=False, compress=False, itersize=2000):
+    """Generátor bajtov NDJSON exportu."""
+    def generate():
+        for _, lines in _export_sections(conn, history, itersize):
+            yield from _chunks(lines)
+    return _gzip(generate()) if compress else generate()
+
+
+class _Sink:
+    """Cieľ pre tarfile v režime 'w|' - zapísané bajty si vyberá generátor."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.parts)
+        self.parts.clear()
+        return data
+
+
+def export_tar(conn, history=False, compress=False, itersize=2000):
+    """
+    Generátor bajtov tar archívu (meta.json, tags.ndjson, ...). Hlavička
+    člena potrebuje jeho veľkosť, preto sa sekcia najprv zapíše do
+    SpooledTemporaryFile (veľké sekcie na disk, nie do pamäte).
+    """
+    def generate():
+        sink = _Sink()
+        tar = tarfile.open(fileobj=sink, mode='w|gz' if compress else 'w|')
+        mtime = time.time()
+        for name, lines in _export_sections(conn, history, itersize):
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+                for chunk in _chunks(lines):
+                    spool.write(chunk)
+                info = tarfile.TarInfo('meta.json' if name == 'meta' else f'{name}.ndjson')
+                info.size = spool.tell()
+                info.mtime = mtime
+                spool.seek(0)
+                tar.addfile(info, spool)
+            yield sink.drain()
+        tar.close()
+        yield sink.drain()
+    return generate()
+
+
+# -------- čítanie importu --------
+
+class _ChainReader(io.RawIOBase):
+    """Najprv už prečítaný začiatok, potom zvyšok prúdu (aj nepretáčateľného)."""
+
+    def __init__(self, head, rest):
+        self._head = head
+        self._rest = rest
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        if self._head:
+            n = min(len(b), len(self._head))
+            b[:n] = self._head[:n]
+            self._head = self._head[n:]
+            return n
+        data = self._rest.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+
+def _peek(stream, size):
+    head = b''
+    while len(head) < size:
+        data = stream.read(size - len(head))
+        if not data:
+            break
+        head += data
+    return head, io.BufferedReader(_ChainReader(head, stream))
+
+
+def _ndjson_records(stream):
+    for line_no, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            raise ImportFormatError(f"Riadok {line_no}: neplatný JSON")
+        if not isinstance(record, dict):
+            raise ImportFormatError(f"Riadok {line_no}: očakáva sa objekt")
+        yield record
+
+
+def read_records(stream):
+    """Záznamy z NDJSON alebo tar (aj gzip) - formát sa zistí z prvých bajtov."""
+    head, stream = _peek(stream, 512)
+    if head[:2] == b'\x1f\x8b':
+        head, stream = _peek(gzip.GzipFile(fileobj=stream, mode='rb'), 512)
+    if head[257:262] == b'ustar':
+        with tarfile.open(fileobj=stream, mode='r|') as tar:
+            for member in tar:
+                if member.isfile() and member.name.endswith(('.ndjson', '.json')):
+                    yield from _ndjson_records(tar.extractfile(member))
+    else:
+        yield from _ndjson_records(stream)
+
+
+# -------- import --------
+
+# page_tag a history odkazujú na id z exportu - ich dávka čaká na stránky, štítky a používateľov
+DEPENDS = {'tag': (), 'user': (), 'page': (), 'page_tag': ('tag', 'page'),
+           'history': ('page', 'user'), 'view_daily': ('page', 'user')}
+
+
+class WikiImporter:
+    """
+    Záznamy sa pridávajú cez add() a zapisujú po dávkach, finish() zapíše
+    zvyšok a vráti štatistiku. Id z exportu sa prekladajú na id v tejto DB.
+    Nové stránky majú content_html prázdne (doplní `flask rerender-pages`).
+    """
+
+    def __init__(self, conn, batch_size=1000, history_batch_size=20000, log=print):
+        self.conn = conn
+        self.c = conn.cursor()
+        self.batch_size = batch_size
+        self.history_batch_size = history_batch_size
+        self.log = log
+        self.buffers = {kind: [] for kind in DEPENDS}
+        self.tag_ids = {}
+        self.page_ids = {}
+        self.user_ids = {}
+        # export bez používateľov (verzia 1): user_id sa prenesú bez prekladu
+        self.remap_users = True
+        self.stats = Counter()
+        self._started = time.monotonic()
+
+        # všetky názvy a slugy naraz - slug sa potom prideľuje bez dotazu
+        self.c.execute("SELECT id, title, slug FROM pages")
+        self.titles = {}
+        self.taken = set()
+        for page_id, title, slug in self.c.fetchall():
+            self.titles[title] = page_id
+            if slug:
+                self.taken.add(slug)
+        self.c.execute("""
+            INSERT INTO tags (name, color) VALUES ('stránka', '#cccccc')
+            ON CONFLICT (name) DO NOTHING
+        """)
+        self.c.execute("SELECT id FROM tags WHERE name = 'stránka'")
+        self.page_tag_id = self.c.fetchone()[0]
+        self.conn.commit()
+
+    def add(self, record):
+        kind = record.get('type')
+        if kind == 'meta':
+            if record.get('format') != FORMAT or record.get('version', 0) > FORMAT_VERSION:
+                raise ImportFormatError(f"Nepodporovaný formát exportu: {record.get('format')} "
+                                        f"verzia {record.get('version')}")
+            self.remap_users = record.get('version', 0) >= USERS_SINCE_VERSION
+            return
+        if kind not in self.buffers:
+            self.stats['ignored'] += 1
+            return
+        buf = self.buffers[kind]
+        buf.append(record)
+        if len(buf) >= (self.history_batch_size if kind in ('history', 'view_daily') else self.batch_size):
+            self.flush(kind)
+
+    def flush(self, kind):
+        for dependency in DEPENDS[kind]:
+            self.flush(dependency)
+        rows = self.buffers[kind]
+        if not rows:
+            return
+        self.buffers[kind] = []
+        committed = self.stats.copy()
+        try:
+            getattr(self, f'_import_{kind}')(rows)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            # štatistika zodpovedá len zapísaným dávkam
+            self.stats = committed
+            raise
+        self._progress()
+
+    def finish(self):
+        for kind in DEPENDS:
+            self.flush(kind)
+        return dict(self.stats)
+
+    def _progress(self):
+        s = self.stats
+        self.log(f"  štítky {s['tags']}, používatelia {s['users']}, stránky +{s['pages_created']} ~{s['pages_updated']}"
+                 f" ={s['pages_unchanged']}, page_tags {s['page_tags']}, história {s['history']}"
+                 f" ({time.monotonic() - self._started:.1f} s)")
+
+    def _import_tag(self, rows):
+        by_name = {}
+        for r in rows:
+            name = (r.get('name') or '').strip()
+            if name:
+                by_name[name] = r
+            else:
+                self.stats['skipped'] += 1
+        if not by_name:
+            return
+        result = execute_values(self.c, """
+            INSERT INTO tags (name, color) VALUES %s
+            ON CONFLICT (name) DO UPDATE SET color = EXCLUDED.color
+            RETURNING id, name
+        """, [(name, r.get('color') or '#cccccc') for name, r in by_name.items()],
+            page_size=len(by_name), fetch=True)
+        ids = {name: tag_id for tag_id, name in result}
+        for name, r in by_name.items():
+            if r.get('id') is not None:
+                self.tag_ids[r['id']] = ids[name]
+        self.stats['tags'] += len(by_name)
+
+    def _import_user(self, rows):
+        by_email = {}
+        for r in rows:
+            email = (r.get('email') or '').strip()
+            if email:
+                by_email[email] = r
+            else:
+                self.stats['skipped'] += 1
+        if not by_email:
+            return
+        # existujúci používateľ (aj jeho rola) sa nemení
+        execute_values(self.c, """
+            INSERT INTO users (email, first_name, last_name, role) VALUES %s
+            ON CONFLICT (email) DO NOTHING
+        """, [(email, r.get('first_name'), r.get('last_name'), r.get('role') or 'Player')
+              for email, r in by_email.items()], page_size=len(by_email))
+        self.stats['users_created'] += self.c.rowcount
+        self.c.execute("SELECT id, email FROM users WHERE email = ANY(%s)", (list(by_email),))
+        ids = {email: user_id for user_id, email in self.c.fetchall()}
+        for email, r in by_email.items():
+            if r.get('id') is not None:
+                self.user_ids[r['id']] = ids[email]
+        self.stats['users'] += len(by_email)
+
+    def _user_id(self, exported_id):
+        if not self.remap_users:
+            return exported_id
+        return self.user_ids.get(exported_id)
+
+    def _import_page(self, rows):
+        by_title = {}
+        for r in rows:
+            title = (r.get('title') or '').strip()
+            if title:
+                by_title[title] = r
+            else:
+                self.stats['skipped'] += 1
+
+        inserts, updates = [], []
+        update_titles = {}
+        for title, r in by_title.items():
+            content = r.get('content') or ''
+            visible_to = r.get('visible_to') or 'All'
+            page_id = self.titles.get(title)
+            if page_id is not None:
+                updates.append((page_id, content, visible_to))
+                update_titles[page_id] = title
+                continue
+            slug = r.get('slug')
+            if not slug or slug in self.taken:
+                if slug:
+                    self.stats['slugs_renamed'] += 1
+                slug = allocate_slug(slug_base(title), self.taken)
+            self.taken.add(slug)
+            inserts.append((title, content, visible_to, r.get('created_at'), r.get('updated_at'), slug))
+
+        contents = {}  # id -> (názov, obsah) vložených a zmenených stránok
+        if inserts:
+            result = execute_values(self.c, """
+                INSERT INTO pages (title, content, visible_to, created_at, updated_at, slug)
+                SELECT v.title, v.content, v.visible_to,
+                       COALESCE(v.created_at::timestamp, NOW()), COALESCE(v.updated_at::timestamp, NOW()), v.slug
+                FROM (VALUES %s) AS v(title, content, visible_to, created_at, updated_at, slug)
+                RETURNING id, title
+            """, inserts, page_size=len(inserts), fetch=True)
+            new_ids = [page_id for page_id, title in result]
+            for page_id, title in result:
+                self.titles[title] = page_id
+            # nová stránka preberá slug, ktorý bol presmerovaním, a má štítok 'stránka'
+            self.c.execute("DELETE FROM slug_redirects WHERE old_slug = ANY(%s)", ([row[5] for row in inserts],))
+            execute_values(self.c, "INSERT INTO page_tags (page_id, tag_id) VALUES %s ON CONFLICT DO NOTHING",
+                           [(page_id, self.page_tag_id) for page_id in new_ids], page_size=len(new_ids))
+            self.stats['pages_created'] += len(inserts)
+            contents.update((self.titles[row[0]], (row[0], row[1])) for row in inserts)
+
+        if updates:
+            # nezmenené stránky si ponechajú updated_at (a tým cache aj ETag)
+            result = execute_values(self.c, """
+                UPDATE pages SET content = v.content, visible_to = v.visible_to, updated_at = NOW(),
+                                 content_html = NULL, content_html_version = NULL
+                FROM (VALUES %s) AS v(id, content, visible_to)
+                WHERE pages.id = v.id
+                  AND (pages.content IS DISTINCT FROM v.content OR pages.visible_to IS DISTINCT FROM v.visible_to)
+                RETURNING pages.id
+            """, updates, page_size=len(updates), fetch=True)
+            changed = {row[0] for row in result}
+            self.stats['pages_updated'] += len(changed)
+            self.stats['pages_unchanged'] += len(updates) - len(changed)
+            if changed:
+                self.c.execute("DELETE FROM page_links WHERE source_id = ANY(%s)", (sorted(changed),))
+                contents.update((page_id, (update_titles[page_id], content))
+                                for page_id, content, _ in updates if page_id in changed)
+
+        links = [(page_id, slug) for page_id, (_, content) in contents.items() for slug in extract_links(content)]
+        if links:
+            execute_values(self.c, "INSERT INTO page_links (source_id, target_slug) VALUES %s ON CONFLICT DO NOTHING",
+                           links, page_size=len(links))
+        # importovaný obsah je nová revízia (snapshot - bez rekonštrukcie predošlej)
+        if contents:
+            execute_values(self.c, revisions.INSERT_SNAPSHOTS,
+                           revisions.snapshot_rows((page_id, title, content)
+                                                   for page_id, (title, content) in contents.items()),
+                           page_size=len(contents))
+
+        for title, r in by_title.items():
+            if r.get('id') is not None:
+                self.page_ids[r['id']] = self.titles[title]
+
+    def _import_page_tag(self, rows):
+        pairs = set()
+        for r in rows:
+            page_id = self.page_ids.get(r.get('page_id'))
+            tag_id = self.tag_ids.get(r.get('tag_id'))
+            if page_id is None or tag_id is None:
+                self.stats['skipped'] += 1
+            else:
+                pairs.add((page_id, tag_id))
+        if pairs:
+            execute_values(self.c, "INSERT INTO page_tags (page_id, tag_id) VALUES %s ON CONFLICT DO NOTHING",
+                           sorted(pairs), page_size=len(pairs))
+            self.stats['page_tags'] += self.c.rowcount
+
+    def _import_history(self, rows):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        count = 0
+        for r in rows:
+            page_id = self.page_ids.get(r.get('page_id'))
+            user_id = self._user_id(r.get('user_id'))
+            if page_id is None or user_id is None or not r.get('event_type'):
+                self.stats['skipped'] += 1
+                continue
+            writer.writerow((page_id, user_id, r['event_type'],
+                             r.get('event_time') or datetime.utcnow().isoformat()))
+            count += 1
+        if count:
+            buf.seek(0)
+            self.c.copy_expert("""
+                COPY page_history (page_id, user_id, event_type, event_time) FROM STDIN WITH (FORMAT csv)
+            """, buf)
+            self.stats['history'] += count
+
+    def _import_view_daily(self, rows):
+        counts = Counter()
+        for r in rows:
+            page_id = self.page_ids.get(r.get('page_id'))
+            user_id = self._user_id(r.get('user_id'))
+            if page_id is None or user_id is None or not r.get('day') or not r.get('count'):
+                self.stats['skipped'] += 1
+            else:
+                counts[page_id, user_id, r['day']] += r['count']
+        if counts:
+            execute_values(self.c, """
+                INSERT INTO page_view_daily (page_id, user_id, day, count) VALUES %s
+                ON CONFLICT (page_id, day, user_id) DO UPDATE
+                SET count = page_view_daily.count + EXCLUDED.count
+            """, [(*key, count) for key, count in counts.items()], page_size=len(counts))
+            self.stats['view_daily'] += len(counts)
+
+
+def import_wiki(conn, stream, batch_size=1000, log=print):
+    """Importuje export z binárneho prúdu (súbor, stdin, telo požiadavky), vráti štatistiku."""
+    importer = WikiImporter(conn, batch_size=batch_size, log=log)
+    try:
+        for record in read_records(stream):
+            importer.add(record)
+        return importer.finish()
+    except Exception as e:
+        e.import_stats = dict(importer.stats)
+        raise